@@ -0,0 +1,506 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Benchmark suite of Shot Manager
+
+The suite generates a synthetic scene of the specified size (cameras, takes, shots, animated objects, grease pencil
+and VSE strips) and times the hot paths of the add-on on it. It is run in a headless Blender in which Shot Manager
+is installed:
+
+    blender -b --factory-startup --python benchmarks/sm_benchmarks.py -- --cameras 50 --takes 3 --shots 1000
+
+The results are appended to a json history file (benchmarks/benchmark_history.json by default) with the versions
+of Shot Manager and Blender, and compared to the last run made with the same scene size so that the regressions
+are visible across versions.
+Each benchmark is timed "cold", after the shots caches have been cleared, and "warm" when it relies on them.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import addon_utils
+import bpy
+
+
+# ratio of the median time to the one of the previous run above which a benchmark is reported as a regression
+_regressionRatio = 1.2
+
+
+def parseArguments():
+    argv = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(
+        prog="blender -b --python sm_benchmarks.py --", description="Benchmark suite of Shot Manager"
+    )
+    parser.add_argument("--cameras", type=int, default=20, help="number of cameras")
+    parser.add_argument("--takes", type=int, default=2, help="number of takes")
+    parser.add_argument("--shots", type=int, default=200, help="number of shots per take")
+    parser.add_argument("--shot-duration", type=int, default=24, help="duration of the shots, in frames")
+    parser.add_argument("--objects", type=int, default=20, help="number of animated objects")
+    parser.add_argument("--key-step", type=int, default=2, help="number of frames between two keyframes")
+    parser.add_argument("--vse-strips", type=int, default=100, help="number of VSE strips")
+    parser.add_argument("--repeat", type=int, default=5, help="number of runs of each benchmark")
+    parser.add_argument("--no-playblast", action="store_true", help="skip the playblast benchmark")
+    parser.add_argument("--retime-channels", type=int, default=500, help="number of F-curves of the retimed action")
+    parser.add_argument("--retime-keys", type=int, default=1000, help="number of keys of each retimed F-curve")
+    parser.add_argument(
+        "--history",
+        default=str(Path(__file__).parent / "benchmark_history.json"),
+        help="json file the results are appended to",
+    )
+    return parser.parse_args(argv)
+
+
+def enableShotManager():
+    addon_utils.enable("shotmanager", default_set=True)
+    import shotmanager
+
+    return shotmanager
+
+
+###################
+# synthetic scene
+###################
+
+
+def createSyntheticScene(scene, args):
+    """Fill the scene with cameras, takes, shots, animated objects, a grease pencil and VSE strips
+    The shots of each take follow each other. One shot out of ten is disabled
+    """
+    from shotmanager.utils import utils
+
+    props = scene.UAS_shot_manager_props
+    props.initialize_shot_manager()
+
+    cameras = [utils.create_new_camera(f"BenchCam_{i:04}") for i in range(args.cameras)]
+
+    for takeInd in range(args.takes):
+        if 0 < takeInd:
+            props.addTake(name=f"BenchTake_{takeInd:02}")
+        for shotInd in range(args.shots):
+            start = 100 + shotInd * args.shot_duration
+            props.addShot(
+                atIndex=-1,
+                takeIndex=takeInd,
+                name=f"Sh{shotInd:04}",
+                start=start,
+                end=start + args.shot_duration - 1,
+                camera=cameras[shotInd % len(cameras)] if len(cameras) else None,
+                enabled=9 != shotInd % 10,
+            )
+
+    frameStart = 100
+    frameEnd = 100 + args.shots * args.shot_duration - 1
+    scene.frame_start = frameStart
+    scene.frame_end = frameEnd
+    keyFrames = list(range(frameStart, frameEnd + 1, max(1, args.key_step)))
+
+    # animated objects, keyed in bulk
+    for objInd in range(args.objects):
+        obj = bpy.data.objects.new(f"BenchEmpty_{objInd:04}", None)
+        scene.collection.objects.link(obj)
+        action = bpy.data.actions.new(f"BenchAction_{objInd:04}")
+        obj.animation_data_create().action = action
+        for axis in range(3):
+            fcurve = action.fcurves.new("location", index=axis)
+            fcurve.keyframe_points.add(len(keyFrames))
+            coords = []
+            for frame in keyFrames:
+                coords.extend((frame, float((frame + axis * 7 + objInd) % 50)))
+            fcurve.keyframe_points.foreach_set("co", coords)
+            fcurve.update()
+
+    # grease pencil with a drawing on each keyed frame
+    gpData = bpy.data.grease_pencils.new("BenchGPencil")
+    gpObj = bpy.data.objects.new("BenchGPencil", gpData)
+    scene.collection.objects.link(gpObj)
+    layer = gpData.layers.new("BenchLayer")
+    for frame in keyFrames[:: max(1, len(keyFrames) // 500)]:
+        gpFrame = layer.frames.new(frame)
+        stroke = gpFrame.strokes.new()
+        stroke.points.add(2)
+        stroke.points[1].co = (1.0, 0.0, 0.0)
+
+    # color strips aligned on the shots of the current take
+    sequenceEditor = scene.sequence_editor_create()
+    for shot in props.get_shots()[: args.vse_strips]:
+        sequenceEditor.sequences.new_effect(
+            name=f"Bench_{shot.name}", type="COLOR", channel=2, frame_start=shot.start, frame_end=shot.end + 1
+        )
+
+    return props
+
+
+###################
+# timing
+###################
+
+
+def timeFunction(function, numRuns, setupFunction=None):
+    """Return the statistics of the durations of numRuns calls to function, in seconds
+    setupFunction: called before each run, not timed
+    """
+    times = []
+    for _ in range(max(1, numRuns)):
+        if setupFunction is not None:
+            setupFunction()
+        startTime = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - startTime)
+    return {"runs": len(times), "min": min(times), "median": statistics.median(times), "max": max(times)}
+
+
+def runBenchmarks(context, props, args, tmpDir):
+    from shotmanager.retimer import retimer
+    from shotmanager.utils import utils_shots_cache
+    from shotmanager.utils.utils_os import module_can_be_imported
+    from shotmanager.viewport_3d.timeline_draw import UAS_ShotManager_DrawMontageTimeline
+
+    scene = props.parentScene
+    takeInd = props.getCurrentTakeIndex()
+    shots = props.get_shots()
+    results = dict()
+
+    def _bench(name, function, cold=True, warm=True, numRuns=args.repeat):
+        if cold:
+            results[name + " (cold)"] = timeFunction(function, numRuns, setupFunction=utils_shots_cache.clearCaches)
+        if warm:
+            function()
+            results[name + " (warm)"] = timeFunction(function, numRuns)
+        print(f"  {name}: done")
+
+    def _getEditTimes():
+        for shot in shots:
+            props.getEditTime(shot, (shot.start + shot.end) // 2)
+
+    _bench("getEditTime", _getEditTimes)
+
+    def _getShotIndices():
+        for shot in shots:
+            props.getShotIndex(shot)
+
+    _bench("getShotIndex", _getShotIndices)
+
+    # jump_to_shot needs an animation playing in a screen, which doesn't exist in background: the benchmark
+    # resolves the jump at the end of each shot the way jump_to_shot does
+    def _jumpToShots():
+        for shotInd, shot in enumerate(shots):
+            playPlan = utils_shots_cache.getPlayPlan(props, takeInd)
+            nextPos = playPlan.getNextPosition(shotInd)
+            if -1 != nextPos:
+                playPlan.resolveForward(nextPos, 1)
+
+    _bench("jump_to_shot", _jumpToShots)
+
+    # the clips of the timeline are rebuilt at each run, without the drawing that requires the GPU
+    timeline = SimpleNamespace(
+        context=context,
+        sm_props=props,
+        clips=list(),
+        compact_display=False,
+        lanes_layout=None,
+        clips_data_version=None,
+        clips_take_index=None,
+        batches_dirty=True,
+    )
+
+    def _buildClips():
+        timeline.clips_data_version = None
+        UAS_ShotManager_DrawMontageTimeline.build_clips(timeline)
+
+    _bench("build_clips", _buildClips)
+    timeline.compact_display = True
+    _bench("build_clips compact", _buildClips)
+
+    _bench("getWarnings", lambda: props.getWarnings(scene))
+
+    # time is inserted then deleted so that the scene is the same at each run
+    retimerProps = props.retimer
+    retimeStart = scene.frame_start + (scene.frame_end - scene.frame_start) // 2
+    objects = list(scene.objects)
+
+    def _retimeScene():
+        retimer.retimeScene(context, retimerProps, "INSERT", objects, retimeStart, 10, True, 1.0, retimeStart)
+        retimer.retimeScene(context, retimerProps, "DELETE", objects, retimeStart, 10, True, 1.0, retimeStart)
+
+    _bench("retimeScene insert+delete", _retimeScene, cold=False)
+
+    benchmarkRetimeEngines(args, results)
+
+    if module_can_be_imported("shotmanager.otio"):
+        from shotmanager.otio import exports, imports
+
+        otioFilePaths = []
+
+        def _exportOtio():
+            otioFilePaths.append(
+                exports.exportShotManagerEditToOtio(
+                    scene,
+                    takeIndex=takeInd,
+                    filePath=tmpDir + os.sep,
+                    fileName="sm_benchmark.xml",
+                    addTakeNameToPath=False,
+                )
+            )
+
+        _bench("OTIO export", _exportOtio, warm=False)
+
+        # each import creates a take
+        _bench(
+            "OTIO import",
+            lambda: imports.createShotsFromOtio(scene, otioFilePaths[-1], createCameras=False, importAudioInVSE=False),
+            warm=False,
+            numRuns=1,
+        )
+        props.setCurrentTakeByIndex(takeInd)
+    else:
+        print("  OTIO benchmarks skipped: OpenTimelineIO not available")
+
+    if not args.no_playblast:
+        from shotmanager.rendering import rendering
+
+        props.renderContext.renderEngineOpengl = "BLENDER_WORKBENCH"
+        preset = props.renderSettingsPlayblast
+        preset.resolutionPercentage = 10
+        playblastShots = [shot for shot in shots if shot.enabled][:2]
+
+        def _playblast():
+            rendering.launchRenderWithVSEComposite(
+                context,
+                renderPreset=preset,
+                takeIndex=takeInd,
+                filePath=str(Path(tmpDir) / "playblast") + os.sep,
+                useStampInfo=False,
+                specificShotList=playblastShots,
+                generateSequenceVideo=False,
+                renderSound=False,
+            )
+
+        _bench("Workbench playblast 2 shots", _playblast, warm=False, numRuns=1)
+
+    from shotmanager.rendering import rendering_ffmpeg
+
+    ffmpegPath = rendering_ffmpeg.getFfmpegPath(props.renderContext.ffmpegPath)
+    if ffmpegPath is not None:
+        # compositing of a shot with and without sound
+        checkResult = dict()
+        checkDir = Path(tmpDir) / "ffmpeg_check"
+        results["ffmpeg compositing check"] = timeFunction(
+            lambda: checkResult.update(rendering_ffmpeg.checkCompositing(ffmpegPath, checkDir)), 1
+        )
+        results["ffmpeg compositing check"]["errors"] = {k: v for k, v in checkResult.items() if v is not None}
+        print("  ffmpeg compositing check: done")
+    else:
+        print("  ffmpeg compositing check skipped: ffmpeg not found")
+
+    return results
+
+
+def createHeavyAction(numChannels, numKeys):
+    action = bpy.data.actions.new("BenchHeavyAction")
+    for channelInd in range(numChannels):
+        fcurve = action.fcurves.new(f'["bench_{channelInd:05}"]')
+        fcurve.keyframe_points.add(numKeys)
+        coords = []
+        for keyInd in range(numKeys):
+            coords.extend((float(keyInd * 2), float((keyInd * 7 + channelInd * 3) % 23)))
+        fcurve.keyframe_points.foreach_set("co", coords)
+        fcurve.update()
+    return action
+
+
+def _getKeyframesData(action, attrNames=("co", "handle_left", "handle_right")):
+    data = []
+    for fcurve in action.fcurves:
+        for attrName in attrNames:
+            values = [0.0] * (2 * len(fcurve.keyframe_points))
+            fcurve.keyframe_points.foreach_get(attrName, values)
+            data.append(values)
+    return data
+
+
+def _deleteKeysOneByOne(fcurves, retimeArgs):
+    """Reference of the DELETE mode, done as before retimer_batch.remove_keys: the keys in the range are removed
+    one by one, then the keys after the range are offset key by key
+    """
+    _mode, startIncl, endIncl, removeGap = retimeArgs[:4]
+    for fcurve in fcurves:
+        keyframes = fcurve.keyframe_points
+        for key in reversed([key for key in keyframes if startIncl <= key.co[0] <= endIncl]):
+            keyframes.remove(key)
+        if removeGap:
+            offset = startIncl - endIncl - 1
+            for key in keyframes:
+                if endIncl <= key.co[0]:
+                    key.co[0] += offset
+                    key.handle_left[0] += offset
+                    key.handle_right[0] += offset
+
+
+def benchmarkRetimeEngines(args, results):
+    """Retime copies of a heavy action with the key by key engine, with the batched engine curve by curve and with
+    the batched engine planning all the curves at once, and check that they give the same keys
+    In DELETE mode all the engines remove the keys with retimer_batch.remove_keys, so they are compared to a
+    reference removing the keys one by one instead. Only the coordinates of the keys are compared since the auto
+    handles of the keys around the closed gap are now computed after the offset
+    """
+    from shotmanager.retimer import retimer
+    from shotmanager.retimer import retimer_batch
+
+    def _retimeKeyByKey(fcurves, retimeArgs):
+        for fcurve in fcurves:
+            retimer.retime_frames(retimer.FCurve(fcurve), *retimeArgs)
+
+    def _retimeBatch(fcurves, retimeArgs):
+        for fcurve in fcurves:
+            retimer_batch.retime_frames_batch(fcurve, *retimeArgs)
+
+    def _retimePlanned(fcurves, retimeArgs):
+        for plan in retimer_batch.plan_fcurves(fcurves, *retimeArgs):
+            plan.apply()
+
+    engines = {"key by key": _retimeKeyByKey, "batch": _retimeBatch, "planned": _retimePlanned}
+
+    action = createHeavyAction(args.retime_channels, args.retime_keys)
+    middleFrame = args.retime_keys
+    retimeArgsList = {
+        "INSERT": ("INSERT", middleFrame, middleFrame + 49, True, 1.0, middleFrame),
+        "DELETE": ("DELETE", middleFrame, middleFrame + 49, True, 1.0, middleFrame),
+        "RESCALE": ("RESCALE", middleFrame, middleFrame + 199, True, 1.5, middleFrame),
+    }
+
+    for modeName, retimeArgs in retimeArgsList.items():
+        modeEngines = dict(engines)
+        referenceName = "key by key"
+        comparedArrays = ("co", "handle_left", "handle_right")
+        if "DELETE" == modeName:
+            referenceName = "one by one reference"
+            modeEngines[referenceName] = _deleteKeysOneByOne
+            comparedArrays = ("co",)
+
+        retimedData = dict()
+        for engineName, retimeFunction in modeEngines.items():
+            actionCopy = action.copy()
+            results[f"retime {modeName} {engineName}"] = timeFunction(
+                lambda: retimeFunction(list(actionCopy.fcurves), retimeArgs), 1
+            )
+            retimedData[engineName] = _getKeyframesData(actionCopy, comparedArrays)
+            bpy.data.actions.remove(actionCopy)
+
+        for engineName in modeEngines.keys():
+            if engineName == referenceName:
+                continue
+            identical = retimedData[referenceName] == retimedData[engineName]
+            results[f"retime {modeName} {engineName}"]["identical"] = identical
+            if not identical:
+                print(
+                    f"  *** retime {modeName}: the {engineName} engine doesn't give the same keys as the"
+                    f" {referenceName} ***"
+                )
+
+    bpy.data.actions.remove(action)
+    print("  retime engines: done")
+
+
+###################
+# history
+###################
+
+
+def appendToHistory(historyPath, entry):
+    """Append the entry to the history file and return the last previous entry with the same configuration"""
+    history = []
+    if Path(historyPath).exists():
+        with open(historyPath, "r") as f:
+            history = json.load(f)
+
+    previousEntry = None
+    for historyEntry in reversed(history):
+        if historyEntry["config"] == entry["config"]:
+            previousEntry = historyEntry
+            break
+
+    history.append(entry)
+    with open(historyPath, "w") as f:
+        json.dump(history, f, indent=2)
+    return previousEntry
+
+
+def printResults(results, previousEntry):
+    print("\nShot Manager benchmarks (median, min):")
+    if previousEntry is not None:
+        print(f"  compared to Shot Manager {previousEntry['shotmanager_version']}, {previousEntry['date']}")
+    for name, result in results.items():
+        line = f"{name:>34}: {result['median'] * 1000:10.2f} ms, {result['min'] * 1000:10.2f} ms"
+        previousResult = None if previousEntry is None else previousEntry["results"].get(name, None)
+        if previousResult is not None and 0.0 < previousResult["median"]:
+            ratio = result["median"] / previousResult["median"]
+            line += f"   {(ratio - 1.0) * 100:+6.1f}%"
+            if _regressionRatio < ratio:
+                line += "   *** REGRESSION ***"
+        if not result.get("identical", True):
+            line += "   *** DIFFERENT RESULTS ***"
+        for caseName, error in result.get("errors", dict()).items():
+            line += f"\n{'':>36}*** FAILED: {caseName}: {error} ***"
+        print(line)
+    print("")
+
+
+def main():
+    args = parseArguments()
+    shotmanager = enableShotManager()
+
+    startTime = time.perf_counter()
+    props = createSyntheticScene(bpy.context.scene, args)
+    print(f"\nSynthetic scene created in {time.perf_counter() - startTime:0.2f} sec.")
+
+    with tempfile.TemporaryDirectory(prefix="sm_benchmark_") as tmpDir:
+        results = runBenchmarks(bpy.context, props, args, tmpDir)
+
+    entry = {
+        "shotmanager_version": shotmanager.display_version,
+        "blender_version": bpy.app.version_string,
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "platform": platform.platform(),
+        "config": {
+            "cameras": args.cameras,
+            "takes": args.takes,
+            "shots": args.shots,
+            "shot_duration": args.shot_duration,
+            "objects": args.objects,
+            "key_step": args.key_step,
+            "vse_strips": args.vse_strips,
+            "playblast": not args.no_playblast,
+            "retime_channels": args.retime_channels,
+            "retime_keys": args.retime_keys,
+        },
+        "results": results,
+    }
+    previousEntry = appendToHistory(args.history, entry)
+    printResults(results, previousEntry)
+
+
+if __name__ == "__main__":
+    main()
@@ -69,6 +69,8 @@ from .utils import utils_render
 from .utils import utils_handlers
 from .utils import utils_operators
 from .utils import utils_get_set_current_time
+from .utils import utils_shots_cache
+from .utils import utils_warnings
 from .utils.utils_os import module_can_be_imported
 
 from .scripts import rrs
@@ -169,6 +171,9 @@ def timeline_valueChanged(self, context):
         bpy.ops.uas_shot_manager.draw_montage_timeline("INVOKE_DEFAULT")
         # bpy.ops.uas_shot_manager.draw_cameras_ui("INVOKE_DEFAULT")
 
+    # the timelines are not redrawn by a timer anymore
+    utils_shots_cache.tagOverlaysRedraw()
+
 
 def install_shot_handler(self, context):
     """Called as the update function of WindowManager.UAS_shot_manager_shots_play_mode
@@ -178,11 +183,9 @@ def install_shot_handler(self, context):
     scene.UAS_shot_manager_props.setResolutionToScene()
 
     if self.UAS_shot_manager_shots_play_mode and jump_to_shot not in bpy.app.handlers.frame_change_pre:
-        shots = scene.UAS_shot_manager_props.get_shots()
-        for i, shot in enumerate(shots):
-            if shot.start <= scene.frame_current <= shot.end:
-                scene.UAS_shot_manager_props.current_shot_index = i
-                break
+        shotInd = scene.UAS_shot_manager_props.getFirstShotIndexContainingFrame(scene.frame_current)
+        if -1 != shotInd:
+            scene.UAS_shot_manager_props.current_shot_index = shotInd
         bpy.app.handlers.frame_change_pre.append(jump_to_shot)
     #     bpy.app.handlers.frame_change_post.append(jump_to_shot__frame_change_post)
 
@@ -473,6 +476,8 @@ def register():
     playbar.register()
     retimer.register()
     props.register()
+    utils_shots_cache.register()
+    utils_warnings.register()
     shots_toolbar.register()
 
     # ui
@@ -608,6 +613,8 @@ def unregister():
     # operators
     rendering.unregister()
     shots_toolbar.unregister()
+    utils_warnings.unregister()
+    utils_shots_cache.unregister()
     props.unregister()
     retimer.unregister()
     playbar.unregister()
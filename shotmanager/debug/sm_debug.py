@@ -132,6 +132,12 @@ class UAS_PT_Shot_Manager_Debug(Panel):
         layout.separator()
         row = layout.row()
         row.operator("uas.debug_runfunction", text="parseOtioFile").functionName = "parseOtioFile"
+        row = layout.row()
+        row.operator(
+            "uas.debug_runfunction", text="Benchmark Compositing Backends"
+        ).functionName = "benchmarkCompositingBackends"
+        row = layout.row()
+        row.operator("uas.debug_runfunction", text="Check ffmpeg Compositing").functionName = "checkCompositing"
 
         layout.separator()
         row = layout.row()
@@ -164,6 +170,22 @@ class UAS_Debug_RunFunction(Operator):
             # getSequenceListFromOtio(otioFile)
             # parseOtioFile(otioFile)
 
+        elif "benchmarkCompositingBackends" == self.functionName:
+            from ..rendering.rendering_ffmpeg import benchmarkCompositingBackends
+
+            benchmarkCompositingBackends(context, numShots=10)
+
+        elif "checkCompositing" == self.functionName:
+            import tempfile
+            from ..rendering.rendering_ffmpeg import getFfmpegPath, checkCompositing
+
+            ffmpegPath = getFfmpegPath(context.scene.UAS_shot_manager_props.renderContext.ffmpegPath)
+            if ffmpegPath is None:
+                print("ffmpeg executable not found")
+            else:
+                with tempfile.TemporaryDirectory(prefix="sm_ffmpeg_check_") as tmpDir:
+                    print(f"ffmpeg compositing check: {checkCompositing(ffmpegPath, tmpDir)}")
+
         return {"FINISHED"}
 
 
@@ -21,28 +21,13 @@ Handlers
 
 import bpy
 
+from shotmanager.utils import utils_shots_cache
+
 
 def jump_to_shot(scene):
     props = scene.UAS_shot_manager_props
 
-    def get_previous_shot(shots, current_shot):
-        index = props.getShotIndex(current_shot)
-        if index > 0:
-            previous_shots = [s for s in shots[:index] if s.enabled]
-            if len(previous_shots):
-                return previous_shots[-1]
-
-        return None
-
-    def get_next_shot(shots, current_shot):
-        index = props.getShotIndex(current_shot)
-        if index < len(shots) - 1:
-            next_shots = [s for s in shots[index + 1 :] if s.enabled]
-            if len(next_shots):
-                return next_shots[0]
-
-        return None
-
+    takeInd = props.getCurrentTakeIndex()
     shotList = props.get_shots()
 
     current_shot_index = props.current_shot_index
@@ -67,54 +52,52 @@ def jump_to_shot(scene):
         not_scrubbing = bpy.context.screen.is_animation_playing
 
     if not_scrubbing:
+        # enabled shots in play order, with their cumulative durations
+        playPlan = utils_shots_cache.getPlayPlan(props, takeInd)
+        if not len(playPlan):
+            return
+
+        previousPos = playPlan.getPreviousPosition(current_shot_index)
+        nextPos = playPlan.getNextPosition(current_shot_index)
+        lastPos = len(playPlan) - 1
+
         # Order of if clauses is very important.
 
         if (
-            current_frame == scene_frame_end and get_previous_shot(shotList, current_shot) is None
+            current_frame == scene_frame_end and -1 == previousPos
         ):  # While backward playing if we hit the last frame and we are playing the first shot jump to the last shot.
-            last_enabled = [s for s in shotList if s.enabled][-1]
-            props.setCurrentShot(last_enabled)
-            scene.frame_current = last_enabled.end
+            props.setCurrentShotByIndex(playPlan.shotIndices[lastPos])
+            scene.frame_current = playPlan.ends[lastPos]
         elif current_frame > current_shot_end:
-            disp = current_frame - current_shot_end
-            next_shot = get_next_shot(shotList, current_shot)
-            while next_shot is not None:
-                if disp < next_shot.getDuration():
-                    props.setCurrentShot(next_shot)
-                    scene.frame_current = next_shot.start + disp
-                    break
-                disp -= next_shot.getDuration()
-                next_shot = get_next_shot(shotList, next_shot)
+            pos, frame = (-1, None)
+            if -1 != nextPos:
+                pos, frame = playPlan.resolveForward(nextPos, current_frame - current_shot_end)
+            if -1 != pos:
+                props.setCurrentShotByIndex(playPlan.shotIndices[pos])
+                scene.frame_current = frame
             else:
                 # Scene end is farther than the last shot so loop back.
-                props.setCurrentShot([s for s in shotList if s.enabled][0])
+                props.setCurrentShotByIndex(playPlan.shotIndices[0])
         elif (
-            current_frame == scene_frame_start and get_next_shot(shotList, current_shot) is None
+            current_frame == scene_frame_start and -1 == nextPos
         ):  # While forward playing if we hit the first frame and we are playing the last shot jump to the first shot.
             # Seems that the first frame is always hit even in frame dropping playblack
-            props.setCurrentShot([s for s in shotList if s.enabled][0])
+            props.setCurrentShotByIndex(playPlan.shotIndices[0])
         elif current_frame < current_shot_start:
-            disp = current_shot_start - current_frame
-            previous_shot = get_previous_shot(shotList, current_shot)
-            while previous_shot is not None:
-                if disp < previous_shot.getDuration():
-                    props.setCurrentShot(previous_shot)
-                    scene.frame_current = previous_shot.end - disp
-                    break
-                disp -= previous_shot.getDuration()
-                previous_shot = get_previous_shot(shotList, previous_shot)
+            pos, frame = (-1, None)
+            if -1 != previousPos:
+                pos, frame = playPlan.resolveBackward(previousPos, current_shot_start - current_frame)
+            if -1 != pos:
+                props.setCurrentShotByIndex(playPlan.shotIndices[pos])
+                scene.frame_current = frame
             else:
                 # Scene end is farther than the first shot so loop back.
-                last_enabled = [s for s in shotList if s.enabled][-1]
-                props.setCurrentShot(last_enabled)
-                scene.frame_current = last_enabled.end
+                props.setCurrentShotByIndex(playPlan.shotIndices[lastPos])
+                scene.frame_current = playPlan.ends[lastPos]
     else:
         # User is scrubbing in the timeline so try to guess a shot in the range of the timeline.
         if not (current_shot.start <= current_frame <= current_shot.end):
-            candidates = list()
-            for i, shot in enumerate(shotList):
-                if shot.start <= current_frame <= shot.end:
-                    candidates.append((i, shot))
-
-            props.setCurrentShot(candidates[0][1])
-            scene.frame_current = current_frame
+            candidateInd = props.getFirstShotIndexContainingFrame(current_frame)
+            if -1 != candidateInd:
+                props.setCurrentShotByIndex(candidateInd)
+                scene.frame_current = current_frame
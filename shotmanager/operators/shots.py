@@ -27,6 +27,7 @@ from random import uniform
 import json
 
 from shotmanager.utils import utils
+from shotmanager.utils import utils_shots_cache
 
 
 def list_cameras(self, context):
@@ -1116,6 +1117,7 @@ class UAS_ShotManager_ShotRemoveMultiple(Operator):
                         props.deleteShotCamera(shots[i])
                     shots.remove(i)
                     i -= 1
+                utils_shots_cache.shotsDataChanged()
                 props.setSelectedShotByIndex(-1)
             elif self.action == "DISABLED":
                 i = len(shots) - 1
@@ -1127,6 +1129,7 @@ class UAS_ShotManager_ShotRemoveMultiple(Operator):
                             props.deleteShotCamera(shots[i])
                         shots.remove(i)
                     i -= 1
+                utils_shots_cache.shotsDataChanged()
                 if 0 < len(shots):  # wkip pas parfait, on devrait conserver la sel currente
                     props.setCurrentShotByIndex(0)
                     props.setSelectedShotByIndex(0)
@@ -24,6 +24,8 @@ import bpy
 from bpy.types import Operator
 from bpy.props import StringProperty, BoolProperty, IntProperty
 
+from shotmanager.utils import utils_shots_cache
+
 # import shotmanager.operators.shots as shots
 
 
@@ -225,6 +227,7 @@ class UAS_ShotManager_TakeRemove(Operator):
         else:
             props["current_take_name"] = currentTakeInd - 1
             props.takes.remove(currentTakeInd)
+        utils_shots_cache.shotsDataChanged()
 
         props.setCurrentShotByIndex(0)
 
@@ -373,6 +376,7 @@ class UAS_ShotManager_ResetTakesToDefault(Operator):
 
         for i in range(len(takes), -1, -1):
             takes.remove(i)
+        utils_shots_cache.shotsDataChanged()
 
         props.createDefaultTake()
 
@@ -20,8 +20,6 @@ To do: module description here.
 """
 
 import os
-from stat import S_IMODE, S_IWRITE
-from pathlib import Path
 import re
 
 import bpy
@@ -51,6 +49,9 @@ from ..operators.shots_global_settings import UAS_ShotManager_ShotsGlobalSetting
 from ..retimer.retimer_props import UAS_Retimer_Properties
 
 from shotmanager.utils import utils
+from shotmanager.utils import utils_shots_cache
+from shotmanager.utils import utils_timeline
+from shotmanager.utils import utils_warnings
 
 import logging
 
@@ -154,80 +155,15 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
     def getWarnings(self, scene):
         """Return an array with all the warnings
         A warning message can be on several lines when the separator \n is used.
+        The warnings come from a cached report in which each check is computed again only when its inputs change
         """
-        warningList = []
-
-        # check if the current file is saved and not read only
-        ###########
-        currentFilePath = bpy.path.abspath(bpy.data.filepath)
-        if "" == currentFilePath:
-            # warningList.append("Current file has to be saved")
-            # wkip to remove ones warning mecanics are integrated in the settings
-            pass
-        else:
-            stat = Path(currentFilePath).stat()
-            # print(f"Blender file Stats: {stat.st_mode}")
-            if S_IMODE(stat.st_mode) & S_IWRITE == 0:
-                warningList.append("Current file in Read-Only")
-
-        # check if the current framerate is valid according to the project settings (wkip)
-        ###########
-        if self.use_project_settings:
-            if scene.render.fps != self.project_fps:
-                warningList.append("Current scene fps and project fps are different !!")
-
-        # check if a negative render frame may be rendered
-        ###########
-        shotList = self.get_shots()
-        hasNegativeFrame = False
-        shotInd = 0
-        handlesDuration = self.getHandlesDuration()
-        while shotInd < len(shotList) and not hasNegativeFrame:
-            hasNegativeFrame = shotList[shotInd].start - handlesDuration < 0
-            shotInd += 1
-        if hasNegativeFrame:
-            if self.areShotHandlesUsed():
-                warningList.append(
-                    "Index of the output frame of a shot minus handle is negative !!"
-                    "\nNegative time indicies are not supported by Shot Manager renderer."
-                )
-            else:
-                warningList.append(
-                    "At least one shot starts at a negative frame !!"
-                    "\nNegative time indicies are not supported by Shot Manager renderer."
-                )
-
-        # check if the resolution render percentage is at 100%
-        ###########
-        if 100 != scene.render.resolution_percentage:
-            warningList.append("Render Resolution Percentage is not at 100%")
-
-        # check is the data version is compatible with the current version
-        # wkip obsolete code due to post register data version check
-        if self.dataVersion <= 0 or self.dataVersion < bpy.context.window_manager.UAS_shot_manager_version:
-            # print("Warning: elf.dataVersion:", self.dataVersion)
-            # print(
-            #     "Warning: bpy.context.window_manager.UAS_shot_manager_version:",
-            #     bpy.context.window_manager.UAS_shot_manager_version,
-            # )
-
-            warningList.append("Data version is lower than SM version !!")
-
-        # check if some camera markers are used in the scene
-        ###########
-        if utils.sceneContainsCameraBinding(scene):
-            warningList.append(
-                "Scene contains markers binded to cameras"
-                "\n*** Shot Manager is NOT compatible with camera binding ***"
-            )
+        return list(self.getWarningsReport(scene).warnings)
 
-        # if self.use_project_settings and "Scene" in scene.name:
-        #     warningList.append("Scene Name is Invalid !!!")
-        # c.label(text=" *************************************** ")
-        # c.label(text=" *    SCENE NAME IS INVALID !!!    * ")
-        # c.label(text=" *************************************** ")
-
-        return warningList
+    def getWarningsReport(self, scene):
+        """Return the cached report of the warnings, with the time of its last update and the timings of its checks
+        See utils_warnings.WarningsReport
+        """
+        return utils_warnings.getWarningsReport(self, scene)
 
     def sceneIsReady(self):
         renderWarnings = ""
@@ -274,6 +210,12 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
     rrs_renderAlsoDisabled: BoolProperty(
         name="Render Also Disabled", default=False, options=set(),
     )
+    rrs_useRenderCache: BoolProperty(
+        name="Use Render Cache", default=False, options=set(),
+    )
+    rrs_resumeRender: BoolProperty(
+        name="Resume Render", default=False, options=set(),
+    )
 
     # project settings
     #############
@@ -555,6 +497,7 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
         # print("\n*** Stamp Info updated. New state: ", self.stampInfoUsed)
         if self.display_shotname_in_3dviewport:
             bpy.ops.uas_shot_manager.draw_cameras_ui("INVOKE_DEFAULT")
+        utils_shots_cache.tagOverlaysRedraw()
 
     display_shotname_in_3dviewport: BoolProperty(
         name="Display Shot name in 3D Viewports",
@@ -568,6 +511,7 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
         # print("\n*** Stamp Info updated. New state: ", self.stampInfoUsed)
         if self.display_shotname_in_3dviewport:
             bpy.ops.uas_shot_manager.draw_hud("INVOKE_DEFAULT")
+        utils_shots_cache.tagOverlaysRedraw()
 
     display_hud_in_3dviewport: BoolProperty(
         name="Display HUD in 3D Viewports",
@@ -900,6 +844,7 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
             if self.use_project_settings:
                 defaultName = self.project_default_take_name
             defaultTake.initialize(self, name=defaultName)
+            utils_shots_cache.shotsDataChanged()
             self.setCurrentTakeByIndex(0)
             # self.setCurrentShotByIndex(-1)
             # self.setSelectedShotByIndex(-1)
@@ -935,6 +880,8 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
             takes.move(len(takes) - 1, atValidIndex)
             newTake = takes[atValidIndex]
 
+        utils_shots_cache.shotsDataChanged()
+
         # after a move newTake is different!
         # print(f"new added take name02: {newTake.name}")
 
@@ -973,6 +920,7 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
                 return -1
 
         self.takes.move(takeInd, newInd)
+        utils_shots_cache.shotsDataChanged()
         self.setCurrentTakeByIndex(newInd)
 
         return newInd
@@ -1166,18 +1114,11 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
             if -1 == takeIndex
             else (takeIndex if 0 <= takeIndex and takeIndex < len(self.getTakes()) else -1)
         )
-        duration = -1
         if -1 == takeInd:
             return -1
 
-        shotList = self.getShotsList(ignoreDisabled=ignoreDisabled, takeIndex=takeIndex)
-
-        if 0 < len(shotList):
-            duration = 0
-            for sh in shotList:
-                duration += sh.getDuration()
-
-        return duration
+        editTimes = utils_shots_cache.getEditTimesTable(self, takeInd)
+        return editTimes.getEditDuration(ignoreDisabled=ignoreDisabled)
 
     def getEditTime(self, referenceShot, frameIndexIn3DTime, referenceLevel="TAKE"):
         """Return edit current time in frames, -1 if no shots or if current shot is disabled
@@ -1190,38 +1131,90 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
         if referenceShot is None:
             return frameIndInEdit
 
-        takeInd = referenceShot.getParentTakeIndex()
-        ignoreDisabled = True
+        # case where specified shot is disabled -- disabled shots are not in the edit
+        if not referenceShot.enabled:
+            return -1
+
+        takeInd, shotInd = utils_shots_cache.getShotLocation(self, referenceShot)
+        if -1 == takeInd:
+            return -1
+
+        return self.getEditTimeByShotIndex(shotInd, frameIndexIn3DTime, takeIndex=takeInd, referenceLevel=referenceLevel)
+
+    def getEditTimeByShotIndex(self, shotIndex, frameIndexIn3DTime, takeIndex=-1, referenceLevel="TAKE"):
+        """Return edit time in frames of the specified frame of the shot at the index shotIndex in the whole shot list
+        of the specified take, -1 if the shot is disabled or if the frame is not in the shot range
+        Same as getEditTime() but without having to look for the shot in the takes
+        referenceLevel can be "TAKE" or "GLOBAL_EDIT"
+        """
+        takeInd = (
+            self.getCurrentTakeIndex()
+            if -1 == takeIndex
+            else (takeIndex if 0 <= takeIndex and takeIndex < len(self.getTakes()) else -1)
+        )
+        if -1 == takeInd:
+            return -1
 
-        # case where specified shot is disabled -- current shot may not be in the shot list if shotList is not the whole list
-        if ignoreDisabled and not referenceShot.enabled:
+        editTimes = utils_shots_cache.getEditTimesTable(self, takeInd)
+        if not (0 <= shotIndex < len(editTimes.editStarts)) or -1 == editTimes.editStarts[shotIndex]:
             return -1
 
         # specified time must be in the range of the specifed shot!!!
-        # get the whole shots list
-        shotList = self.getShotsList(ignoreDisabled=ignoreDisabled, takeIndex=takeInd)
+        take = self.takes[takeInd]
+        shot = take.shots[shotIndex]
+        if not (shot.start <= frameIndexIn3DTime and frameIndexIn3DTime <= shot.end):
+            return -1
 
-        if 0 < len(shotList):
-            if referenceShot.start <= frameIndexIn3DTime and frameIndexIn3DTime <= referenceShot.end:
-                frameIndInEdit = 0
-                shotInd = 0
-                while shotInd < len(shotList) and referenceShot != shotList[shotInd]:
-                    #         print("    While: shotInd: " + str(shotInd) + ", referenceShot: " + str(referenceShot) + ", shotList[shotInd]: " + str(shots[shotInd]))
-                    #         print("    frameIndInEdit: ", frameIndInEdit)
-                    if not ignoreDisabled or shotList[shotInd].enabled:
-                        frameIndInEdit += shotList[shotInd].getDuration()
-                    shotInd += 1
-
-                frameIndInEdit += frameIndexIn3DTime - referenceShot.start
-
-                if "GLOBAL_EDIT" == referenceLevel:
-                    frameIndInEdit += referenceShot.getParentTake().startInGlobalEdit
-                else:
-                    # at take level
-                    frameIndInEdit += self.editStartFrame  # at project level
+        frameIndInEdit = editTimes.editStarts[shotIndex] + frameIndexIn3DTime - shot.start
+
+        if "GLOBAL_EDIT" == referenceLevel:
+            frameIndInEdit += take.startInGlobalEdit
+        else:
+            # at take level
+            frameIndInEdit += self.editStartFrame  # at project level
 
         return frameIndInEdit
 
+    def getTimelineModel(self, takeIndex=-1):
+        """Return a timeline model of the shots of the specified take, read in one pass, None if the take is not found
+        The model can be modified then written back to the shots with applyTimelineModel(). See utils_timeline
+        """
+        takeInd = (
+            self.getCurrentTakeIndex()
+            if -1 == takeIndex
+            else (takeIndex if 0 <= takeIndex and takeIndex < len(self.getTakes()) else -1)
+        )
+        if -1 == takeInd:
+            return None
+        return utils_timeline.TimelineModel.fromShots(self.takes[takeInd].shots)
+
+    def applyTimelineModel(self, timeline, takeIndex=-1):
+        """Write the shots modified in the timeline model to the shots of the specified take
+        The values are written directly, without the constraints of the duration lock applied when a shot is edited
+        in the UI, and the caches of the shots are invalidated once for all the shots
+        """
+        takeInd = (
+            self.getCurrentTakeIndex()
+            if -1 == takeIndex
+            else (takeIndex if 0 <= takeIndex and takeIndex < len(self.getTakes()) else -1)
+        )
+        if -1 == takeInd:
+            return
+
+        shots = self.takes[takeInd].shots
+        for shotInd in timeline.getModifiedShotIndices():
+            record = timeline.shots[shotInd]
+            shot = shots[shotInd]
+            startChanged = shot.start != record.start
+            shot["start"] = record.start
+            shot["end"] = record.end
+            shot["enabled"] = record.enabled
+            if startChanged:
+                shot.updateClipLinkToShotStart()
+            record.modified = False
+
+        utils_shots_cache.shotsDataChanged(structureChanged=False)
+
     def getEditCurrentTime(self, referenceLevel="TAKE", ignoreDisabled=True):
         """Return edit current time in frames, -1 if no shots or if current shot is disabled
         works only on current take
@@ -1373,6 +1366,8 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
             newShot = shots[atValidIndex]
             newShotInd = atValidIndex
 
+        utils_shots_cache.shotsDataChanged()
+
         # update the current take if needed
         if takeInd == currentTakeInd:
             self.setCurrentShotByIndex(newShotInd)
@@ -1484,11 +1479,13 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
                     self.setCurrentShotByIndex(selectedShotInd - 1)
 
                 shots.remove(selectedShotInd)
+                utils_shots_cache.shotsDataChanged()
                 self.setSelectedShotByIndex(selectedShotInd - 1)
             else:
                 if currentShotInd >= selectedShotInd:
                     self.setCurrentShotByIndex(-1)
                 shots.remove(selectedShotInd)
+                utils_shots_cache.shotsDataChanged()
 
                 if currentShotInd == selectedShotInd:
                     self.setCurrentShotByIndex(self.selected_shot_index)
@@ -1509,6 +1506,7 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
         else:
             # print(f"La: takeInd: {takeInd}, currentTakeInd: {currentTakeInd}, shot Ind: {shotInd}")
             shots.remove(shotInd)
+            utils_shots_cache.shotsDataChanged()
 
     def moveShotToIndex(self, shot, newIndex):
         """
@@ -1539,6 +1537,7 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
         newInd = min(newInd, len(shots) - 1)
 
         shots.move(shotInd, newInd)
+        utils_shots_cache.shotsDataChanged()
 
         # wkipwkipwkip test if shot and current shot are from the same take!!
         # if currentShotInd == shotInd:
@@ -1548,39 +1547,20 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
         return self.getShotByIndex(newInd, takeIndex=takeInd)
 
     def getShotParentTakeIndex(self, shot):
-        for i, take in enumerate(self.takes):
-            for j, sh in enumerate(take.shots):
-                if sh == shot:
-                    return i
-        return None
+        takeInd = utils_shots_cache.getShotLocation(self, shot)[0]
+        if -1 == takeInd:
+            return None
+        return takeInd
 
     def getShotParentTake(self, shot):
-        for i, take in enumerate(self.takes):
-            for j, sh in enumerate(take.shots):
-                if sh == shot:
-                    return take
-        return -1
+        takeInd = utils_shots_cache.getShotLocation(self, shot)[0]
+        if -1 == takeInd:
+            return -1
+        return self.takes[takeInd]
 
     def getShotIndex(self, shot):
         """Return the shot index in its parent take"""
-        # takeInd = shot.getParentTakeIndex()
-        # shotInd = -1
-
-        # # wkip a optimiser
-        # shotList = self.getShotsList(ignoreDisabled=False, takeIndex=takeInd)
-
-        # shotInd = 0
-        # while shotInd < len(shotList) and shot != shotList[shotInd]:  # wkip mettre shotList[shotInd].name?
-        #     shotInd += 1
-        # if shotInd == len(shotList):
-        #     shotInd = -1
-
-        # return shotInd
-        for i, take in enumerate(self.takes):
-            for j, sh in enumerate(take.shots):
-                if sh == shot:
-                    return j
-        return -1
+        return utils_shots_cache.getShotLocation(self, shot)[1]
 
     def getShotByIndex(self, shotIndex, ignoreDisabled=False, takeIndex=-1):
         takeInd = (
@@ -1895,19 +1875,10 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
             if -1 == takeIndex
             else (takeIndex if 0 <= takeIndex and takeIndex < len(self.getTakes()) else -1)
         )
-        previousShotInd = -1
         if -1 == takeInd:
-            return previousShotInd
-
-        shotList = self.getShotsList(takeIndex=takeIndex)
-
-        previousShotInd = currentShotIndex - 1
-        isPreviousFound = shotList[previousShotInd].enabled
-        while 0 <= previousShotInd and not isPreviousFound:
-            previousShotInd -= 1
-            isPreviousFound = shotList[previousShotInd].enabled
+            return -1
 
-        return previousShotInd
+        return utils_shots_cache.getTimelineModel(self, takeInd).getPreviousEnabledShotIndex(currentShotIndex)
 
     # currentShotIndex is given in the WHOLE list of shots (including disabled)
     # returns the index of the next enabled shot in the WHOLE list, -1 if none
@@ -1917,24 +1888,10 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
             if -1 == takeIndex
             else (takeIndex if 0 <= takeIndex and takeIndex < len(self.getTakes()) else -1)
         )
-        nextShotInd = -1
         if -1 == takeInd:
-            return nextShotInd
-
-        shotList = self.getShotsList(takeIndex=takeIndex)
-
-        nextShotInd = currentShotIndex + 1
-        if len(shotList) > nextShotInd:
-            isNextFound = shotList[nextShotInd].enabled
-            while len(shotList) > nextShotInd and not isNextFound:
-                nextShotInd += 1
-                if len(shotList) > nextShotInd:
-                    isNextFound = shotList[nextShotInd].enabled
-
-        if len(shotList) <= nextShotInd:
-            nextShotInd = -1
+            return -1
 
-        return nextShotInd
+        return utils_shots_cache.getTimelineModel(self, takeInd).getNextEnabledShotIndex(currentShotIndex)
 
     def getShotsUsingCamera(self, cam, ignoreDisabled=False, takeIndex=-1):
         """Return the list of all the shots used by the specified camera in the specified take"""
@@ -1947,7 +1904,23 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
         if -1 == takeInd:
             return shotList
 
-        return self.takes[takeInd].getShotsUsingCamera(cam, ignoreDisabled=ignoreDisabled)
+        shots = self.takes[takeInd].shots
+        shotIndices = utils_shots_cache.getShotIndicesUsingCamera(self, takeInd, cam, ignoreDisabled=ignoreDisabled)
+        return [shots[i] for i in shotIndices]
+
+    def getShotIndicesUsingCamera(self, cam, ignoreDisabled=False, takeIndex=-1):
+        """Return the sorted list of the indices of the shots using the specified camera in the specified take
+        The list comes from a cache and must not be modified
+        """
+        takeInd = (
+            self.getCurrentTakeIndex()
+            if -1 == takeIndex
+            else (takeIndex if 0 <= takeIndex and takeIndex < len(self.getTakes()) else -1)
+        )
+        if -1 == takeInd:
+            return []
+
+        return utils_shots_cache.getShotIndicesUsingCamera(self, takeInd, cam, ignoreDisabled=ignoreDisabled)
 
     def getShotsSharingCamera(self, cam, ignoreDisabled=False, takeIndex=-1, inAllTakes=True):
         """Return a dictionary with all the shots using the specified camera in the specified takes
@@ -1967,17 +1940,15 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
             if -1 == takeInd:
                 return shotsDict
 
-            shotList = self.takes[takeInd].getShotsUsingCamera(cam, ignoreDisabled=ignoreDisabled)
+            shotList = self.getShotsUsingCamera(cam, ignoreDisabled=ignoreDisabled, takeIndex=takeInd)
             if len(shotList):
                 shotsDict[self.takes[takeInd].getName_PathCompliant()] = shotList
 
         else:
-            if len(self.takes):
-                for take in self.takes:
-                    shotList = []
-                    shotList = take.getShotsUsingCamera(cam, ignoreDisabled=ignoreDisabled)
-                    if len(shotList):
-                        shotsDict[take.getName_PathCompliant()] = shotList
+            for takeInd, take in enumerate(self.takes):
+                shotList = self.getShotsUsingCamera(cam, ignoreDisabled=ignoreDisabled, takeIndex=takeInd)
+                if len(shotList):
+                    shotsDict[take.getName_PathCompliant()] = shotList
 
         return shotsDict
 
@@ -2004,13 +1975,15 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
             )
             if -1 == takeInd:
                 return -1
+            takeIndices = [takeInd]
+        else:
+            takeIndices = range(len(self.takes))
 
-        sharedCams = self.getShotsSharingCamera(
-            cam, ignoreDisabled=ignoreDisabled, takeIndex=takeIndex, inAllTakes=inAllTakes
-        )
         numSharedCams = 0
-        for k in sharedCams:
-            numSharedCams += len(sharedCams[k])
+        for takeInd in takeIndices:
+            numSharedCams += len(
+                utils_shots_cache.getShotIndicesUsingCamera(self, takeInd, cam, ignoreDisabled=ignoreDisabled)
+            )
 
         return numSharedCams
 
@@ -2021,9 +1994,9 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
         if shot.camera is None:
             return False
 
-        for t in self.takes:
-            for s in t.shots:
-                if shot != s and s.camera is not None and shot.camera == s.camera:
+        for takeInd, t in enumerate(self.takes):
+            for shotInd in utils_shots_cache.getShotIndicesUsingCamera(self, takeInd, shot.camera):
+                if shot != t.shots[shotInd]:
                     return False
 
         bpy.ops.object.select_all(action="DESELECT")
@@ -2230,200 +2203,26 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
 
         - boundaryMode: can be "ANY", "START", "END"
         """
-        # print(" ** -- ** goToPreviousShotBoundary")
-
-        if not len(self.get_shots()):
+        timeline = self._getCurrentTakeTimeline()
+        if timeline is None:
             return ()
 
-        previousShotInd = -1
-        newFrame = currentFrame
-
-        # in shot play mode the current frame is supposed to be in the current shot
-        # if True or bpy.context.window_manager.UAS_shot_manager_shots_play_mode:
-        if "ANY" == boundaryMode:
-            # get current shot in the WHOLE list (= even disabled)
-            currentShotInd = self.getCurrentShotIndex()
-            currentShot = self.getShotByIndex(currentShotInd)
-            print("    current Shot: ", currentShotInd)
-            if not currentShot.enabled:
-                print("    current Shot is disabled")
-                previousShotInd = self.getPreviousEnabledShotIndex(currentShotInd)
-                if -1 < previousShotInd:
-                    print("    previous Shot ind is ", previousShotInd)
-                    newFrame = self.getShotByIndex(previousShotInd).end
-            else:
-                print("    current Shot is ENabled")
-                if currentFrame == currentShot.start:
-                    print("      current frame is start")
-                    previousShotInd = self.getPreviousEnabledShotIndex(currentShotInd)
-                    if -1 < previousShotInd:
-                        print("      previous Shot ind is ", previousShotInd)
-                        newFrame = self.getShotByIndex(previousShotInd).end
-                    else:  # case of the very first shot
-                        previousShotInd = currentShotInd
-                        newFrame = currentFrame
-                #  elif currentFrame == currentShot.end:
-                #      newFrame = currentShot.start
-                else:
-                    print("      current frame is middle or end")
-                    previousShotInd = currentShotInd
-                    newFrame = currentShot.start
-
-        elif "START" == boundaryMode:
-            # get current shot in the WHOLE list (= even disabled)
-            currentShotInd = self.getCurrentShotIndex()
-            currentShot = self.getShotByIndex(currentShotInd)
-            print("    current Shot: ", currentShotInd)
-            if not currentShot.enabled:
-                print("    current Shot is disabled")
-                previousShotInd = self.getPreviousEnabledShotIndex(currentShotInd)
-                if -1 < previousShotInd:
-                    print("    previous Shot ind is ", previousShotInd)
-                    newFrame = self.getShotByIndex(previousShotInd).start
-            else:
-                print("    current Shot is ENabled")
-
-                previousShotInd = self.getPreviousEnabledShotIndex(currentShotInd)
-                if -1 < previousShotInd:
-                    print("      previous Shot ind is ", previousShotInd)
-                    newFrame = self.getShotByIndex(previousShotInd).start
-                else:  # case of the very first shot
-                    previousShotInd = currentShotInd
-                    newFrame = currentFrame
-
-        elif "END" == boundaryMode:
-            # get current shot in the WHOLE list (= even disabled)
-            currentShotInd = self.getCurrentShotIndex()
-            currentShot = self.getShotByIndex(currentShotInd)
-            print("    current Shot: ", currentShotInd)
-            if not currentShot.enabled:
-                print("    current Shot is disabled")
-                previousShotInd = self.getPreviousEnabledShotIndex(currentShotInd)
-                if -1 < previousShotInd:
-                    print("    previous Shot ind is ", previousShotInd)
-                    newFrame = self.getShotByIndex(previousShotInd).end
-            else:
-                print("    current Shot is ENabled")
-                # if currentFrame == currentShot.start:
-                #     print("      current frame is start")
-                previousShotInd = self.getPreviousEnabledShotIndex(currentShotInd)
-                if -1 < previousShotInd:
-                    print("      previous Shot ind is ", previousShotInd)
-                    newFrame = self.getShotByIndex(previousShotInd).end
-                else:  # case of the very first shot
-                    previousShotInd = currentShotInd
-                    newFrame = currentFrame
-                #  elif currentFrame == currentShot.end:
-                #      newFrame = currentShot.start
-                # else:
-                #     print("      current frame is middle or end")
-                #     previousShotInd = currentShotInd
-                #     newFrame = currentShot.end
-
-        self.setCurrentShotByIndex(previousShotInd)
-        self.setSelectedShotByIndex(previousShotInd)
-        bpy.context.scene.frame_set(newFrame)
-
+        previousShotInd, newFrame = timeline.getPreviousShotBoundary(
+            self.getCurrentShotIndex(), currentFrame, boundaryMode=boundaryMode
+        )
+        self._goToShotFrame(previousShotInd, newFrame)
         return newFrame
 
     # works only on current take
     def goToNextShotBoundary(self, currentFrame, ignoreDisabled=False, boundaryMode="ANY"):
-        # print(" ** -- ** goToNextShotBoundary")
-        if not len(self.get_shots()):
+        timeline = self._getCurrentTakeTimeline()
+        if timeline is None:
             return ()
 
-        #   nextShot = None
-        nextShotInd = -1
-        newFrame = currentFrame
-
-        # in shot play mode the current frame is supposed to be in the current shot
-        # if True or bpy.context.window_manager.UAS_shot_manager_shots_play_mode:
-
-        if "ANY" == boundaryMode:
-            # get current shot in the WHOLE list (= even disabled)
-            currentShotInd = self.getCurrentShotIndex()
-            currentShot = self.getShotByIndex(currentShotInd)
-            print("    current Shot: ", currentShotInd)
-            if not currentShot.enabled:
-                print("    current Shot is disabled")
-                nextShotInd = self.getNextEnabledShotIndex(currentShotInd)
-                if -1 < nextShotInd:
-                    print("    next Shot ind is ", nextShotInd)
-                    newFrame = self.getShotByIndex(nextShotInd).start
-            else:
-                print("    current Shot is ENabled")
-                if currentFrame == currentShot.end:
-                    print("      current frame is end")
-                    nextShotInd = self.getNextEnabledShotIndex(currentShotInd)
-                    if -1 < nextShotInd:
-                        print("      next Shot ind is ", nextShotInd)
-                        newFrame = self.getShotByIndex(nextShotInd).start
-                    else:  # case of the very last shot
-                        nextShotInd = currentShotInd
-                        newFrame = currentFrame
-                #  elif currentFrame == currentShot.end:
-                #      newFrame = currentShot.start
-                else:
-                    print("      current frame is middle or start")
-                    nextShotInd = currentShotInd
-                    newFrame = currentShot.end
-
-        elif "START" == boundaryMode:
-            # get current shot in the WHOLE list (= even disabled)
-            currentShotInd = self.getCurrentShotIndex()
-            currentShot = self.getShotByIndex(currentShotInd)
-            print("    current Shot: ", currentShotInd)
-            if not currentShot.enabled:
-                print("    current Shot is disabled")
-                nextShotInd = self.getNextEnabledShotIndex(currentShotInd)
-                if -1 < nextShotInd:
-                    print("    next Shot ind is ", nextShotInd)
-                    newFrame = self.getShotByIndex(nextShotInd).start
-            else:
-                print("    current Shot is ENabled")
-                # if currentFrame == currentShot.end:
-                #    print("      current frame is end")
-                nextShotInd = self.getNextEnabledShotIndex(currentShotInd)
-                if -1 < nextShotInd:
-                    print("      next Shot ind is ", nextShotInd)
-                    newFrame = self.getShotByIndex(nextShotInd).start
-                else:  # case of the very last shot
-                    nextShotInd = currentShotInd
-                    newFrame = currentFrame
-
-        elif "END" == boundaryMode:
-            # get current shot in the WHOLE list (= even disabled)
-            currentShotInd = self.getCurrentShotIndex()
-            currentShot = self.getShotByIndex(currentShotInd)
-            print("    current Shot: ", currentShotInd)
-            if not currentShot.enabled:
-                print("    current Shot is disabled")
-                nextShotInd = self.getNextEnabledShotIndex(currentShotInd)
-                if -1 < nextShotInd:
-                    print("    next Shot ind is ", nextShotInd)
-                    newFrame = self.getShotByIndex(nextShotInd).end
-            else:
-                print("    current Shot is ENabled")
-                if currentFrame == currentShot.end:
-                    print("      current frame is end")
-                    nextShotInd = self.getNextEnabledShotIndex(currentShotInd)
-                    if -1 < nextShotInd:
-                        print("      next Shot ind is ", nextShotInd)
-                        newFrame = self.getShotByIndex(nextShotInd).end
-                    else:  # case of the very last shot
-                        nextShotInd = currentShotInd
-                        newFrame = currentFrame
-                #  elif currentFrame == currentShot.end:
-                #      newFrame = currentShot.start
-                else:
-                    print("      current frame is middle or start")
-                    nextShotInd = currentShotInd
-                    newFrame = currentShot.end
-
-        self.setCurrentShotByIndex(nextShotInd)
-        self.setSelectedShotByIndex(nextShotInd)
-        bpy.context.scene.frame_set(newFrame)
-
+        nextShotInd, newFrame = timeline.getNextShotBoundary(
+            self.getCurrentShotIndex(), currentFrame, boundaryMode=boundaryMode
+        )
+        self._goToShotFrame(nextShotInd, newFrame)
         return newFrame
 
     # works only on current take
@@ -2435,48 +2234,14 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
 
     # wkip ignoreDisabled pas encore implémenté ici!!!!
     def goToPreviousFrame(self, currentFrame, ignoreDisabled=False):
-        #  print(" ** -- ** goToPreviousFrame")
-        if not len(self.get_shots()):
+        timeline = self._getCurrentTakeTimeline()
+        if timeline is None:
             return ()
 
-        #  previousShot = None
-        previousShotInd = -1
-        newFrame = currentFrame
-
         # in shot play mode the current frame is supposed to be in the current shot
         if bpy.context.window_manager.UAS_shot_manager_shots_play_mode:
-
-            # get current shot in the WHOLE list (= even disabled)
-            currentShotInd = self.getCurrentShotIndex()
-            currentShot = self.getShotByIndex(currentShotInd)
-            #    print("    current Shot: ", currentShotInd)
-            if not currentShot.enabled:
-                #       print("    current Shot is disabled")
-                previousShotInd = self.getPreviousEnabledShotIndex(currentShotInd)
-                if -1 < previousShotInd:
-                    #           print("    previous Shot ind is ", previousShotInd)
-                    newFrame = self.getShotByIndex(previousShotInd).end
-            else:
-                #        print("    current Shot is ENabled")
-                if currentFrame == currentShot.start:
-                    #           print("      current frame is start")
-                    previousShotInd = self.getPreviousEnabledShotIndex(currentShotInd)
-                    if -1 < previousShotInd:
-                        #              print("      previous Shot ind is ", previousShotInd)
-                        newFrame = self.getShotByIndex(previousShotInd).end
-                    else:  # case of the very first shot
-                        previousShotInd = currentShotInd
-                        newFrame = currentFrame
-                #  elif currentFrame == currentShot.end:
-                #      newFrame = currentShot.start
-                else:
-                    print("      current frame is middle or end")
-                    previousShotInd = currentShotInd
-                    newFrame = currentFrame - 1
-
-            self.setCurrentShotByIndex(previousShotInd)
-            self.setSelectedShotByIndex(previousShotInd)
-            bpy.context.scene.frame_set(newFrame)
+            previousShotInd, newFrame = timeline.getPreviousFrame(self.getCurrentShotIndex(), currentFrame)
+            self._goToShotFrame(previousShotInd, newFrame)
 
         # in standard play mode behavior is the classic one
         else:
@@ -2487,48 +2252,14 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
 
     # works only on current take
     def goToNextFrame(self, currentFrame, ignoreDisabled=False):
-        #   print(" ** -- ** goToNextShotBoundary")
-        if not len(self.get_shots()):
+        timeline = self._getCurrentTakeTimeline()
+        if timeline is None:
             return ()
 
-        #  nextShot = None
-        nextShotInd = -1
-        newFrame = currentFrame
-
         # in shot play mode the current frame is supposed to be in the current shot
         if bpy.context.window_manager.UAS_shot_manager_shots_play_mode:
-
-            # get current shot in the WHOLE list (= even disabled)
-            currentShotInd = self.getCurrentShotIndex()
-            currentShot = self.getShotByIndex(currentShotInd)
-            #    print("    current Shot: ", currentShotInd)
-            if not currentShot.enabled:
-                #        print("    current Shot is disabled")
-                nextShotInd = self.getNextEnabledShotIndex(currentShotInd)
-                if -1 < nextShotInd:
-                    #            print("    next Shot ind is ", nextShotInd)
-                    newFrame = self.getShotByIndex(nextShotInd).start
-            else:
-                #        print("    current Shot is ENabled")
-                if currentFrame == currentShot.end:
-                    #           print("      current frame is end")
-                    nextShotInd = self.getNextEnabledShotIndex(currentShotInd)
-                    if -1 < nextShotInd:
-                        #              print("      next Shot ind is ", nextShotInd)
-                        newFrame = self.getShotByIndex(nextShotInd).start
-                    else:  # case of the very last shot
-                        nextShotInd = currentShotInd
-                        newFrame = currentFrame
-                #  elif currentFrame == currentShot.end:
-                #      newFrame = currentShot.start
-                else:
-                    #         print("      current frame is middle or start")
-                    nextShotInd = currentShotInd
-                    newFrame = currentFrame + 1
-
-            self.setCurrentShotByIndex(nextShotInd)
-            self.setSelectedShotByIndex(nextShotInd)
-            bpy.context.scene.frame_set(newFrame)
+            nextShotInd, newFrame = timeline.getNextFrame(self.getCurrentShotIndex(), currentFrame)
+            self._goToShotFrame(nextShotInd, newFrame)
 
         # in standard play mode behavior is the classic one
         else:
@@ -2537,51 +2268,52 @@ class UAS_ShotManager_Props(MontageInterface, PropertyGroup):
 
         return newFrame
 
-    # works only on current take
-    def getFirstShotIndexContainingFrame(self, frameIndex, ignoreDisabled=False):
-        """Return the first shot containing the specifed frame, -1 if not found"""
-        firstShotInd = -1
+    def _getCurrentTakeTimeline(self):
+        """Return the timeline model of the current take, None if there is no current shot"""
+        takeInd = self.getCurrentTakeIndex()
+        if -1 == takeInd:
+            return None
+        timeline = utils_shots_cache.getTimelineModel(self, takeInd)
+        if not (0 <= self.getCurrentShotIndex() < len(timeline)):
+            return None
+        return timeline
 
-        shotList = self.get_shots()
-        shotFound = False
+    def _goToShotFrame(self, shotIndex, frame):
+        self.setCurrentShotByIndex(shotIndex)
+        self.setSelectedShotByIndex(shotIndex)
+        bpy.context.scene.frame_set(frame)
 
-        if len(shotList):
-            firstShotInd = 0
-            while firstShotInd < len(shotList) and not shotFound:
-                if not ignoreDisabled or shotList[firstShotInd].enabled:
-                    shotFound = shotList[firstShotInd].start <= frameIndex and frameIndex <= shotList[firstShotInd].end
-                firstShotInd += 1
+    # works only on current take
+    def getShotIndicesContainingFrame(self, frameIndex, ignoreDisabled=False):
+        """Return the tupple of the indices of the shots containing the specifed frame, sorted by index"""
+        takeInd = self.getCurrentTakeIndex()
+        if -1 == takeInd:
+            return ()
 
-        if shotFound:
-            firstShotInd = firstShotInd - 1
-        else:
-            firstShotInd = -1
+        intervalIndex = utils_shots_cache.getShotsIntervalIndex(self, takeInd)
+        return intervalIndex.get(ignoreDisabled=ignoreDisabled).getIndicesContainingFrame(frameIndex)
 
-        return firstShotInd
+    # works only on current take
+    def getFirstShotIndexContainingFrame(self, frameIndex, ignoreDisabled=False):
+        """Return the first shot containing the specifed frame, -1 if not found"""
+        takeInd = self.getCurrentTakeIndex()
+        if -1 == takeInd:
+            return -1
+
+        intervalIndex = utils_shots_cache.getShotsIntervalIndex(self, takeInd)
+        return intervalIndex.get(ignoreDisabled=ignoreDisabled).getFirstIndexContainingFrame(frameIndex)
 
     # works only on current take
     def getFirstShotIndexAfterFrame(self, frameIndex, ignoreDisabled=False):
         """Return the first shot after the specifed frame (supposing thanks to getFirstShotIndexContainingFrame than
         frameIndex is not in a shot), -1 if not found
         """
-        firstShotInd = -1
-
-        shotList = self.get_shots()
-        shotFound = False
-
-        if len(shotList):
-            firstShotInd = 0
-            while firstShotInd < len(shotList) and not shotFound:
-                if not ignoreDisabled or shotList[firstShotInd].enabled:
-                    shotFound = frameIndex < shotList[firstShotInd].start
-                firstShotInd += 1
-
-        if shotFound:
-            firstShotInd = firstShotInd - 1
-        else:
-            firstShotInd = -1
+        takeInd = self.getCurrentTakeIndex()
+        if -1 == takeInd:
+            return -1
 
-        return firstShotInd
+        intervalIndex = utils_shots_cache.getShotsIntervalIndex(self, takeInd)
+        return intervalIndex.get(ignoreDisabled=ignoreDisabled).getFirstIndexAfterFrame(frameIndex)
 
     ##############################
 
@@ -28,6 +28,8 @@ from bpy.types import PropertyGroup
 from bpy.props import StringProperty, IntProperty, BoolProperty, PointerProperty, FloatVectorProperty
 
 from shotmanager.utils import utils
+from shotmanager.utils import utils_shots_cache
+from shotmanager.utils import utils_timeline
 from shotmanager.rrs_specific.montage.montage_interface import ShotInterface
 
 import logging
@@ -160,6 +162,7 @@ class UAS_ShotManager_Shot(ShotInterface, PropertyGroup):
     name: StringProperty(name="Name", get=_get_name, set=_set_name)
 
     def _update_enabled(self, context):
+        utils_shots_cache.shotsDataChanged(structureChanged=False)
         self.selectShotInUI()
 
     enabled: BoolProperty(
@@ -185,18 +188,11 @@ class UAS_ShotManager_Shot(ShotInterface, PropertyGroup):
 
     # *** behavior here must match the one of start and end of shot preferences ***
     def _set_start(self, value):
-        duration = self.getDuration()
-        self["start"] = value
-        if self.durationLocked:
-            self["end"] = self.start + duration - 1
-        else:
-            # increase end value if start is superior to end
-            # if self.start > self.end:
-            #     self["end"] = self.start
-
-            # prevent start to go above end (more user error proof)
-            if self.start > self.end:
-                self["start"] = self.end
+        # prevent start to go above end (more user error proof)
+        self["start"], self["end"] = utils_timeline.getShotRangeWithStart(
+            self.start, self.end, value, self.durationLocked
+        )
+        utils_shots_cache.shotsDataChanged(structureChanged=False)
 
     def _update_start(self, context):
         self.selectShotInUI()
@@ -220,18 +216,11 @@ class UAS_ShotManager_Shot(ShotInterface, PropertyGroup):
 
     # *** behavior here must match the one of start and end of shot preferences ***
     def _set_end(self, value):
-        duration = self.getDuration()
-        self["end"] = value
-        if self.durationLocked:
-            self["start"] = self.end - duration + 1
-        else:
-            # reduce start value if end is lowr than start
-            # if self.start > self.end:
-            #    self["start"] = self.end
-
-            # prevent end to go below start (more user error proof)
-            if self.start > self.end:
-                self["end"] = self.start
+        # prevent end to go below start (more user error proof)
+        self["start"], self["end"] = utils_timeline.getShotRangeWithEnd(
+            self.start, self.end, value, self.durationLocked
+        )
+        utils_shots_cache.shotsDataChanged(structureChanged=False)
 
     def _update_end(self, context):
         self.selectShotInUI()
@@ -323,12 +312,16 @@ class UAS_ShotManager_Shot(ShotInterface, PropertyGroup):
         else:
             return False
 
+    def _update_camera(self, context):
+        utils_shots_cache.shotsDataChanged(structureChanged=False)
+
     camera: PointerProperty(
         name="Camera",
         description="Select a Camera",
         type=bpy.types.Object,
         # poll=lambda self, obj: True if obj.type == "CAMERA" else False,
         poll=_filter_cameras,
+        update=_update_camera,
     )
 
     def isCameraValid(self):
@@ -30,6 +30,14 @@ import bpy
 
 from shotmanager.config import config
 from shotmanager.rendering.sm_StampInfo_default_settings import set_StampInfoSettings
+from shotmanager.rendering import rendering_parallel
+from shotmanager.rendering import rendering_cache
+from shotmanager.rendering import rendering_ffmpeg
+from shotmanager.rendering import rendering_pipeline
+from shotmanager.rendering import rendering_manifest
+from shotmanager.rendering import rendering_stampinfo
+from shotmanager.rendering import rendering_audio
+from shotmanager.rendering import rendering_profiler
 
 from shotmanager.utils import utils
 from shotmanager.utils import utils_store_context as utilsStore
@@ -54,6 +62,35 @@ _logger = logging.getLogger(__name__)
 #     return compositedMediaPath
 
 
+def compositeShotVideoInVSE(vse_render, shotSequence, fps, outputPath=None):
+    """Composite the video of a shot from its rendered images, stamp info images and sound in a temporary VSE scene
+    shotSequence: dictionary of the media rendered for the shot, as returned in filesDict["rendered_shot_sequences"]
+    outputPath: path of the composited media. If None, shotSequence["composited_media_path"] is used
+    """
+    # use vse_render to store all the elements to composite
+    vse_render.clearMedia()
+    vse_render.inputBGMediaPath = shotSequence["image_sequence"]
+    _logger.debug(f"\n - BGMediaPath: {vse_render.inputBGMediaPath}")
+    vse_render.inputBGResolution = shotSequence["image_sequence_resolution"]
+
+    if shotSequence["bg"] is not None:
+        vse_render.inputOverMediaPath = shotSequence["bg"]
+        _logger.debug(f"\n - OverMediaPath: {vse_render.inputOverMediaPath}")
+        vse_render.inputOverResolution = shotSequence["bg_resolution"]
+
+    if shotSequence["sound"] is not None:
+        vse_render.inputAudioMediaPath = shotSequence["sound"]
+
+    vse_render.compositeVideoInVSE(
+        fps,
+        1,
+        shotSequence["frame_end"],
+        shotSequence["composited_media_path"] if outputPath is None else outputPath,
+        shotSequence["shot_name"],
+        output_resolution=shotSequence["bg_resolution"],
+    )
+
+
 def launchRenderWithVSEComposite(
     context,
     renderPreset=None,
@@ -72,14 +109,32 @@ def launchRenderWithVSEComposite(
     renderAlsoDisabled=False,
     area=None,
     override_all_viewports=False,
+    parallelRenderWorkers=1,
+    useRenderCache=False,
+    resume=False,
 ):
     """Generate the media for the specified take
     Return a dictionary with a list of all the created files and a list of failed ones
     filesDict = {"rendered_files": newMediaFiles, "failed_files": failedFiles}
     specificFrame: When specified, only this frame is rendered. Handles are ignored and the resulting media in an image, not a video
+    parallelRenderWorkers: when higher than 1, the images, stamp info and sound of the shots are rendered by this
+        number of background Blender processes working on a copy of the file. The shot videos and the sequence video
+        are then composited in the current session. See rendering_parallel
+    The compositing of the shot videos and of the sequence video is done in the VSE or by ffmpeg according to
+        props.renderContext.compositingBackend. See rendering_ffmpeg
+        With ffmpeg, the shot videos are composited in a background thread while the next shots are rendered, up to
+        props.renderContext.renderPipelineQueueSize shots waiting to be composited. See rendering_pipeline
+    useRenderCache: when True, the shot videos which fingerprint has not changed since their last render are reused
+        instead of being rendered again. The report of the cache is returned in filesDict["render_cache_report"].
+        See rendering_cache
+    resume: when True, the job manifest written in the take directory by the previous render is read and only the
+        unfinished stages of the shots which fingerprint has not changed are run. See rendering_manifest
+    The timing of the take, shots, stages and frames is written in the take directory as a json report and as a
+        Chrome trace file, returned in filesDict["profile_report"] and filesDict["profile_trace"].
+        See rendering_profiler
     """
 
-    def _deleteTempFiles(dirPath):
+    def _deleteTempDir(dirPath):
         # delete unsused rendered frames
         if config.devDebug:
             print(f"Cleaning shot temp dir: {dirPath}")
@@ -100,6 +155,9 @@ def launchRenderWithVSEComposite(
             except Exception:
                 print("Cannot delete Dir: ", dirPath)
 
+    def _deleteTempFiles(dirPath):
+        _deleteTempDir(dirPath)
+
         if config.devDebug:
             print(f"Cleaning temp scenes")
 
@@ -111,6 +169,58 @@ def launchRenderWithVSEComposite(
         for s in scenesToDelete:
             bpy.data.scenes.remove(s, do_unlink=True)
 
+    def _generateShotVideo(shotSequence):
+        """Composite the video of a shot from its rendered images, stamp info images and sound
+        shotSequence: dictionary of the media rendered for the shot, as returned in filesDict["rendered_shot_sequences"]
+        """
+        compositedInFfmpeg = False
+        if ffmpegPath is not None:
+            try:
+                rendering_ffmpeg.compositeShotVideo(ffmpegPath, shotSequence, projectFps)
+                compositedInFfmpeg = True
+            except (OSError, RuntimeError) as e:
+                _logger.error(f"{e}\nShot video composited in the VSE")
+        if not compositedInFfmpeg:
+            compositeShotVideoInVSE(vse_render, shotSequence, projectFps)
+
+        deleteTempFiles = not config.devDebug_keepVSEContent
+        if deleteTempFiles:
+            _deleteTempFiles(shotSequence["temp_render_path"])
+
+        _shotVideoDone(shotSequence)
+
+    def _shotVideoDone(shotSequence):
+        mediaPath = shotSequence["composited_media_path"]
+        if not Path(mediaPath).exists():
+            return
+        if renderCache is not None and mediaPath in shotFingerprints:
+            renderCache.store(mediaPath, shotFingerprints[mediaPath])
+        if jobManifest is not None:
+            jobManifest.setStageDone(mediaPath, "video")
+
+    def _submitShotVideo(shotSequence):
+        """Composite the shot video in the compositing thread of the pipeline, or in the main thread if there is
+        no pipeline"""
+        if compositingPipeline is None:
+            _generateShotVideo(shotSequence)
+        else:
+            compositingPipeline.submit(shotSequence)
+            _processPipelineFinishedShots()
+
+    def _processPipelineFinishedShots():
+        # the shots that ffmpeg failed to composite are composited in the VSE, in the main thread
+        for shotSequence, error in compositingPipeline.popFinished():
+            if error is not None:
+                _logger.error(f"{error}\nShot video composited in the VSE")
+                compositeShotVideoInVSE(vse_render, shotSequence, projectFps)
+                if not config.devDebug_keepVSEContent:
+                    _deleteTempFiles(shotSequence["temp_render_path"])
+            _shotVideoDone(shotSequence)
+
+    def _cleanupShotInPipeline(shotSequence):
+        if not config.devDebug_keepVSEContent:
+            _deleteTempDir(shotSequence["temp_render_path"])
+
     # context = bpy.context
     scene = context.scene
     props = scene.UAS_shot_manager_props
@@ -195,6 +305,17 @@ def launchRenderWithVSEComposite(
         renderFrameByFrame = False  # wkip crash a la génération du son si mode framebyframe...
         renderWithOpengl = True
 
+    # OpenGL renders require a 3D viewport, which is not available when Blender runs in background (eg: in the
+    # parallel render workers). The images are then rendered by the engine specified for the OpenGL renders
+    backgroundRenderEngine = None
+    if renderWithOpengl and bpy.app.background:
+        renderWithOpengl = False
+        backgroundRenderEngine = props.renderContext.renderEngineOpengl
+
+    useParallelRender = (
+        1 < parallelRenderWorkers and not fileListOnly and specificFrame is None and not bpy.app.background
+    )
+
     #######################
     # store current scene settings
     #######################
@@ -254,7 +375,12 @@ def launchRenderWithVSEComposite(
     # set render quality
     #######################
 
-    if not "PLAYBLAST" == renderMode:
+    if backgroundRenderEngine is not None:
+        scene.render.use_sequencer = False
+        if not "CUSTOM" == backgroundRenderEngine:
+            scene.render.engine = backgroundRenderEngine
+
+    elif not "PLAYBLAST" == renderMode:
         if renderWithOpengl:
             spaces = list()
             if override_all_viewports:
@@ -308,12 +434,86 @@ def launchRenderWithVSEComposite(
     currentTakeRenderTime = previousTakeRenderTime
 
     startRenderTime = time.monotonic()
-    allRenderTimes = dict()
+    profiler = rendering_profiler.RenderProfiler()
+    profiler.begin(f"Take {takeName}", "take")
+    printFrameInfo = props.renderContext.printFrameInfo
 
     startFrameIn3D = -1
     startFrameInEdit = -1
     startShot = None
 
+    failedFiles = []
+    shotsToRenderInWorkers = []
+
+    # compositing backend of the shot videos
+    ffmpegPath = None
+    if "FFMPEG" == props.renderContext.compositingBackend:
+        ffmpegPath = rendering_ffmpeg.getFfmpegPath(props.renderContext.ffmpegPath)
+        if ffmpegPath is None:
+            _logger.warning("ffmpeg executable not found, shot videos are composited in the VSE")
+
+    # the shot videos composited by ffmpeg are processed in a background thread while the next shots are rendered
+    compositingPipeline = None
+    if (
+        ffmpegPath is not None
+        and 0 < props.renderContext.renderPipelineQueueSize
+        and generateShotVideos
+        and specificFrame is None
+        and not fileListOnly
+    ):
+        compositingPipeline = rendering_pipeline.CompositingPipeline(
+            lambda shotSequence: rendering_ffmpeg.compositeShotVideo(ffmpegPath, shotSequence, projectFps),
+            _cleanupShotInPipeline,
+            props.renderContext.renderPipelineQueueSize,
+            profiler=profiler,
+        )
+
+    # the render cache applies only to the shot videos
+    renderCache = None
+    shotFingerprints = dict()
+    if useRenderCache and generateShotVideos and specificFrame is None and not fileListOnly:
+        renderCache = rendering_cache.RenderCache(rootPath + takeName)
+
+    # the job manifest lists the planned outputs and the status of their stages, to resume an interrupted render
+    jobManifest = None
+    if generateShotVideos and specificFrame is None and not fileListOnly:
+        jobManifest = rendering_manifest.RenderJobManifest(rootPath + takeName, resume=resume)
+
+    # the fingerprints are computed once the render settings are applied to the scene. They are kept in the manifest
+    # even when the render is not resumed so that a later render can be
+    if renderCache is not None or jobManifest is not None:
+        fingerprintContext = rendering_cache.FingerprintContext(scene)
+        for shot in shotList:
+            compositedMediaPath = shot.getOutputMediaPath(rootPath=rootPath)
+            shotFingerprints[compositedMediaPath] = rendering_cache.getShotFingerprint(
+                scene,
+                shot,
+                handles,
+                renderHandles,
+                renderPreset=renderPreset,
+                stampInfoCustomSettingsDict=stampInfoCustomSettingsDict,
+                renderSound=renderSound,
+                fingerprintContext=fingerprintContext,
+            )
+            if jobManifest is not None:
+                jobManifest.planShot(shot.name, compositedMediaPath, shotFingerprints[compositedMediaPath])
+        if jobManifest is not None:
+            if generateSequenceVideo:
+                jobManifest.planSequence(f"{rootPath}{takeName}\\{sequenceFileName}.{props.getOutputFileFormat()}")
+            jobManifest.write()
+
+    # audio pre-pass: the sound of the take is mixed once, when the first shot requiring sound is rendered, and the
+    # wav files of the remaining shots are cut from this mix
+    useAudioPrePass = (
+        renderSound
+        and "TAKE" == props.renderContext.audioMixdownMode
+        and specificFrame is None
+        and not fileListOnly
+        and not useParallelRender
+    )
+    preMixedAudioDir = rootPath + takeName + "\\_audio\\"
+    preMixedAudioFiles = None
+
     for i, shot in enumerate(shotList):
         if 0 == i:
             startFrameIn3D = shot.start
@@ -336,10 +536,35 @@ def launchRenderWithVSEComposite(
         if not rerenderExistingShotVideos:
             if Path(compositedMediaPath).exists():
                 print(f" - File {Path(compositedMediaPath).name} already computed")
+                if jobManifest is not None:
+                    jobManifest.setShotStatus(compositedMediaPath, "REUSED")
+                continue
+
+        if jobManifest is not None:
+            resumeStage = jobManifest.getResumeStage(compositedMediaPath)
+            if "video" == resumeStage:
+                print(f" - File {Path(compositedMediaPath).name} already rendered by the resumed job")
+                continue
+            elif "images" == resumeStage:
+                print(f" - Images of {Path(compositedMediaPath).name} already rendered by the resumed job")
+                _submitShotVideo(jobManifest.getShotSequence(compositedMediaPath))
+                continue
+
+        if renderCache is not None:
+            if renderCache.check(shot.name, compositedMediaPath, shotFingerprints[compositedMediaPath]):
+                print(f" - File {Path(compositedMediaPath).name} reused from the render cache")
+                if jobManifest is not None:
+                    jobManifest.setShotStatus(compositedMediaPath, "REUSED")
                 continue
 
+        if not fileListOnly and useParallelRender:
+            # the shot is rendered by the workers, after the loop
+            shotsToRenderInWorkers.append(shot)
+            continue
+
         if not fileListOnly:
             startShotRenderTime = time.monotonic()
+            profiler.begin(shot.name, "shot")
             infoStr = "\n----------------------------------------------------"
             infoStr += f"\n\n  Rendering Shot: {shot.getName_PathCompliant(withPrefix=True)} - {shot.getDuration()} fr."
             infoStr += "\n  ---------------"
@@ -373,7 +598,8 @@ def launchRenderWithVSEComposite(
             #  props.enableBGSoundForShot()
 
             # set scene as current
-            context.window.scene = scene
+            if context.window is not None:  # case where Blender is running in background
+                context.window.scene = scene
             #     props.setCurrentShotByIndex(i)
             #     props.setSelectedShotByIndex(i)
 
@@ -391,7 +617,9 @@ def launchRenderWithVSEComposite(
             scene.camera = shot.camera
             print("Scene.name:", scene.name)
             print("Scene.camera:", scene.camera.name)
-            if override_all_viewports:
+            if bpy.app.background:
+                pass  # no viewport
+            elif override_all_viewports:
                 for area in context.screen.areas:
                     utils.setCurrentCameraToViewport2(context, area)
             else:
@@ -407,11 +635,14 @@ def launchRenderWithVSEComposite(
 
             renderShotContent = True
             if renderShotContent and not fileListOnly:
+                profiler.begin("images", "stage", diskPath=newTempRenderPath, shot=shot.name)
 
                 if renderFrameByFrame:
                     for f, currentFrame in enumerate(range(scene.frame_start, scene.frame_end + 1)):
+                        profiler.begin(f"Frame {currentFrame}", "frame", shot=shot.name)
                         # scene.frame_current = currentFrame
                         scene.frame_set(currentFrame)
+                        profiler.addCount("frame_set")
 
                         # scene.render.filepath = shot.getOutputFileName(
                         #     rootFilePath=rootPath, specificFrame=scene.frame_current, fullPath=True
@@ -420,11 +651,12 @@ def launchRenderWithVSEComposite(
                             rootPath=rootPath, specificFrame=scene.frame_current
                         )
 
-                        print("      \n")
                         textInfo = f"Frame: {currentFrame}  ( {f + 1} / {numFramesInShot} )"
                         textInfo02 = f"Shot: {shot.name}"
-                        print("      ------------------------------------------")
-                        print("      \n" + textInfo + "  -  " + textInfo02)
+                        if printFrameInfo:
+                            print("      \n")
+                            print("      ------------------------------------------")
+                            print("      \n" + textInfo + "  -  " + textInfo02)
 
                         if "PLAYBLAST" == renderMode and renderPreset.stampRenderInfo and not preset_useStampInfo:
                             bpy.context.scene.render.use_stamp_frame = False
@@ -442,11 +674,15 @@ def launchRenderWithVSEComposite(
                             # bpy.ops.render.render(animation=False, write_still=True)
 
                             currentFrameRenderTime = time.monotonic()
-                            print(
-                                f"      \nFrame render time: {(currentFrameRenderTime - previousFrameRenderTime):0.2f} sec."
-                            )
+                            if printFrameInfo:
+                                print(
+                                    "      \nFrame render time: "
+                                    f"{(currentFrameRenderTime - previousFrameRenderTime):0.2f} sec."
+                                )
                             previousFrameRenderTime = currentFrameRenderTime
 
+                        profiler.end()
+
                         # currentFrameRenderTime = time.monotonic()
                         # print(
                         #     f"      \nFrame render time: {(currentFrameRenderTime - previousFrameRenderTime):0.2f} sec."
@@ -480,11 +716,14 @@ def launchRenderWithVSEComposite(
                         # _logger.debug("ici PAS loop pas playblast")
                         bpy.ops.render.render(animation=True, write_still=False)
 
+                profiler.end(num_frames=numFramesInShot)
+
             #######################
             # render stamped info
             #######################
             if preset_useStampInfo:
-                renderStampedInfoForShot(
+                profiler.begin("stamp_info", "stage", shot=shot.name)
+                stampInfoTimes = renderStampedInfoForShot(
                     stampInfoSettings,
                     props,
                     takeName,
@@ -495,7 +734,14 @@ def launchRenderWithVSEComposite(
                     render_handles=renderHandles,
                     specificFrame=specificFrame,
                     stampInfoCustomSettingsDict=stampInfoCustomSettingsDict,
-                    verbose=False,
+                    useTemplate="TEMPLATE" == props.renderContext.stampInfoGenerationMode,
+                    verbose=printFrameInfo,
+                    profiler=profiler,
+                )
+                profiler.end(
+                    mode=stampInfoTimes["mode"],
+                    template_time=stampInfoTimes["template_time"],
+                    per_frame_time=stampInfoTimes["per_frame_time"],
                 )
 
             # print render time
@@ -503,14 +749,35 @@ def launchRenderWithVSEComposite(
 
             deltaTime = time.monotonic() - startShotRenderTime
             print(f"      \nShot render time (images only): {deltaTime:0.2f} sec.")
-            allRenderTimes[shot.name + "_" + "images"] = deltaTime
 
             #######################
             # render sound
             #######################
 
             audioFilePath = None
-            if specificFrame is None and renderSound:
+            if useAudioPrePass and preMixedAudioFiles is None:
+                profiler.begin("audio_pre_pass", "stage", diskPath=preMixedAudioDir)
+                try:
+                    preMixedAudioFiles = rendering_audio.prepareShotsAudio(
+                        scene,
+                        shotList[i:],
+                        handles if renderHandles else 0,
+                        preMixedAudioDir,
+                        props.renderShotPrefix(),
+                        numProcesses=props.renderContext.audioCutProcesses,
+                    )
+                except Exception as e:
+                    _logger.exception(f"Audio pre-pass failed, the sound is mixed for each shot: {e}")
+                    preMixedAudioFiles = dict()
+                profiler.end()
+
+            profiler.begin("sound", "stage", shot=shot.name)
+            preMixedAudioFilePath = None if preMixedAudioFiles is None else preMixedAudioFiles.get(shot.name)
+            if preMixedAudioFilePath is not None and Path(preMixedAudioFilePath).exists():
+                audioFilePath = preMixedAudioFilePath
+                print(f"\n Sound for shot {shot.name}:  {audioFilePath}")
+
+            elif specificFrame is None and renderSound:
                 # render sound
                 audioFilePath = (
                     newTempRenderPath + f"{props.renderShotPrefix()}_{shot.getName_PathCompliant()}" + ".wav"
@@ -548,6 +815,7 @@ def launchRenderWithVSEComposite(
                 # https://blenderartists.org/t/scripterror-mixdown-operstor/548056/4
                 bpy.ops.sound.mixdown(filepath=str(audioFilePath), relative_path=False, container="WAV", codec="PCM")
                 # bpy.ops.sound.mixdown(filepath=audioFilePath, relative_path=False, container="MP3", codec="MP3")
+            profiler.end()
 
             renderedImgSeq = newTempRenderPath + shot.getOutputMediaPath(providePath=False, genericFrame=True)
             renderedImgSeq_resolution = renderResolution
@@ -561,91 +829,53 @@ def launchRenderWithVSEComposite(
                 infoImgSeq_resolution = renderResolutionFramed
                 # infoImgSeq_resolution = stampInfoSettings.getRenderResolutionForStampInfo(scene)
 
+            #######################
+            # Collect rendered media
+            #######################
+            shotSequence = dict()
+            shotSequence["shot_name"] = shot.getName_PathCompliant()
+            shotSequence["composited_media_path"] = compositedMediaPath
+            shotSequence["temp_render_path"] = newTempRenderPath
+
+            if specificFrame is None:
+                shotSequence["image_sequence"] = renderedImgSeq
+            else:
+                shotSequence["image_sequence"] = newTempRenderPath + shot.getOutputMediaPath(
+                    providePath=False, specificFrame=specificFrame
+                )
+            shotSequence["image_sequence_resolution"] = renderedImgSeq_resolution
+
+            shotSequence["bg"] = infoImgSeq
+            shotSequence["bg_resolution"] = infoImgSeq_resolution
+            shotSequence["sound"] = audioFilePath
+
+            if specificFrame is None:
+                video_frame_end = shot.end - shot.start + 1
+                if renderHandles:
+                    video_frame_end += 2 * handles
+            else:
+                video_frame_end = 1
+            shotSequence["frame_end"] = video_frame_end
+
             if generateShotVideos:
 
                 #######################
                 # Generate shot video
                 #######################
 
-                # use vse_render to store all the elements to composite
-
-                # frameIndStr = "####" if specificFrame is None else f"{specificFrame:04}"
-                # vse_render.clearMedia(scene)
-                # vse_render.inputOverMediaPath = (
-                #     newTempRenderPath
-                #     + shot.getOutputFileName(fullPath=False, noExtension=True)
-                #     + "_"
-                #     + frameIndStr
-                #     + ".png"
-                # )
-                vse_render.clearMedia()
-                if specificFrame is None:
-                    vse_render.inputBGMediaPath = renderedImgSeq
-                else:
-                    vse_render.inputBGMediaPath = newTempRenderPath + shot.getOutputMediaPath(
-                        providePath=False, specificFrame=specificFrame
-                    )
-
-                _logger.debug(f"\n - BGMediaPath: {vse_render.inputBGMediaPath}")
-                vse_render.inputBGResolution = renderedImgSeq_resolution
-
-                if preset_useStampInfo:
-                    frameIndStr = "#####" if specificFrame is None else f"{specificFrame:05}"
-                    _logger.debug(f"\n - specificFrame: {specificFrame}")
-                    vse_render.inputOverMediaPath = infoImgSeq
-                    _logger.debug(f"\n - OverMediaPath: {vse_render.inputOverMediaPath}")
-                    vse_render.inputOverResolution = infoImgSeq_resolution
-
-                if specificFrame is None and renderSound:
-                    vse_render.inputAudioMediaPath = audioFilePath
-
-                if specificFrame is None:
-                    video_frame_end = shot.end - shot.start + 1
-                    if renderHandles:
-                        video_frame_end += 2 * handles
-
-                    vse_render.compositeVideoInVSE(
-                        projectFps,
-                        1,
-                        video_frame_end,
-                        compositedMediaPath,
-                        shot.getName_PathCompliant(),
-                        output_resolution=infoImgSeq_resolution,
-                    )
-                else:
-                    # print(f"compositedMediaPath: {compositedMediaPath}")
-                    vse_render.compositeVideoInVSE(
-                        projectFps,
-                        1,
-                        1,
-                        compositedMediaPath,
-                        shot.getName_PathCompliant(),
-                        output_resolution=infoImgSeq_resolution,
-                    )
-
-                # bpy.ops.render.render("INVOKE_DEFAULT", animation=False, write_still=True)
-                # bpy.ops.render.render('INVOKE_DEFAULT', animation = True)
-                # bpy.ops.render.opengl ( animation = True )
-
-                deleteTempFiles = not config.devDebug_keepVSEContent
-                if deleteTempFiles:
-                    _deleteTempFiles(newTempRenderPath)
+                if compositingPipeline is not None:
+                    compositingPipeline.addStageTime("render", time.monotonic() - startShotRenderTime)
+                if jobManifest is not None:
+                    jobManifest.setStageDone(compositedMediaPath, "images", shotSequence=shotSequence)
+                with profiler.span("video", "stage", shot=shot.name, pipelined=compositingPipeline is not None):
+                    _submitShotVideo(shotSequence)
 
             else:
                 #######################
                 # Collect rendered image sequences
                 #######################
-                videoAndSound = dict()
 
-                videoAndSound["image_sequence"] = renderedImgSeq
-                videoAndSound["image_sequence_resolution"] = renderedImgSeq_resolution
-
-                videoAndSound["bg_resolution"] = infoImgSeq_resolution
-                if preset_useStampInfo:
-                    videoAndSound["bg"] = infoImgSeq
-                videoAndSound["sound"] = audioFilePath
-
-                renderedShotSequencesArr.append(videoAndSound)
+                renderedShotSequencesArr.append(shotSequence)
 
             #  print(f"** renderedShotSequencesArr: {renderedShotSequencesArr}")
 
@@ -654,21 +884,73 @@ def launchRenderWithVSEComposite(
 
             deltaTime = time.monotonic() - startShotRenderTime
             print(f"      \nShot render time (incl. video): {deltaTime:0.2f} sec.")
-            allRenderTimes[shot.name + "_" + "full"] = deltaTime
+            profiler.end()
 
             print("----------------------------------------")
 
+    #######################
+    # render the shots in parallel workers
+    #######################
+
+    if len(shotsToRenderInWorkers):
+        profiler.begin("workers", "stage", num_shots=len(shotsToRenderInWorkers), num_workers=parallelRenderWorkers)
+        workersResult = rendering_parallel.renderShotsInWorkers(
+            scene,
+            shotsToRenderInWorkers,
+            parallelRenderWorkers,
+            workDir=rootPath + takeName + "\\_parallel_render\\",
+            renderArgs={
+                "render_preset": None if renderPreset is None else renderPreset.renderMode,
+                "take_index": takeIndex,
+                "file_path": rootPath,
+                "use_stamp_info": useStampInfo,
+                "stamp_info_custom_settings": stampInfoCustomSettingsDict,
+                "render_handles": render_handles,
+                "render_sound": renderSound,
+            },
+        )
+        profiler.end(failed_shots=len(workersResult["failed_shots"]))
+
+        for shot in shotsToRenderInWorkers:
+            shotSequence = workersResult["shot_sequences"].get(shot.name, None)
+            if shotSequence is None:
+                compositedMediaPath = shot.getOutputMediaPath(rootPath=rootPath)
+                print(f" *** Shot {shot.name} failed: {workersResult['failed_shots'].get(shot.name, '')}")
+                failedFiles.append(compositedMediaPath)
+                if jobManifest is not None:
+                    jobManifest.setShotStatus(
+                        compositedMediaPath, "FAILED", error=workersResult["failed_shots"].get(shot.name, None)
+                    )
+                if compositedMediaPath in newMediaFiles:
+                    newMediaFiles.remove(compositedMediaPath)
+                if compositedMediaPath in sequenceFiles:
+                    sequenceFiles.remove(compositedMediaPath)
+                continue
+
+            if generateShotVideos:
+                if jobManifest is not None:
+                    jobManifest.setStageDone(shotSequence["composited_media_path"], "images", shotSequence=shotSequence)
+                with profiler.span("video", "stage", shot=shot.name, pipelined=compositingPipeline is not None):
+                    _submitShotVideo(shotSequence)
+            else:
+                renderedShotSequencesArr.append(shotSequence)
+
+    if compositingPipeline is not None:
+        with profiler.span("pipeline_drain", "stage"):
+            compositingPipeline.close()
+            _processPipelineFinishedShots()
+
     #######################
     # render sequence video
     #######################
 
     deltaTime = time.monotonic() - startRenderTime
     print(f"      \nAll shots render time: {deltaTime:0.2f} sec.")
-    allRenderTimes["AllShots"] = deltaTime
 
     startSequenceRenderTime = time.monotonic()
     sequenceOutputFullPath = ""
     if generateSequenceVideo and specificFrame is None:
+        profiler.begin("sequence_video", "stage")
 
         if generateShotVideos:
             #######################
@@ -680,7 +962,18 @@ def launchRenderWithVSEComposite(
 
             if not fileListOnly:
                 # print(f"sequenceFiles: {sequenceFiles}")
-                vse_render.buildSequenceVideo(sequenceFiles, sequenceOutputFullPath, handles, projectFps)
+                sequenceBuiltInFfmpeg = False
+                if ffmpegPath is not None and len(sequenceFiles):
+                    try:
+                        sequenceBuiltInFfmpeg = rendering_ffmpeg.buildSequenceVideo(
+                            ffmpegPath, sequenceFiles, sequenceOutputFullPath, handles, projectFps
+                        )
+                    except (OSError, RuntimeError, ValueError) as e:
+                        _logger.error(f"{e}\nSequence video built in the VSE")
+                if not sequenceBuiltInFfmpeg:
+                    vse_render.buildSequenceVideo(sequenceFiles, sequenceOutputFullPath, handles, projectFps)
+                if jobManifest is not None:
+                    jobManifest.setSequenceDone()
 
                 # currentTakeRenderTime = time.monotonic()
                 # print(f"      \nTake render time: {(currentTakeRenderTime - previousTakeRenderTime):0.2f} sec.")
@@ -723,7 +1016,17 @@ def launchRenderWithVSEComposite(
 
         deltaTime = time.monotonic() - startSequenceRenderTime
         print(f"      \nSequence video render time: {deltaTime:0.2f} sec.")
-        allRenderTimes["SequenceVideo"] = deltaTime
+        profiler.end()
+
+    # the wav files of the shots are used until the sequence video is built
+    if preMixedAudioFiles is not None and generateShotVideos and not config.devDebug_keepVSEContent:
+        for audioFilePath in preMixedAudioFiles.values():
+            if Path(audioFilePath).exists():
+                os.remove(audioFilePath)
+        try:
+            os.rmdir(preMixedAudioDir)
+        except OSError:
+            pass
 
     # playblastInfos = {"startFrameIn3D": startFrameIn3D, "startFrameInEdit": startFrameInEdit}
     renderInfo["startFrameIn3D"] = startFrameIn3D
@@ -732,26 +1035,44 @@ def launchRenderWithVSEComposite(
     # startFrameIn3D = -1
     # startFrameInEdit = -1
 
-    failedFiles = []
     filesDict = {
         "rendered_files": newMediaFiles,
         "failed_files": failedFiles,
         "sequence_video_file": sequenceOutputFullPath,
+        "rendered_shot_sequences": renderedShotSequencesArr,
     }
 
     if "PLAYBLAST" == renderMode:
         filesDict["playblastInfos"] = renderInfo
 
+    if jobManifest is not None:
+        jobManifest.finish()
+        filesDict["job_manifest"] = jobManifest.filePath
+
+    if compositingPipeline is not None:
+        filesDict["pipeline_report"] = compositingPipeline.getReport()
+        compositingPipeline.printReport()
+
+    if renderCache is not None:
+        filesDict["render_cache_report"] = renderCache.getReport()
+        renderCache.printReport()
+
     deltaTime = time.monotonic() - startRenderTime
     print(f"      \nFull Sequence render time: {deltaTime:0.2f} sec.")
-    allRenderTimes["SequenceAndShots"] = deltaTime
+    profiler.end()
 
-    printAllRenderTimes = True  # config.devDebug
-    if printAllRenderTimes:
-        print("\nRender times:")
-        for key, value in allRenderTimes.items():
-            print(f"{key:>20}: {value:0.2f} sec.")
-        print("\n")
+    if not fileListOnly:
+        profileFilePath = rootPath + takeName + "\\_render_profile.json"
+        traceFilePath = rootPath + takeName + "\\_render_trace.json"
+        try:
+            Path(profileFilePath).parent.mkdir(parents=True, exist_ok=True)
+            profiler.writeJson(profileFilePath)
+            profiler.writeChromeTrace(traceFilePath)
+            filesDict["profile_report"] = profileFilePath
+            filesDict["profile_trace"] = traceFilePath
+        except OSError as e:
+            _logger.error(f"Cannot write render profile {profileFilePath}: {e}")
+    profiler.printSummary()
 
     #######################
     # restore current scene settings
@@ -778,7 +1099,9 @@ def renderStampedInfoForShot(
     render_handles=True,
     specificFrame=None,
     stampInfoCustomSettingsDict=None,
+    useTemplate=False,
     verbose=False,
+    profiler=None,
 ):
     """Launch the rendering or the frames of the shot, with Stamp Info
 
@@ -786,11 +1109,17 @@ def renderStampedInfoForShot(
     and the state of the scene.
     The display itself of the properties is NOT modified here, it is supposed to be already
     set thanks to a call to set_StampInfoSettings
+    useTemplate: if True, the layout of the shot is rendered once by Stamp Info and only the frame fields are drawn
+        for each frame. See rendering_stampinfo
+    profiler: optional RenderProfiler in which the frames are recorded as spans and the writes of the Stamp Info
+        properties are counted
+    Return a dictionary with the generation mode and the cost of each frame, in seconds
     """
     _logger.debug("\n - * - *renderStampedInfoForShot *** ")
     props = shotManagerProps
     scene = props.parentScene
-    verbose = True
+    if profiler is not None:
+        stampInfoSettings = profiler.countWrites(stampInfoSettings, counterName="stamp_info_rna_writes")
     if stampInfoCustomSettingsDict is not None:
         print(f"*** customFileFullPath: {stampInfoCustomSettingsDict['customFileFullPath']}")
         if "customFileFullPath" in stampInfoCustomSettingsDict:
@@ -883,13 +1212,62 @@ def renderStampedInfoForShot(
     elif not render_handles:
         render_frame_end = shot.end
 
-    for f, currentFrame in enumerate(range(render_frame_start, render_frame_end + 1)):
+    # the values of these properties don't depend on the frame
+    stampInfoSettings.shotName = f"{props.renderShotPrefix()}_{shot.name}"
+    # stampInfoSettings.shotName = f"{shot.name}"
+
+    if stampInfoCustomSettingsDict is not None:
+        if True or "asset_tracking_step" in stampInfoCustomSettingsDict:
+            stampInfoSettings.bottomNoteUsed = True
+            stampInfoSettings.bottomNote = "Step: " + stampInfoCustomSettingsDict["asset_tracking_step"]
+        else:
+            stampInfoSettings.bottomNoteUsed = False
+            stampInfoSettings.bottomNote = ""
+
+    stampInfoSettings.cameraName = shot.camera.name
+    stampInfoSettings.renderRootPath = newTempRenderPath
+
+    frames = list(range(render_frame_start, render_frame_end + 1))
+    startTime = time.monotonic()
+    stampInfoTimes = None
+
+    if useTemplate and specificFrame is None and rendering_stampinfo.isTemplateModeAvailable(camera=shot.camera):
+        editDuration = props.getEditDuration()
+        # the labels are drawn only if Stamp Info draws the labels of its properties
+        useLabels = getattr(stampInfoSettings, "stampPropertyLabel", True)
+
+        def _getFrameFieldsLines(frame, frameFieldsUsed):
+            lines = []
+            if frameFieldsUsed["currentFrameUsed"]:
+                lines.append(("3D Frame: " if useLabels else "") + f"{frame}")
+            if frameFieldsUsed["videoFrameUsed"]:
+                lines.append(
+                    ("Video Frame: " if useLabels else "") + f"{frame - scene.frame_start + 1} / {numFramesInShot}"
+                )
+            if frameFieldsUsed["edit3DFrameUsed"]:
+                editFrame = props.getEditTime(shot, frame, referenceLevel="GLOBAL_EDIT")
+                lines.append(("Edit Frame: " if useLabels else "") + f"{editFrame} / {editDuration}")
+            return lines
+
+        try:
+            stampInfoTimes = rendering_stampinfo.renderStampInfoFromTemplate(
+                stampInfoSettings, scene, frames, newTempRenderPath, _getFrameFieldsLines
+            )
+            stampInfoTimes["mode"] = "TEMPLATE"
+        except Exception as e:
+            _logger.exception(f"Stamp Info template failed for shot {shot.name}, the frames are fully rendered: {e}")
+
+    for f, currentFrame in enumerate(frames if stampInfoTimes is None else []):
+        if profiler is not None:
+            profiler.begin(f"Stamp Info Frame {currentFrame}", "frame", shot=shot.name)
 
         # to do
         renderStampedInfoForFrame(scene, currentFrame)
 
         # scene.frame_current = currentFrame
         scene.frame_set(currentFrame)
+        if profiler is not None:
+            profiler.addCount("frame_set")
 
         # scene.render.filepath = shot.getOutputFileName(
         #     rootFilePath=rootPath, fullPath=True, specificFrame=scene.frame_current
@@ -905,21 +1283,7 @@ def renderStampedInfoForShot(
                 f"      \nshotFilename: {shotFilename}"
             )
 
-        stampInfoSettings.shotName = f"{props.renderShotPrefix()}_{shot.name}"
-        # stampInfoSettings.shotName = f"{shot.name}"
-
-        if stampInfoCustomSettingsDict is not None:
-            if True or "asset_tracking_step" in stampInfoCustomSettingsDict:
-                stampInfoSettings.bottomNoteUsed = True
-                stampInfoSettings.bottomNote = "Step: " + stampInfoCustomSettingsDict["asset_tracking_step"]
-            else:
-                stampInfoSettings.bottomNoteUsed = False
-                stampInfoSettings.bottomNote = ""
-
-        stampInfoSettings.cameraName = shot.camera.name
         stampInfoSettings.edit3DFrame = props.getEditTime(shot, currentFrame, referenceLevel="GLOBAL_EDIT")
-        stampInfoSettings.renderRootPath = newTempRenderPath
-        print(f"stampInfoSettings.renderRootPath: {stampInfoSettings.renderRootPath}")
         stampInfoSettings.renderTmpImageWithStampedInfo(
             scene,
             currentFrame,
@@ -928,6 +1292,20 @@ def renderStampedInfoForShot(
             verbose=False,
         )
         # stampInfoSettings.renderTmpImageWithStampedInfo(scene, currentFrame, verbose=True)
+        if profiler is not None:
+            profiler.end()
+
+    if stampInfoTimes is None:
+        stampInfoTimes = {
+            "mode": "PER_FRAME",
+            "template_time": 0.0,
+            "per_frame_time": (time.monotonic() - startTime) / max(1, len(frames)),
+            "num_frames": len(frames),
+        }
+    print(
+        f"      Stamp Info ({stampInfoTimes['mode']}): {stampInfoTimes['per_frame_time'] * 1000:0.1f} ms per frame"
+        f" for {stampInfoTimes['num_frames']} frames, template: {stampInfoTimes['template_time']:0.2f} sec."
+    )
 
     ##############
     # restore scene state
@@ -940,6 +1318,8 @@ def renderStampedInfoForShot(
     scene.render.resolution_x = previousResX
     scene.render.resolution_y = previousResY
 
+    return stampInfoTimes
+
 
 def launchRender(context, renderMode, rootPath, area=None):
     # def launchRender(context, renderMode, rootPath, useStampInfo=True, area = None ):
@@ -1109,6 +1489,9 @@ def launchRender(context, renderMode, rootPath, area=None):
                     generateSequenceVideo=preset.generateEditVideo,
                     renderAlsoDisabled=preset.renderAlsoDisabled,
                     area=area,
+                    parallelRenderWorkers=props.renderContext.renderParallelWorkers,
+                    useRenderCache=preset.useRenderCache,
+                    resume=preset.resumeRender,
                 )
 
                 if preset.renderOtioFile:
@@ -1152,6 +1535,7 @@ def launchRender(context, renderMode, rootPath, area=None):
                 render_handles=False,
                 renderSound=preset.renderSound,
                 area=area,
+                parallelRenderWorkers=props.renderContext.renderParallelWorkers,
             )
 
             # open rendered media in a player
@@ -0,0 +1,116 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Audio pre-pass of the render: the sound of the take is mixed down once, then the wav file of each shot is cut from
+this mix, sample accurately, instead of running a mixdown of the scene for each shot.
+The cuts can be done by several processes for very long takes.
+"""
+
+import os
+from pathlib import Path
+import subprocess
+import sys
+import time
+
+import bpy
+
+from shotmanager.config import config
+from shotmanager.utils import utils_wav
+from shotmanager.rendering.rendering_parallel import splitShotsForWorkers, writeJsonFile
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def mixdownSceneAudio(scene, frameStart, frameEnd, filePath):
+    """Mix down the sound of the scene on the range [frameStart, frameEnd] into a PCM wav file"""
+    previousFrameStart = scene.frame_start
+    previousFrameEnd = scene.frame_end
+    scene.frame_start = frameStart
+    scene.frame_end = frameEnd
+    try:
+        bpy.ops.sound.mixdown(filepath=filePath, relative_path=False, container="WAV", codec="PCM")
+    finally:
+        scene.frame_start = previousFrameStart
+        scene.frame_end = previousFrameEnd
+
+
+def _getPythonExecutable():
+    # sys.executable is the Python interpreter bundled with Blender since Blender 2.91, the Blender binary before
+    if "python" in Path(sys.executable).name.lower():
+        return sys.executable
+    return bpy.app.binary_path_python
+
+
+def cutAudioFiles(cuts, numProcesses=1, workDir=None):
+    """Run the specified cuts, as [source path, target path, start sample, num samples], in the current process or
+    in numProcesses Python processes. Raise a RuntimeError if a process fails
+    """
+    if numProcesses <= 1 or len(cuts) < 2:
+        utils_wav.runCuts(cuts)
+        return
+
+    cutsOfProcesses = splitShotsForWorkers([cut[3] for cut in cuts], numProcesses)
+    processes = []
+    for processInd, cutPositions in enumerate(cutsOfProcesses):
+        jobPath = str(Path(workDir) / f"_audio_cuts_{processInd:02}.json")
+        writeJsonFile(jobPath, [cuts[p] for p in cutPositions])
+        processes.append(subprocess.Popen([_getPythonExecutable(), utils_wav.__file__, jobPath]))
+
+    failedProcesses = [process.args[-1] for process in processes if 0 != process.wait()]
+    if len(failedProcesses):
+        raise RuntimeError(f"Audio cut processes failed: {', '.join(failedProcesses)}")
+
+
+def prepareShotsAudio(scene, shots, handles, audioDir, fileNamePrefix, numProcesses=1):
+    """Mix the sound of the range covered by the shots, handles included, and cut the wav file of each shot from it
+    Return a dictionary with, for each shot name, the path of its wav file
+    """
+    startTime = time.monotonic()
+    Path(audioDir).mkdir(parents=True, exist_ok=True)
+
+    mixFrameStart = min(shot.start for shot in shots) - handles
+    mixFrameEnd = max(shot.end for shot in shots) + handles
+    mixPath = str(Path(audioDir) / "_take_audio_mix.wav")
+    mixdownSceneAudio(scene, mixFrameStart, mixFrameEnd, mixPath)
+    mixTime = time.monotonic() - startTime
+
+    sampleRate = utils_wav.getWavSampleRate(mixPath)
+    fps = scene.render.fps / scene.render.fps_base
+
+    audioFiles = dict()
+    cuts = []
+    for shot in shots:
+        # the boundaries of the shots are computed from the frames, so that adjacent shots share their boundary sample
+        startSample = utils_wav.frameToSample(shot.start - handles - mixFrameStart, sampleRate, fps)
+        endSample = utils_wav.frameToSample(shot.end + handles + 1 - mixFrameStart, sampleRate, fps)
+        audioFilePath = str(Path(audioDir) / f"{fileNamePrefix}_{shot.getName_PathCompliant()}.wav")
+        cuts.append([mixPath, audioFilePath, startSample, endSample - startSample])
+        audioFiles[shot.name] = audioFilePath
+
+    cutAudioFiles(cuts, numProcesses=numProcesses, workDir=audioDir)
+
+    if not config.devDebug_keepVSEContent:
+        os.remove(mixPath)
+
+    print(
+        f"\n Audio pre-pass: frames [{mixFrameStart}, {mixFrameEnd}] mixed in {mixTime:0.2f} sec., "
+        f"{len(cuts)} shots cut in {time.monotonic() - startTime - mixTime:0.2f} sec."
+    )
+    return audioFiles
@@ -0,0 +1,596 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Render cache: skip the rendering of the shots that have not changed since their last render
+
+The fingerprint of a shot is made of the hash of each element affecting the pixels and the sound of its video:
+frame range and handles, camera, render-visible objects, their animation, materials and the world, render settings,
+stamp info settings and sound strips. The fingerprints of the rendered shot videos are stored in a json file in the
+directory of the take. A shot is reused if its video exists and its fingerprint has not changed, otherwise the
+components of the fingerprint that differ are reported as the reason of the miss.
+
+The render-visible objects are the objects of the collections rendered by the view layers of the scene, instanced
+collections included; the same objects are taken into account for all the shots.
+The objects are hashed from their original data, not from their state evaluated at the current frame: rest transform
+of the objects without animation, modifiers, constraints, mesh vertices and faces, shape keys, drivers, and the keys
+of the actions of the objects, of their data, shape keys, materials and node trees in the range of the shot.
+"""
+
+from pathlib import Path
+import hashlib
+
+import numpy as np
+
+from shotmanager.rendering.rendering_parallel import readJsonFile, writeJsonFile
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+_cacheFileName = "_render_cache.json"
+
+# properties of the stamp info settings modified for each shot or each frame by the rendering
+_stampInfoPropertiesSetByRender = (
+    "renderRootPath",
+    "customFileFullPath",
+    "takeName",
+    "shotName",
+    "cameraName",
+    "notesUsed",
+    "notesLine01",
+    "notesLine02",
+    "notesLine03",
+    "cornerNoteUsed",
+    "cornerNote",
+    "bottomNoteUsed",
+    "bottomNote",
+    "shotHandles",
+    "edit3DFrame",
+    "edit3DTotalNumber",
+)
+
+# properties of the render settings and of the render context that control the render job but not its outputs
+_renderSettingsJobProperties = (
+    "name",
+    "renderAllTakes",
+    "renderAllShots",
+    "renderAlsoDisabled",
+    "rerenderExistingShotVideos",
+    "resumeRender",
+    "useRenderCache",
+    "generateEditVideo",
+    "renderOtioFile",
+    "otioFileType",
+    "updatePlayblastInVSM",
+    "openPlayblastInPlayer",
+)
+_renderContextJobProperties = (
+    "renderHardwareMode",
+    "renderParallelWorkers",
+    "renderPipelineQueueSize",
+    "compositingBackend",
+    "ffmpegPath",
+    "stampInfoGenerationMode",
+    "audioMixdownMode",
+    "audioCutProcesses",
+    "printFrameInfo",
+)
+
+# properties of the nodes that only affect their display in the node editor
+_nodeUiProperties = (
+    "location",
+    "width",
+    "width_hidden",
+    "height",
+    "dimensions",
+    "select",
+    "hide",
+    "show_options",
+    "show_preview",
+    "show_texture",
+    "use_custom_color",
+    "color",
+    "label",
+)
+
+# properties of the objects that depend on the current frame when they are animated
+_objectTransformProperties = (
+    "location",
+    "rotation_mode",
+    "rotation_euler",
+    "rotation_quaternion",
+    "rotation_axis_angle",
+    "scale",
+    "delta_location",
+    "delta_rotation_euler",
+    "delta_rotation_quaternion",
+    "delta_scale",
+)
+
+
+###################
+# hashing
+###################
+
+
+def _hashValues(values):
+    return hashlib.sha1(repr(values).encode("utf-8")).hexdigest()
+
+
+def _plainValue(value):
+    """Return the value as a Python value which repr does not depend on the memory or on the RNA path"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, set):
+        # enum flags
+        return tuple(sorted(value))
+    if hasattr(value, "bl_rna"):
+        # pointer to a data-block or to a struct
+        return getattr(value, "name", value.bl_rna.identifier)
+    try:
+        return tuple(_plainValue(v) for v in value)
+    except TypeError:
+        return repr(value)
+
+
+def _rnaPropertiesValues(struct, exclude=(), withPointers=False):
+    """Return a list of the tupples (name, value) of the simple properties of a Blender struct
+    withPointers: if True the names of the data-blocks or structs pointed by the struct are included
+    """
+    if struct is None:
+        return None
+    values = []
+    for prop in struct.bl_rna.properties:
+        if prop.identifier in exclude or prop.identifier == "rna_type" or "COLLECTION" == prop.type:
+            continue
+        if "POINTER" == prop.type and not withPointers:
+            continue
+        values.append((prop.identifier, _plainValue(getattr(struct, prop.identifier, None))))
+    return values
+
+
+def _arrayHash(collection, attrName, numValues, dtype=np.float32):
+    """Return the hash of the values of the attribute for all the items of the collection, read with foreach_get"""
+    values = np.empty(len(collection) * numValues, dtype=dtype)
+    collection.foreach_get(attrName, values)
+    return hashlib.sha1(values.tobytes()).hexdigest()
+
+
+def _nodeTreeValues(nodeTree, visitedTrees=None):
+    """Return the values of the nodes of the tree, of their inputs and of the links, node groups included"""
+    if nodeTree is None:
+        return None
+    if visitedTrees is None:
+        visitedTrees = set()
+    visitedTrees.add(nodeTree.name)
+
+    values = [nodeTree.name]
+    for node in nodeTree.nodes:
+        nodeValues = [
+            node.name,
+            node.bl_idname,
+            node.mute,
+            _rnaPropertiesValues(node, exclude=_nodeUiProperties, withPointers=True),
+            tuple((socket.identifier, _plainValue(getattr(socket, "default_value", None))) for socket in node.inputs),
+        ]
+        image = getattr(node, "image", None)
+        if image is not None:
+            nodeValues.append((image.name, image.filepath, image.source))
+        groupTree = getattr(node, "node_tree", None)
+        if groupTree is not None and groupTree.name not in visitedTrees:
+            nodeValues.append(_nodeTreeValues(groupTree, visitedTrees))
+        values.append(tuple(nodeValues))
+    links = [
+        (link.from_node.name, link.from_socket.identifier, link.to_node.name, link.to_socket.identifier, link.is_muted)
+        for link in nodeTree.links
+    ]
+    values.append(sorted(links))
+    return values
+
+
+def _driversValues(animData):
+    if animData is None:
+        return None
+    values = []
+    for fcurve in animData.drivers:
+        driver = fcurve.driver
+        variables = tuple(
+            (
+                variable.name,
+                variable.type,
+                tuple(
+                    (_plainValue(target.id), target.data_path, target.bone_target, target.transform_type)
+                    for target in variable.targets
+                ),
+            )
+            for variable in driver.variables
+        )
+        values.append((fcurve.data_path, fcurve.array_index, fcurve.mute, driver.type, driver.expression, variables))
+    return values
+
+
+class _FCurveKeys:
+    """Keyframes of an F-curve read once with foreach_get, to get the keys affecting a range of frames"""
+
+    def __init__(self, fcurve):
+        keys = fcurve.keyframe_points
+        numKeys = len(keys)
+        self.keys = keys
+        self.values = dict()
+        for attrName in ("co", "handle_left", "handle_right"):
+            self.values[attrName] = np.empty(numKeys * 2, dtype=np.float32)
+            keys.foreach_get(attrName, self.values[attrName])
+            self.values[attrName] = self.values[attrName].reshape(numKeys, 2)
+        self.frames = self.values["co"][:, 0]
+        self.isSorted = numKeys < 2 or bool(np.all(self.frames[1:] >= self.frames[:-1]))
+        self.curveValues = (
+            fcurve.data_path,
+            fcurve.array_index,
+            fcurve.mute,
+            fcurve.extrapolation,
+            tuple((m.type, m.mute, _rnaPropertiesValues(m)) for m in fcurve.modifiers),
+        )
+
+    def getUsedKeyIndices(self, frameStart, frameEnd):
+        """Return the indices of the keys in the range [frameStart, frameEnd] and of the keys surrounding it, which
+        are used for the interpolation
+        """
+        frames = self.frames
+        if self.isSorted:
+            first = np.searchsorted(frames, frameStart, side="left")
+            last = np.searchsorted(frames, frameEnd, side="right")
+            return np.arange(max(first - 1, 0), min(last + 1, len(frames)))
+
+        inRange = np.flatnonzero((frameStart <= frames) & (frames <= frameEnd))
+        before = np.flatnonzero(frames < frameStart)[-1:]
+        after = np.flatnonzero(frameEnd < frames)[:1]
+        return np.concatenate((before, inRange, after))
+
+    def getValues(self, frameStart, frameEnd):
+        indices = self.getUsedKeyIndices(frameStart, frameEnd)
+        keysHash = hashlib.sha1()
+        for attrName in ("co", "handle_left", "handle_right"):
+            keysHash.update(self.values[attrName][indices].tobytes())
+        # the interpolation is an enum property, it cannot be read with foreach_get
+        interpolations = tuple(self.keys[int(i)].interpolation for i in indices)
+        return (self.curveValues, keysHash.hexdigest(), interpolations)
+
+
+def _geometryValues(data):
+    """Return the values of the geometry of the object data: vertices and faces of the meshes, simple properties
+    for the other types of data
+    """
+    if data is None:
+        return None
+    values = [data.name, data.bl_rna.identifier]
+    if hasattr(data, "vertices") and hasattr(data, "polygons"):
+        values += [
+            len(data.vertices),
+            len(data.polygons),
+            _arrayHash(data.vertices, "co", 3),
+            _arrayHash(data.loops, "vertex_index", 1, dtype=np.int32),
+            _arrayHash(data.polygons, "material_index", 1, dtype=np.int32),
+        ]
+    elif hasattr(data, "layers"):
+        # grease pencil
+        values += [(layer.info, layer.hide, layer.opacity, len(layer.frames)) for layer in data.layers]
+    else:
+        values.append(_rnaPropertiesValues(data, exclude=("name",)))
+
+    shapeKeys = getattr(data, "shape_keys", None)
+    if shapeKeys is not None:
+        values.append(
+            [
+                (
+                    keyBlock.name,
+                    keyBlock.value,
+                    keyBlock.mute,
+                    keyBlock.relative_key.name,
+                    keyBlock.vertex_group,
+                    _arrayHash(keyBlock.data, "co", 3),
+                )
+                for keyBlock in shapeKeys.key_blocks
+            ]
+        )
+        values.append(_driversValues(shapeKeys.animation_data))
+    values.append(_driversValues(getattr(data, "animation_data", None)))
+    return values
+
+
+def _getObjectMaterials(obj):
+    return [slot.material for slot in obj.material_slots if slot.material is not None]
+
+
+def _materialValues(material):
+    return (
+        material.name,
+        _rnaPropertiesValues(material, exclude=("name",)),
+        _nodeTreeValues(material.node_tree) if material.use_nodes else None,
+        _driversValues(material.animation_data),
+        _driversValues(material.node_tree.animation_data) if material.node_tree is not None else None,
+    )
+
+
+def _objectValues(obj):
+    """Return the values of the object that do not depend on the time"""
+    animData = obj.animation_data
+    isAnimated = animData is not None and animData.action is not None
+    return (
+        obj.name,
+        obj.type,
+        obj.parent.name if obj.parent is not None else None,
+        obj.parent_type,
+        obj.parent_bone,
+        # the transform properties of animated objects are the ones evaluated at the current frame
+        None if isAnimated else tuple((name, _plainValue(getattr(obj, name))) for name in _objectTransformProperties),
+        tuple(tuple(row) for row in obj.matrix_parent_inverse),
+        tuple((c.name, c.type, c.mute, _rnaPropertiesValues(c, withPointers=True)) for c in obj.constraints),
+        tuple((m.name, m.type, _rnaPropertiesValues(m, withPointers=True)) for m in getattr(obj, "modifiers", ())),
+        tuple(slot.material.name if slot.material is not None else None for slot in obj.material_slots),
+        _plainValue(obj.instance_collection) if "COLLECTION" == obj.instance_type else None,
+        _geometryValues(obj.data),
+        _driversValues(animData),
+    )
+
+
+def _animatedStructs(obj):
+    """Return the data-blocks related to the object that can have an action"""
+    structs = [obj, obj.data, getattr(obj.data, "shape_keys", None)]
+    for material in _getObjectMaterials(obj):
+        structs += [material, material.node_tree]
+    return [s for s in structs if s is not None]
+
+
+def _collectRenderedCollections(layerCollection, collections):
+    if layerCollection.exclude or layerCollection.collection.hide_render:
+        return
+    collections.append(layerCollection.collection)
+    for child in layerCollection.children:
+        _collectRenderedCollections(child, collections)
+
+
+def getRenderedObjects(scene):
+    """Return the list of the objects rendered by the view layers of the scene, sorted by name. The objects of the
+    collections instanced by the rendered objects are included
+    """
+    collections = []
+    for viewLayer in scene.view_layers:
+        if viewLayer.use:
+            _collectRenderedCollections(viewLayer.layer_collection, collections)
+
+    objects = dict()
+    instancedCollections = []
+    for collection in collections:
+        for obj in collection.objects:
+            if not obj.hide_render:
+                objects[obj.name] = obj
+                if "COLLECTION" == obj.instance_type and obj.instance_collection is not None:
+                    instancedCollections.append(obj.instance_collection)
+    for collection in instancedCollections:
+        for obj in collection.all_objects:
+            if not obj.hide_render:
+                objects[obj.name] = obj
+
+    return [objects[name] for name in sorted(objects)]
+
+
+###################
+# fingerprint
+###################
+
+
+class FingerprintContext:
+    """Values of the scene shared by the fingerprints of the shots of a render: the render-visible objects, the
+    hashes of the values that do not depend on the time and the keyframes of the actions are read only once
+    """
+
+    def __init__(self, scene):
+        self.scene = scene
+        self.renderedObjects = [obj for obj in getRenderedObjects(scene) if obj.type not in ("CAMERA", "LIGHT_PROBE")]
+        self._objectHashes = dict()
+        self._actionKeys = dict()
+
+        materials = dict()
+        for obj in self.renderedObjects:
+            for material in _getObjectMaterials(obj):
+                materials[material.name] = material
+        self.materials = [materials[name] for name in sorted(materials)]
+        self.materialsHash = _hashValues([_materialValues(material) for material in self.materials])
+
+        world = scene.world
+        self.worldHash = _hashValues(
+            None
+            if world is None
+            else (
+                _rnaPropertiesValues(world, exclude=("name",)),
+                _nodeTreeValues(world.node_tree) if world.use_nodes else None,
+                _driversValues(world.animation_data),
+            )
+        )
+
+        self.objectsHash = _hashValues([self.getObjectHash(obj) for obj in self.renderedObjects])
+
+    def getObjectHash(self, obj):
+        if obj.name not in self._objectHashes:
+            self._objectHashes[obj.name] = _hashValues(_objectValues(obj))
+        return self._objectHashes[obj.name]
+
+    def getActionValues(self, struct, frameStart, frameEnd):
+        animData = getattr(struct, "animation_data", None)
+        if animData is None or animData.action is None:
+            return None
+        action = animData.action
+        if action.name not in self._actionKeys:
+            self._actionKeys[action.name] = [_FCurveKeys(fcurve) for fcurve in action.fcurves]
+        return [action.name] + [keys.getValues(frameStart, frameEnd) for keys in self._actionKeys[action.name]]
+
+    def getAnimationValues(self, structs, frameStart, frameEnd):
+        return [self.getActionValues(s, frameStart, frameEnd) for s in structs if s is not None]
+
+
+def getShotFingerprint(
+    scene,
+    shot,
+    handles,
+    renderHandles,
+    renderPreset=None,
+    stampInfoCustomSettingsDict=None,
+    renderSound=True,
+    fingerprintContext=None,
+):
+    """Return a dictionary with, for each component of the fingerprint of the shot, the hash of its values
+    fingerprintContext: a FingerprintContext created once for all the shots of the render, created if None
+    """
+    props = scene.UAS_shot_manager_props
+    context = fingerprintContext if fingerprintContext is not None else FingerprintContext(scene)
+    frameStart = shot.start - (handles if renderHandles else 0)
+    frameEnd = shot.end + (handles if renderHandles else 0)
+
+    fingerprint = dict()
+
+    fingerprint["range"] = _hashValues((shot.start, shot.end, handles, renderHandles))
+
+    cam = shot.camera
+    fingerprint["camera"] = _hashValues(
+        None
+        if cam is None
+        else (
+            context.getObjectHash(cam),
+            _rnaPropertiesValues(cam.data, exclude=("name",), withPointers=True),
+            context.getAnimationValues(_animatedStructs(cam), frameStart, frameEnd),
+        )
+    )
+
+    fingerprint["objects"] = context.objectsHash
+    fingerprint["animation"] = _hashValues(
+        [context.getAnimationValues(_animatedStructs(obj), frameStart, frameEnd) for obj in context.renderedObjects]
+    )
+    fingerprint["materials"] = context.materialsHash
+
+    world = scene.world
+    fingerprint["world"] = _hashValues(
+        (
+            context.worldHash,
+            None if world is None else context.getAnimationValues([world, world.node_tree], frameStart, frameEnd),
+        )
+    )
+
+    fingerprint["render_settings"] = _hashValues(
+        (
+            _rnaPropertiesValues(renderPreset, exclude=_renderSettingsJobProperties),
+            _rnaPropertiesValues(props.renderContext, exclude=_renderContextJobProperties),
+            _rnaPropertiesValues(scene.render, exclude=("filepath", "frame_map_old", "frame_map_new")),
+            scene.view_settings.view_transform,
+            props.use_project_settings,
+            props.renderShotPrefix(),
+        )
+    )
+
+    # the stamp info properties set from the shot during the render are not used, the shot values are used instead
+    stampInfoSettings = getattr(scene, "UAS_StampInfo_Settings", None)
+    fingerprint["stamp_info"] = _hashValues(
+        (
+            _rnaPropertiesValues(stampInfoSettings, exclude=_stampInfoPropertiesSetByRender),
+            props.getEditDuration(),
+            shot.getEditStart(referenceLevel="GLOBAL_EDIT"),
+            shot.name,
+            shot.enabled,
+            shot.note01,
+            shot.note02,
+            shot.note03,
+            shot.getParentTake().name,
+            None if stampInfoCustomSettingsDict is None else sorted(stampInfoCustomSettingsDict.items()),
+        )
+    )
+
+    soundValues = None
+    if renderSound and scene.sequence_editor is not None:
+        soundValues = sorted(
+            (
+                strip.name,
+                getattr(strip.sound, "filepath", None),
+                strip.channel,
+                strip.frame_start,
+                strip.frame_final_start,
+                strip.frame_final_end,
+                strip.volume,
+                strip.mute,
+            )
+            for strip in scene.sequence_editor.sequences_all
+            if "SOUND" == strip.type and strip.frame_final_start <= frameEnd and frameStart < strip.frame_final_end
+        )
+    fingerprint["sound"] = _hashValues((renderSound, soundValues))
+
+    return fingerprint
+
+
+###################
+# cache
+###################
+
+
+class RenderCache:
+    """Fingerprints of the shot videos rendered in a take directory, and report of the hits and misses of a render"""
+
+    def __init__(self, takeRenderPath):
+        self.filePath = str(Path(takeRenderPath) / _cacheFileName)
+        self.entries = readJsonFile(self.filePath) or dict()
+        self.hits = []
+        self.misses = dict()
+
+    def check(self, shotName, mediaPath, fingerprint):
+        """Return True if the shot video at mediaPath can be reused. The result is added to the report"""
+        entry = self.entries.get(mediaPath, None)
+        reason = None
+        if entry is None:
+            reason = "not in cache"
+        elif not Path(mediaPath).exists():
+            reason = "output file missing"
+        else:
+            changedComponents = [
+                component for component, value in fingerprint.items() if entry["fingerprint"].get(component) != value
+            ]
+            if len(changedComponents):
+                reason = "changed: " + ", ".join(changedComponents)
+
+        if reason is None:
+            self.hits.append(shotName)
+            return True
+
+        self.misses[shotName] = reason
+        return False
+
+    def store(self, mediaPath, fingerprint):
+        """Record the fingerprint of a rendered shot video and save the cache file"""
+        self.entries[mediaPath] = {"fingerprint": fingerprint}
+        try:
+            Path(self.filePath).parent.mkdir(parents=True, exist_ok=True)
+            writeJsonFile(self.filePath, self.entries)
+        except OSError as e:
+            _logger.error(f"Cannot write render cache file {self.filePath}: {e}")
+
+    def getReport(self):
+        return {"hits": list(self.hits), "misses": dict(self.misses)}
+
+    def printReport(self):
+        print(f"\nRender cache: {len(self.hits)} hits, {len(self.misses)} misses")
+        for shotName in self.hits:
+            print(f"   {shotName:>30}: reused")
+        for shotName, reason in self.misses.items():
+            print(f"   {shotName:>30}: rendered - {reason}")
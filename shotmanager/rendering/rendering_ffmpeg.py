@@ -0,0 +1,407 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Compositing of the shot videos with an ffmpeg subprocess instead of a temporary VSE scene
+
+The rendered image sequence and the stamp info image sequence are streamed into ffmpeg, centered on a canvas of the
+output resolution with the overlay filter, and muxed with the sound of the shot. The encoding settings are the ones
+of the VSE path: MPEG4 container, lossless H.264, keyframe interval of 5 frames and AAC sound.
+The images are not color managed again: the rendered PNG files are already in display space.
+The sequence video is built by concatenating the shot videos when they are compatible.
+"""
+
+import os
+from pathlib import Path
+import json
+import re
+import shutil
+import subprocess
+import time
+
+import bpy
+
+from shotmanager.config import config
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def getFfmpegPath(customPath=""):
+    """Return the path of the ffmpeg executable, None if it cannot be found
+    customPath: path of the executable to use. If empty the executable is searched in the PATH directories
+    """
+    if "" != customPath:
+        return customPath if Path(customPath).is_file() else None
+    return shutil.which("ffmpeg")
+
+
+def getImageSequenceInput(imagesPath):
+    """Return the tupple (ffmpeg file pattern, first frame) of the image sequence specified with # characters for
+    the frame number, as in "shot_#####.png". The first frame is the lowest frame found on disk, as done by the VSE.
+    The path of a single image is returned as is, with None as first frame
+    """
+    p = Path(imagesPath)
+    paddingMatch = re.match(r"(.*?)(#+)(.*)", p.name)
+    if paddingMatch is None:
+        return (str(p), None)
+
+    prefix, padding, suffix = paddingMatch.groups()
+    fileRe = re.compile(r"^{0}(\d{{{1}}}){2}$".format(re.escape(prefix), len(padding), re.escape(suffix)))
+    frames = [int(m[1]) for m in (fileRe.match(f.name) for f in p.parent.glob("*")) if m is not None]
+    firstFrame = min(frames) if len(frames) else 0
+
+    return (str(p.parent / f"{prefix}%0{len(padding)}d{suffix}"), firstFrame)
+
+
+def _evenSize(resolution):
+    return [value + value % 2 for value in resolution]
+
+
+def buildCompositeCommand(ffmpegPath, shotSequence, fps, outputPath=None):
+    """Return the ffmpeg command compositing the media of the shot
+    shotSequence: dictionary of the media rendered for the shot, as returned in filesDict["rendered_shot_sequences"]
+    outputPath: path of the composited media. If None, shotSequence["composited_media_path"] is used
+    """
+    if outputPath is None:
+        outputPath = shotSequence["composited_media_path"]
+    numFrames = shotSequence["frame_end"]
+    isStill = 1 == numFrames and not outputPath.lower().endswith(".mp4")
+
+    # as in the VSE path, the canvas has the resolution of the stamp info images, the images are centered on it
+    outputResolution = shotSequence["bg_resolution"]
+    if not isStill:
+        # yuv420p requires even dimensions
+        outputResolution = _evenSize(outputResolution)
+
+    command = [ffmpegPath, "-y", "-hide_banner", "-loglevel", "error"]
+    command += ["-f", "lavfi", "-i", f"color=c=black:s={outputResolution[0]}x{outputResolution[1]}:r={fps}"]
+
+    imageInputs = [shotSequence["image_sequence"]]
+    if shotSequence["bg"] is not None:
+        imageInputs.append(shotSequence["bg"])
+
+    for imagesPath in imageInputs:
+        pattern, firstFrame = getImageSequenceInput(imagesPath)
+        if firstFrame is None:
+            command += ["-i", pattern]
+        else:
+            command += ["-framerate", str(fps), "-start_number", str(firstFrame), "-i", pattern]
+
+    # the sound is an input too: all the inputs have to be specified before the output options
+    audioPath = None if isStill else shotSequence["sound"]
+    if audioPath is not None and os.path.exists(audioPath):
+        command += ["-i", audioPath]
+    else:
+        audioPath = None
+
+    filters = []
+    previousLabel = "0:v"
+    for inputInd in range(1, len(imageInputs) + 1):
+        label = f"v{inputInd}"
+        filters.append(f"[{previousLabel}][{inputInd}:v]overlay=(W-w)/2:(H-h)/2:format=auto[{label}]")
+        previousLabel = label
+    command += ["-filter_complex", ";".join(filters), "-map", f"[{previousLabel}]"]
+
+    if audioPath is not None:
+        command += ["-map", f"{len(imageInputs) + 1}:a", "-c:a", "aac", "-t", str(numFrames / fps)]
+    command += ["-frames:v", str(numFrames)]
+
+    if isStill:
+        command += [outputPath]
+        return command
+
+    command += ["-c:v", "libx264", "-crf", "0", "-g", "5", "-pix_fmt", "yuv420p", "-f", "mp4", outputPath]
+    return command
+
+
+def compositeShotVideo(ffmpegPath, shotSequence, fps, outputPath=None):
+    """Composite the video of a shot from its rendered images, stamp info images and sound with ffmpeg
+    Raise a RuntimeError if ffmpeg fails
+    """
+    command = buildCompositeCommand(ffmpegPath, shotSequence, fps, outputPath=outputPath)
+    if config.devDebug:
+        print(f"ffmpeg command: {subprocess.list2cmdline(command)}")
+
+    Path(command[-1]).parent.mkdir(parents=True, exist_ok=True)
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if 0 != result.returncode:
+        raise RuntimeError(f"ffmpeg failed to composite {shotSequence['shot_name']}: {result.stderr.strip()}")
+
+
+###################
+# sequence video
+###################
+
+
+def getFfprobePath(ffmpegPath):
+    """Return the path of the ffprobe executable installed with ffmpeg, None if it cannot be found"""
+    ffprobePath = Path(ffmpegPath).with_name(Path(ffmpegPath).name.replace("ffmpeg", "ffprobe"))
+    if ffprobePath.is_file():
+        return str(ffprobePath)
+    return shutil.which("ffprobe")
+
+
+def getMediaStreamsInfo(ffprobePath, mediaPath):
+    """Return a dictionary with the properties of the first video stream and of the first audio stream of the media:
+    {"video": {codec_name, width, height, r_frame_rate, pix_fmt, nb_frames}, "audio": {codec_name, sample_rate,
+    channels}}. The value of a stream is None if the media has no stream of this type
+    """
+    command = [
+        ffprobePath,
+        "-v",
+        "error",
+        "-show_entries",
+        "stream=codec_type,codec_name,width,height,r_frame_rate,pix_fmt,nb_frames,sample_rate,channels:format=duration",
+        "-of",
+        "json",
+        mediaPath,
+    ]
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if 0 != result.returncode:
+        raise RuntimeError(f"ffprobe failed to read {mediaPath}: {result.stderr.strip()}")
+    probe = json.loads(result.stdout)
+
+    info = {"video": None, "audio": None, "duration": float(probe.get("format", {}).get("duration", 0.0))}
+    for stream in probe.get("streams", []):
+        streamType = stream.get("codec_type")
+        if streamType in ("video", "audio") and info[streamType] is None:
+            stream.pop("codec_type")
+            info[streamType] = stream
+    return info
+
+
+def _getNumFrames(mediaInfo, fps):
+    numFrames = mediaInfo["video"].get("nb_frames", None)
+    if numFrames is not None:
+        return int(numFrames)
+    return round(mediaInfo["duration"] * fps)
+
+
+def getConcatIncompatibility(mediaInfos, fps):
+    """Return a description of the first property preventing the media from being joined by stream concatenation,
+    None if they are compatible: same video codec, resolution, pixel format and frame rate, and same audio format
+    """
+    if not len(mediaInfos):
+        return "no media"
+    reference = mediaInfos[0]
+    for mediaInfo in mediaInfos:
+        if mediaInfo["video"] is None:
+            return "media without video stream"
+        frameRate = mediaInfo["video"].get("r_frame_rate", "0/1").split("/")
+        if float(frameRate[0]) / float(frameRate[1]) != float(fps):
+            return f"frame rate {mediaInfo['video'].get('r_frame_rate')} differs from {fps} fps"
+        for key in ("codec_name", "width", "height", "pix_fmt"):
+            if mediaInfo["video"].get(key) != reference["video"].get(key):
+                return f"different video {key}"
+        if (mediaInfo["audio"] is None) != (reference["audio"] is None):
+            return "some media have no audio stream"
+        if mediaInfo["audio"] is not None:
+            for key in ("codec_name", "sample_rate", "channels"):
+                if mediaInfo["audio"].get(key) != reference["audio"].get(key):
+                    return f"different audio {key}"
+    return None
+
+
+def buildSequenceVideo(ffmpegPath, mediaFiles, outputFile, handles, fps):
+    """Join the shot videos into the sequence video, removing the handles of each shot as done by the VSE path
+    Without handles the streams are concatenated without being encoded again. With handles, each shot is trimmed
+    frame accurately and the result is encoded once with the settings of the shot videos.
+    Return True if the sequence video has been built, False if the media are not compatible for concatenation,
+    in which case the sequence has to be built by the VSE. Raise a RuntimeError if ffmpeg fails
+    """
+    ffprobePath = getFfprobePath(ffmpegPath)
+    if ffprobePath is None:
+        _logger.warning("buildSequenceVideo: ffprobe executable not found")
+        return False
+
+    mediaInfos = [getMediaStreamsInfo(ffprobePath, mediaPath) for mediaPath in mediaFiles]
+    incompatibility = getConcatIncompatibility(mediaInfos, fps)
+    if incompatibility is not None:
+        print(f"  Shot videos cannot be concatenated ({incompatibility}), sequence built in the VSE")
+        return False
+
+    hasAudio = mediaInfos[0]["audio"] is not None
+    command = [ffmpegPath, "-y", "-hide_banner", "-loglevel", "error"]
+
+    if 0 == handles:
+        listFilePath = outputFile + "_concat.txt"
+        with open(listFilePath, "w") as f:
+            f.write("ffconcat version 1.0\n")
+            for mediaPath in mediaFiles:
+                escapedPath = mediaPath.replace("\\", "/").replace("'", "'\\''")
+                f.write(f"file '{escapedPath}'\n")
+        command += ["-f", "concat", "-safe", "0", "-i", listFilePath, "-c", "copy", "-f", "mp4", outputFile]
+    else:
+        listFilePath = None
+        filters = []
+        concatInputs = ""
+        for mediaInd, (mediaPath, mediaInfo) in enumerate(zip(mediaFiles, mediaInfos)):
+            command += ["-i", mediaPath]
+            endFrame = _getNumFrames(mediaInfo, fps) - handles
+            filters.append(
+                f"[{mediaInd}:v]trim=start_frame={handles}:end_frame={endFrame},setpts=PTS-STARTPTS[v{mediaInd}]"
+            )
+            concatInputs += f"[v{mediaInd}]"
+            if hasAudio:
+                filters.append(
+                    f"[{mediaInd}:a]atrim=start={handles / fps}:end={endFrame / fps},asetpts=PTS-STARTPTS[a{mediaInd}]"
+                )
+                concatInputs += f"[a{mediaInd}]"
+        concatOutputs = "[v][a]" if hasAudio else "[v]"
+        filters.append(f"{concatInputs}concat=n={len(mediaFiles)}:v=1:a={1 if hasAudio else 0}{concatOutputs}")
+        command += ["-filter_complex", ";".join(filters), "-map", "[v]"]
+        if hasAudio:
+            command += ["-map", "[a]", "-c:a", "aac"]
+        command += ["-c:v", "libx264", "-crf", "0", "-g", "5", "-pix_fmt", mediaInfos[0]["video"]["pix_fmt"]]
+        command += ["-f", "mp4", outputFile]
+
+    if config.devDebug:
+        print(f"ffmpeg command: {subprocess.list2cmdline(command)}")
+
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if listFilePath is not None and not config.devDebug:
+        os.remove(listFilePath)
+    if 0 != result.returncode:
+        raise RuntimeError(f"ffmpeg failed to build the sequence video {outputFile}: {result.stderr.strip()}")
+
+    return True
+
+
+###################
+# check and benchmark
+###################
+
+
+def checkCompositing(ffmpegPath, workDir, fps=24):
+    """Composite a small synthetic shot with ffmpeg, with and without sound, to check the compositing commands
+    Return a dictionary with, for each case, None if the composited video is valid, the error message otherwise
+    """
+    workDir = Path(workDir)
+    workDir.mkdir(parents=True, exist_ok=True)
+    numFrames = 3
+
+    generateCommands = [
+        [ffmpegPath, "-y", "-loglevel", "error", "-f", "lavfi", "-i", f"testsrc=s=64x48:r={fps}"]
+        + ["-frames:v", str(numFrames), str(workDir / "check_image_%03d.png")],
+        [ffmpegPath, "-y", "-loglevel", "error", "-f", "lavfi", "-i", f"color=c=red@0.5:s=80x60:r={fps}"]
+        + ["-frames:v", str(numFrames), str(workDir / "check_stamp_%03d.png")],
+        [ffmpegPath, "-y", "-loglevel", "error", "-f", "lavfi", "-i", "sine=frequency=440:duration=1"]
+        + [str(workDir / "check_sound.wav")],
+    ]
+    for command in generateCommands:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        if 0 != result.returncode:
+            _logger.error(f"checkCompositing: the synthetic media cannot be generated: {result.stderr.strip()}")
+            return {"synthetic_media": result.stderr.strip()}
+
+    ffprobePath = getFfprobePath(ffmpegPath)
+    errors = dict()
+    for caseName, soundPath in (("no_sound", None), ("sound", str(workDir / "check_sound.wav"))):
+        shotSequence = {
+            "shot_name": f"check_{caseName}",
+            "image_sequence": str(workDir / "check_image_###.png"),
+            "bg": str(workDir / "check_stamp_###.png"),
+            "bg_resolution": [80, 60],
+            "sound": soundPath,
+            "frame_end": numFrames,
+            "composited_media_path": str(workDir / f"check_{caseName}.mp4"),
+        }
+        try:
+            compositeShotVideo(ffmpegPath, shotSequence, fps)
+            if ffprobePath is not None:
+                streams = getMediaStreamsInfo(ffprobePath, shotSequence["composited_media_path"])
+                if streams["video"] is None or (soundPath is not None) != (streams["audio"] is not None):
+                    raise RuntimeError(f"unexpected streams in {shotSequence['composited_media_path']}: {streams}")
+            errors[caseName] = None
+        except (RuntimeError, OSError) as e:
+            errors[caseName] = str(e)
+            _logger.error(f"checkCompositing: {caseName}: {e}")
+
+    return errors
+
+
+def benchmarkCompositingBackends(context, numShots=10, outputPath=None):
+    """Compare the VSE and the ffmpeg compositing backends on the first numShots enabled shots of the current take
+    The images, stamp info and sound of the shots are rendered once, then each backend composites all the shot videos
+    in its own directory.
+    Return a dictionary with, for each backend, the total and per shot compositing times in seconds
+    """
+    from shotmanager.rendering import rendering
+    from shotmanager.rendering.rendering_parallel import writeJsonFile
+
+    scene = context.scene
+    props = scene.UAS_shot_manager_props
+    vse_render = context.window_manager.UAS_vse_render
+    fps = scene.render.fps
+
+    ffmpegPath = getFfmpegPath(props.renderContext.ffmpegPath)
+    if ffmpegPath is None:
+        _logger.error("benchmarkCompositingBackends: ffmpeg executable not found")
+        return None
+
+    if outputPath is None:
+        outputPath = str(Path(bpy.path.abspath(props.renderRootPath)) / "_compositing_benchmark")
+
+    checkErrors = {k: v for k, v in checkCompositing(ffmpegPath, Path(outputPath) / "_check").items() if v is not None}
+    if len(checkErrors):
+        _logger.error(f"benchmarkCompositingBackends: the ffmpeg compositing check failed: {checkErrors}")
+        return None
+
+    shots = props.getShotsList(ignoreDisabled=True)[:numShots]
+    filesDict = rendering.launchRenderWithVSEComposite(
+        context,
+        renderPreset=props.renderSettingsAll,
+        filePath=props.renderRootPath,
+        generateSequenceVideo=False,
+        generateShotVideos=False,
+        specificShotList=shots,
+        render_handles=props.renderSettingsAll.renderHandles,
+        renderSound=props.renderSettingsAll.renderSound,
+    )
+    shotSequences = filesDict["rendered_shot_sequences"]
+
+    timings = {"VSE": dict(), "FFMPEG": dict()}
+    for backend in timings.keys():
+        backendDir = Path(outputPath) / backend
+        backendDir.mkdir(parents=True, exist_ok=True)
+        for shotSequence in shotSequences:
+            shotOutputPath = str(backendDir / Path(shotSequence["composited_media_path"]).name)
+            startTime = time.monotonic()
+            if "VSE" == backend:
+                rendering.compositeShotVideoInVSE(vse_render, shotSequence, fps, outputPath=shotOutputPath)
+            else:
+                compositeShotVideo(ffmpegPath, shotSequence, fps, outputPath=shotOutputPath)
+            timings[backend][shotSequence["shot_name"]] = time.monotonic() - startTime
+
+    report = {
+        "num_shots": len(shotSequences),
+        "num_frames": sum(s["frame_end"] for s in shotSequences),
+        "backends": {
+            backend: {"total_time": sum(shotTimes.values()), "shot_times": shotTimes}
+            for backend, shotTimes in timings.items()
+        },
+    }
+    writeJsonFile(str(Path(outputPath) / "compositing_benchmark.json"), report)
+
+    print(f"\nCompositing benchmark: {report['num_shots']} shots, {report['num_frames']} frames")
+    for backend, backendReport in report["backends"].items():
+        print(f"   {backend:>8}: {backendReport['total_time']:0.2f} sec.")
+    print(f"   Report and videos: {outputPath}")
+
+    return report
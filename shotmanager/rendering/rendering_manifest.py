@@ -0,0 +1,147 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Job manifest of a render, used to resume an interrupted render
+
+The manifest is a json file written in the directory of the take when the render starts. It lists every planned
+output with its fingerprint and the status of each of its stages: "images" (images, stamp info and sound rendered
+in the temporary directory of the shot) and "video" (shot video composited). It is written again atomically each
+time a stage is finished.
+When a render is resumed, the shots which fingerprint has not changed restart from their last finished stage.
+"""
+
+from pathlib import Path
+import time
+
+from shotmanager.rendering.rendering_parallel import readJsonFile, writeJsonFile
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+_manifestFileName = "_render_job.json"
+
+_shotStages = ("images", "video")
+
+
+class RenderJobManifest:
+    """Planned outputs of a render and status of their stages. The outputs are identified by their media path"""
+
+    def __init__(self, takeRenderPath, resume=False):
+        self.filePath = str(Path(takeRenderPath) / _manifestFileName)
+
+        self._previousShots = dict()
+        if resume:
+            previousData = readJsonFile(self.filePath)
+            if previousData is not None:
+                self._previousShots = previousData.get("shots", dict())
+
+        self.data = {
+            "status": "RUNNING",
+            "start_time": time.time(),
+            "end_time": None,
+            "shots": dict(),
+            "sequence": None,
+        }
+
+    def planShot(self, shotName, mediaPath, fingerprint):
+        entry = {
+            "shot_name": shotName,
+            "status": "PENDING",
+            "fingerprint": fingerprint,
+            "stages": {stage: "PENDING" for stage in _shotStages},
+            "shot_sequence": None,
+            "error": None,
+        }
+
+        # the finished stages of a previous render are kept if the shot has not changed since
+        previousEntry = self._previousShots.get(mediaPath, None)
+        if previousEntry is not None and previousEntry.get("fingerprint") == fingerprint:
+            if "DONE" == previousEntry["stages"].get("video") and Path(mediaPath).exists():
+                entry["stages"]["images"] = "DONE"
+                entry["stages"]["video"] = "DONE"
+                entry["status"] = "DONE"
+            elif "DONE" == previousEntry["stages"].get("images") and _shotSequenceExists(
+                previousEntry.get("shot_sequence", None)
+            ):
+                entry["stages"]["images"] = "DONE"
+                entry["shot_sequence"] = previousEntry["shot_sequence"]
+
+        self.data["shots"][mediaPath] = entry
+
+    def planSequence(self, mediaPath):
+        self.data["sequence"] = {"media_path": mediaPath, "status": "PENDING"}
+
+    def getResumeStage(self, mediaPath):
+        """Return the last stage of the shot finished by a previous render, None if the shot has to be rendered"""
+        entry = self.data["shots"].get(mediaPath, None)
+        if entry is None:
+            return None
+        for stage in reversed(_shotStages):
+            if "DONE" == entry["stages"][stage]:
+                return stage
+        return None
+
+    def getShotSequence(self, mediaPath):
+        return self.data["shots"][mediaPath]["shot_sequence"]
+
+    def setStageDone(self, mediaPath, stage, shotSequence=None):
+        entry = self.data["shots"].get(mediaPath, None)
+        if entry is None:
+            return
+        entry["stages"][stage] = "DONE"
+        if shotSequence is not None:
+            entry["shot_sequence"] = shotSequence
+        if all("DONE" == entry["stages"][s] for s in _shotStages):
+            entry["status"] = "DONE"
+        self.write()
+
+    def setShotStatus(self, mediaPath, status, error=None):
+        """status: "REUSED" when an existing video is kept, "FAILED" when the rendering failed"""
+        entry = self.data["shots"].get(mediaPath, None)
+        if entry is None:
+            return
+        entry["status"] = status
+        entry["error"] = error
+        self.write()
+
+    def setSequenceDone(self):
+        if self.data["sequence"] is not None:
+            self.data["sequence"]["status"] = "DONE"
+            self.write()
+
+    def finish(self):
+        failed = any("FAILED" == entry["status"] for entry in self.data["shots"].values())
+        self.data["status"] = "FAILED" if failed else "DONE"
+        self.data["end_time"] = time.time()
+        self.write()
+
+    def write(self):
+        try:
+            Path(self.filePath).parent.mkdir(parents=True, exist_ok=True)
+            writeJsonFile(self.filePath, self.data)
+        except OSError as e:
+            _logger.error(f"Cannot write render job manifest {self.filePath}: {e}")
+
+
+def _shotSequenceExists(shotSequence):
+    """Return True if the temporary media rendered for the shot are still on disk"""
+    if shotSequence is None or not Path(shotSequence["temp_render_path"]).exists():
+        return False
+    return shotSequence["sound"] is None or Path(shotSequence["sound"]).exists()
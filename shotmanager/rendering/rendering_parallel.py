@@ -0,0 +1,243 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Parallel rendering of the shots in background Blender processes
+
+The coordinator, running in the current session, saves a copy of the file, splits the shots to render between
+several workers and launches them as "blender -b" processes. Each worker renders the images, the stamp info
+images and the sound of its shots with launchRenderWithVSEComposite, without compositing the videos, and writes
+the description of the rendered media of each shot in a json result file.
+The shot videos and the sequence video are then composited by the coordinator in the current session.
+"""
+
+import os
+from pathlib import Path
+import heapq
+import json
+import subprocess
+import time
+
+import bpy
+
+from shotmanager.config import config
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+# name of the Shot Manager property holding the render preset of each render mode
+_renderPresetPropertyNames = {
+    "STILL": "renderSettingsStill",
+    "ANIMATION": "renderSettingsAnim",
+    "ALL": "renderSettingsAll",
+    "OTIO": "renderSettingsOtio",
+    "PLAYBLAST": "renderSettingsPlayblast",
+}
+
+
+def writeJsonFile(filePath, data):
+    """Write the json file atomically, so that a reader never gets a partially written file"""
+    tmpFilePath = filePath + ".tmp"
+    with open(tmpFilePath, "w") as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmpFilePath, filePath)
+
+
+def readJsonFile(filePath):
+    """Return the content of the json file, None if the file doesn't exist or cannot be read"""
+    if not Path(filePath).exists():
+        return None
+    try:
+        with open(filePath, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        _logger.error(f"Cannot read json file {filePath}: {e}")
+        return None
+
+
+def splitShotsForWorkers(shotDurations, numWorkers):
+    """Distribute the shots between the workers so that the number of frames to render by each worker is balanced:
+    the longest shots are assigned first, each one to the worker having the less frames to render
+    shotDurations: list of the durations of the shots
+    Return a list, for each worker, of the positions of its shots in shotDurations, in increasing order
+    """
+    numWorkers = max(1, min(numWorkers, len(shotDurations)))
+    workersLoad = [(0, w) for w in range(numWorkers)]
+    shotsOfWorkers = [[] for w in range(numWorkers)]
+
+    for shotPos in sorted(range(len(shotDurations)), key=lambda p: -shotDurations[p]):
+        load, worker = heapq.heappop(workersLoad)
+        shotsOfWorkers[worker].append(shotPos)
+        heapq.heappush(workersLoad, (load + shotDurations[shotPos], worker))
+
+    return [sorted(shots) for shots in shotsOfWorkers if len(shots)]
+
+
+def renderShotsInWorkers(scene, shots, numWorkers, workDir, renderArgs):
+    """Render the specified shots in numWorkers background Blender processes
+    renderArgs: dictionary of the arguments passed to launchRenderWithVSEComposite by the workers, see runWorkerJob()
+    Return a dictionary with:
+        - "shot_sequences": for each shot name, the dictionary describing its rendered media, as in the
+          "rendered_shot_sequences" list returned by launchRenderWithVSEComposite
+        - "failed_shots": for each shot name, the error that occured
+        - "render_time": duration of the rendering by the workers
+    """
+    startTime = time.monotonic()
+    Path(workDir).mkdir(parents=True, exist_ok=True)
+
+    # the workers render a copy of the file in its current state, render settings included
+    snapshotPath = workDir + "_snapshot.blend"
+    bpy.ops.wm.save_as_mainfile(filepath=snapshotPath, copy=True, check_existing=False)
+
+    shotsOfWorkers = splitShotsForWorkers([shot.end - shot.start + 1 for shot in shots], numWorkers)
+    print(f"\n Rendering {len(shots)} shots in {len(shotsOfWorkers)} parallel workers")
+
+    workers = []
+    for workerInd, shotPositions in enumerate(shotsOfWorkers):
+        job = {
+            "scene": scene.name,
+            "shots": [shots[p].name for p in shotPositions],
+            "render_args": renderArgs,
+            "result_path": workDir + f"_worker_{workerInd:02}_result.json",
+        }
+        jobPath = workDir + f"_worker_{workerInd:02}_job.json"
+        logPath = workDir + f"_worker_{workerInd:02}.log"
+        writeJsonFile(jobPath, job)
+        if Path(job["result_path"]).exists():
+            os.remove(job["result_path"])
+
+        command = [
+            bpy.app.binary_path,
+            "-b",
+            snapshotPath,
+            "--python-exit-code",
+            "1",
+            "--python-expr",
+            f"from shotmanager.rendering import rendering_parallel; rendering_parallel.runWorkerJob(r'{jobPath}')",
+        ]
+        logFile = open(logPath, "w")
+        process = subprocess.Popen(command, stdout=logFile, stderr=subprocess.STDOUT)
+        workers.append({"process": process, "job": job, "log_path": logPath, "log_file": logFile})
+        print(f"   Worker {workerInd}: {len(job['shots'])} shots, log: {logPath}")
+
+    # wait for all the workers
+    runningWorkers = list(workers)
+    while len(runningWorkers):
+        time.sleep(0.5)
+        for worker in list(runningWorkers):
+            if worker["process"].poll() is not None:
+                worker["log_file"].close()
+                runningWorkers.remove(worker)
+                print(
+                    f"   Worker done ({len(workers) - len(runningWorkers)}/{len(workers)}), "
+                    f"exit code: {worker['process'].returncode}"
+                )
+
+    # collect the results, shot by shot
+    shotSequences = dict()
+    failedShots = dict()
+    for worker in workers:
+        result = readJsonFile(worker["job"]["result_path"])
+        if result is None:
+            result = dict()
+        for shotName in worker["job"]["shots"]:
+            shotResult = result.get(shotName, None)
+            if shotResult is None:
+                exitCode = worker["process"].returncode
+                failedShots[shotName] = f"Shot not rendered, worker exit code: {exitCode}, see {worker['log_path']}"
+            elif "DONE" == shotResult["status"]:
+                shotSequences[shotName] = shotResult["shot_sequence"]
+            else:
+                failedShots[shotName] = shotResult["error"]
+
+    if not config.devDebug:
+        try:
+            os.remove(snapshotPath)
+        except OSError:
+            _logger.error(f"Cannot delete render snapshot file: {snapshotPath}")
+
+    return {
+        "shot_sequences": shotSequences,
+        "failed_shots": failedShots,
+        "render_time": time.monotonic() - startTime,
+    }
+
+
+def runWorkerJob(jobPath):
+    """Entry point of the workers, executed in a background Blender process opened on the snapshot of the file
+    The result of each shot is written in the result file as soon as the shot is rendered
+    """
+    from shotmanager.rendering import rendering
+
+    job = readJsonFile(jobPath)
+    renderArgs = job["render_args"]
+    result = dict()
+
+    def _failAll(error):
+        for shotName in job["shots"]:
+            if shotName not in result:
+                result[shotName] = {"status": "FAILED", "error": error}
+        writeJsonFile(job["result_path"], result)
+
+    scene = bpy.context.scene
+    if scene is None or scene.name != job["scene"]:
+        _failAll(f"Scene {job['scene']} is not the current scene of the render snapshot")
+        return
+
+    props = getattr(scene, "UAS_shot_manager_props", None)
+    if props is None:
+        _failAll("Shot Manager is not available in the worker")
+        return
+
+    renderPreset = None
+    if renderArgs["render_preset"] is not None:
+        renderPreset = getattr(props, _renderPresetPropertyNames[renderArgs["render_preset"]])
+
+    takeIndex = renderArgs["take_index"]
+    take = props.getCurrentTake() if -1 == takeIndex else props.getTakeByIndex(takeIndex)
+    shotsByName = {shot.name: shot for shot in take.shots}
+
+    for shotName in job["shots"]:
+        shot = shotsByName.get(shotName, None)
+        if shot is None:
+            result[shotName] = {"status": "FAILED", "error": f"Shot {shotName} not found in the take"}
+            writeJsonFile(job["result_path"], result)
+            continue
+
+        try:
+            filesDict = rendering.launchRenderWithVSEComposite(
+                bpy.context,
+                renderPreset=renderPreset,
+                takeIndex=takeIndex,
+                filePath=renderArgs["file_path"],
+                useStampInfo=renderArgs["use_stamp_info"],
+                stampInfoCustomSettingsDict=renderArgs["stamp_info_custom_settings"],
+                rerenderExistingShotVideos=True,
+                generateSequenceVideo=False,
+                generateShotVideos=False,
+                specificShotList=[shot],
+                render_handles=renderArgs["render_handles"],
+                renderSound=renderArgs["render_sound"],
+            )
+            result[shotName] = {"status": "DONE", "shot_sequence": filesDict["rendered_shot_sequences"][0]}
+        except Exception as e:
+            _logger.exception(f"Rendering of shot {shotName} failed")
+            result[shotName] = {"status": "FAILED", "error": f"{type(e).__name__}: {e}"}
+
+        writeJsonFile(job["result_path"], result)
@@ -0,0 +1,147 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Render pipeline: the shot videos are composited in a background thread while the main thread renders the next shots
+
+The main thread renders the images, the stamp info and the sound of a shot, then submits the shot to a bounded queue.
+A compositing thread takes the shots from the queue, composites their video and deletes their temporary files.
+The size of the queue limits the number of rendered shots waiting on disk: when it is full the main thread waits.
+Only the stages that don't use bpy can run in the compositing thread, hence the pipeline is used with the ffmpeg
+compositing backend only.
+"""
+
+import queue
+import threading
+import time
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class CompositingPipeline:
+    """Queue of the rendered shots to composite, processed by a compositing thread
+    Stages timed: "render" and "wait" in the main thread, "composite" and "cleanup" in the compositing thread
+    """
+
+    def __init__(self, compositeFunction, cleanupFunction, maxPendingShots, profiler=None):
+        """
+        compositeFunction: function(shotSequence) compositing the video of the shot, raising an exception on failure
+        cleanupFunction: function(shotSequence) deleting the temporary files of the shot. It is not called when the
+            compositing fails, so that the shot can be composited again by the main thread
+        maxPendingShots: maximum number of rendered shots waiting to be composited
+        profiler: optional RenderProfiler in which the stages of the compositing thread are recorded as spans
+        """
+        self._compositeFunction = compositeFunction
+        self._cleanupFunction = cleanupFunction
+        self._pendingShots = queue.Queue(maxsize=max(1, maxPendingShots))
+        self._finishedShots = queue.Queue()
+        self._profiler = profiler
+
+        self.stageTimes = {"render": 0.0, "wait": 0.0, "composite": 0.0, "cleanup": 0.0}
+        self.wallTime = 0.0
+        self._startTime = time.monotonic()
+
+        self._thread = threading.Thread(target=self._run, name="ShotManagerCompositing", daemon=True)
+        self._thread.start()
+
+    def addStageTime(self, stageName, duration):
+        self.stageTimes[stageName] += duration
+
+    def submit(self, shotSequence):
+        """Add the rendered shot to the queue. Wait if the queue is full"""
+        startTime = time.monotonic()
+        self._pendingShots.put(shotSequence)
+        self.stageTimes["wait"] += time.monotonic() - startTime
+
+    def popFinished(self):
+        """Return the list of the tupples (shotSequence, error) of the shots processed since the last call
+        error is None if the compositing succeeded
+        """
+        finishedShots = []
+        while True:
+            try:
+                finishedShots.append(self._finishedShots.get_nowait())
+            except queue.Empty:
+                return finishedShots
+
+    def close(self):
+        """Wait for the compositing of all the submitted shots and stop the compositing thread"""
+        startTime = time.monotonic()
+        self._pendingShots.put(None)
+        self._thread.join()
+        self.stageTimes["wait"] += time.monotonic() - startTime
+        self.wallTime = time.monotonic() - self._startTime
+
+    def getReport(self):
+        """Return, for each stage, its busy time in seconds and its utilisation, ratio of the busy time to the
+        duration of the pipeline
+        """
+        wallTime = self.wallTime if 0.0 < self.wallTime else time.monotonic() - self._startTime
+        return {
+            "wall_time": wallTime,
+            "stages": {
+                stageName: {"busy_time": busyTime, "utilisation": busyTime / wallTime if 0.0 < wallTime else 0.0}
+                for stageName, busyTime in self.stageTimes.items()
+            },
+        }
+
+    def printReport(self):
+        report = self.getReport()
+        print(f"\nRender pipeline: {report['wall_time']:0.2f} sec.")
+        for stageName, stageReport in report["stages"].items():
+            print(
+                f"{stageName:>20}: {stageReport['busy_time']:0.2f} sec., "
+                f"utilisation: {stageReport['utilisation'] * 100:0.0f}%"
+            )
+
+    def _beginSpan(self, stageName, shotSequence):
+        if self._profiler is not None:
+            self._profiler.begin(stageName, "stage", shot=shotSequence["shot_name"])
+
+    def _endSpan(self):
+        if self._profiler is not None:
+            self._profiler.end()
+
+    def _run(self):
+        while True:
+            shotSequence = self._pendingShots.get()
+            if shotSequence is None:
+                return
+
+            error = None
+            startTime = time.monotonic()
+            self._beginSpan("composite", shotSequence)
+            try:
+                self._compositeFunction(shotSequence)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            self._endSpan()
+            self.stageTimes["composite"] += time.monotonic() - startTime
+
+            if error is None:
+                startTime = time.monotonic()
+                self._beginSpan("cleanup", shotSequence)
+                try:
+                    self._cleanupFunction(shotSequence)
+                except Exception as e:
+                    _logger.error(f"Cleaning of shot {shotSequence['shot_name']} failed: {e}")
+                self._endSpan()
+                self.stageTimes["cleanup"] += time.monotonic() - startTime
+
+            self._finishedShots.put((shotSequence, error))
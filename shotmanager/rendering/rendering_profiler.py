@@ -0,0 +1,259 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Timing and profiling of the renders
+
+The render is instrumented with nested spans: take, shot, stage and frame. For each span the profiler records its
+duration, the peak memory of the process sampled at the boundaries of the span and of its children, and, when a
+directory is associated to the span, the disk usage of this directory at the end of the span.
+Counters record events such as the writes of RNA properties done by Shot Manager during the render.
+The result is exported as a json report and as a Chrome trace event file, that can be opened in chrome://tracing
+or in Perfetto.
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+import json
+import os
+import sys
+import threading
+import time
+
+from shotmanager.rendering.rendering_parallel import writeJsonFile
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def getProcessMemory():
+    """Return the resident memory of the current process in bytes, 0 if it cannot be obtained"""
+    try:
+        if sys.platform.startswith("win"):
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(PROCESS_MEMORY_COUNTERS)
+            ctypes.windll.psapi.GetProcessMemoryInfo(
+                ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb
+            )
+            return counters.WorkingSetSize
+
+        if os.path.exists("/proc/self/statm"):
+            with open("/proc/self/statm", "r") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+        import resource
+
+        # peak memory of the process, in bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except Exception:
+        return 0
+
+
+def getDirectorySize(dirPath):
+    """Return the size in bytes of the files of the directory, sub-directories included"""
+    size = 0
+    for root, _dirs, files in os.walk(dirPath):
+        for fileName in files:
+            try:
+                size += os.path.getsize(os.path.join(root, fileName))
+            except OSError:
+                pass
+    return size
+
+
+class RnaWriteCounter:
+    """Proxy of a Blender struct counting the writes of its properties"""
+
+    def __init__(self, struct, counters, counterName):
+        object.__setattr__(self, "_struct", struct)
+        object.__setattr__(self, "_counters", counters)
+        object.__setattr__(self, "_counterName", counterName)
+
+    def __getattr__(self, name):
+        return getattr(object.__getattribute__(self, "_struct"), name)
+
+    def __setattr__(self, name, value):
+        object.__getattribute__(self, "_counters")[object.__getattribute__(self, "_counterName")] += 1
+        setattr(object.__getattribute__(self, "_struct"), name, value)
+
+
+class RenderProfiler:
+    """Nested timing spans and counters of a render. Spans can be opened in several threads"""
+
+    def __init__(self):
+        self.spans = []
+        self.counters = defaultdict(int)
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._threadStacks = threading.local()
+
+    def _getStack(self):
+        stack = getattr(self._threadStacks, "stack", None)
+        if stack is None:
+            stack = []
+            self._threadStacks.stack = stack
+        return stack
+
+    def begin(self, name, category, diskPath=None, **args):
+        """Open a span, child of the last span opened in the current thread and not closed yet
+        category: "take", "shot", "stage" or "frame"
+        diskPath: directory which size is recorded at the end of the span
+        """
+        stack = self._getStack()
+        memory = getProcessMemory()
+        span = {
+            "name": name,
+            "category": category,
+            "thread": threading.current_thread().name,
+            "depth": len(stack),
+            "start": time.perf_counter() - self._origin,
+            "duration": None,
+            "memory_peak": memory,
+            "disk_usage": None,
+            "args": args,
+        }
+        stack.append((span, diskPath))
+        return span
+
+    def end(self, **args):
+        """Close the last span opened in the current thread and return it"""
+        stack = self._getStack()
+        if not len(stack):
+            _logger.error("RenderProfiler.end: no span opened")
+            return None
+
+        span, diskPath = stack.pop()
+        span["duration"] = time.perf_counter() - self._origin - span["start"]
+        span["memory_peak"] = max(span["memory_peak"], getProcessMemory())
+        if diskPath is not None and os.path.exists(diskPath):
+            span["disk_usage"] = getDirectorySize(diskPath)
+        span["args"].update(args)
+
+        # the peak memory of a span includes the one of its children
+        if len(stack):
+            parentSpan = stack[-1][0]
+            parentSpan["memory_peak"] = max(parentSpan["memory_peak"], span["memory_peak"])
+
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name, category, diskPath=None, **args):
+        self.begin(name, category, diskPath=diskPath, **args)
+        try:
+            yield
+        finally:
+            self.end()
+
+    def addCount(self, counterName, count=1):
+        with self._lock:
+            self.counters[counterName] += count
+
+    def countWrites(self, struct, counterName="rna_writes"):
+        """Return a proxy of the Blender struct counting the writes of its properties in the specified counter"""
+        return RnaWriteCounter(struct, self.counters, counterName)
+
+    def getStageTotals(self):
+        """Return, for each span name of the "stage" category, its total duration"""
+        totals = defaultdict(float)
+        for span in self.spans:
+            if "stage" == span["category"]:
+                totals[span["name"]] += span["duration"]
+        return dict(totals)
+
+    def getReport(self):
+        spans = sorted(self.spans, key=lambda s: s["start"])
+        return {"spans": spans, "stage_totals": self.getStageTotals(), "counters": dict(self.counters)}
+
+    def writeJson(self, filePath):
+        writeJsonFile(filePath, self.getReport())
+
+    def writeChromeTrace(self, filePath):
+        """Write the spans in the Chrome trace event format, with the memory of the process as a counter"""
+        pid = os.getpid()
+        threadIds = dict()
+        events = []
+        for span in sorted(self.spans, key=lambda s: s["start"]):
+            tid = threadIds.setdefault(span["thread"], len(threadIds))
+            args = dict(span["args"])
+            args["memory_peak_mb"] = round(span["memory_peak"] / (1024 * 1024), 1)
+            if span["disk_usage"] is not None:
+                args["disk_usage_mb"] = round(span["disk_usage"] / (1024 * 1024), 1)
+            events.append(
+                {
+                    "name": span["name"],
+                    "cat": span["category"],
+                    "ph": "X",
+                    "ts": span["start"] * 1e6,
+                    "dur": span["duration"] * 1e6,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": args,
+                }
+            )
+            if "frame" != span["category"]:
+                events.append(
+                    {
+                        "name": "Memory",
+                        "ph": "C",
+                        "ts": (span["start"] + span["duration"]) * 1e6,
+                        "pid": pid,
+                        "args": {"peak_mb": args["memory_peak_mb"]},
+                    }
+                )
+        for threadName, tid in threadIds.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": threadName}})
+
+        with open(filePath, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def printSummary(self):
+        print("\nRender times:")
+        for span in sorted(self.spans, key=lambda s: s["start"]):
+            if span["category"] in ("take", "shot"):
+                indent = "   " * span["depth"]
+                print(
+                    f"{indent}{span['name']}: {span['duration']:0.2f} sec., "
+                    f"peak memory: {span['memory_peak'] / (1024 * 1024):0.0f} MB"
+                )
+        print("  Stages:")
+        for stageName, duration in self.getStageTotals().items():
+            print(f"{stageName:>20}: {duration:0.2f} sec.")
+        if len(self.counters):
+            print("  Counters:")
+            for counterName, count in self.counters.items():
+                print(f"{counterName:>20}: {count}")
+        print("\n")
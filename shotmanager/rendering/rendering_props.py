@@ -63,6 +63,104 @@ class UAS_ShotManager_RenderGlobalContext(PropertyGroup):
         options=set(),
     )
 
+    renderParallelWorkers: IntProperty(
+        name="Parallel Workers",
+        description="Number of background Blender processes rendering the shots in parallel.\n"
+        "The videos are then composited in the current session.\n"
+        "1 means that the shots are rendered one after the other in the current session",
+        min=1,
+        soft_max=32,
+        default=1,
+        options=set(),
+    )
+
+    compositingBackend: EnumProperty(
+        name="Compositing",
+        description="Tool used to composite the rendered images, the stamp info and the sound into the shot videos,\n"
+        "and to join the shot videos into the sequence video",
+        items=(
+            ("VSE", "VSE", "Composite the videos in temporary scenes of the Video Sequence Editor"),
+            (
+                "FFMPEG",
+                "FFmpeg",
+                "Composite the shot videos with an ffmpeg process and concatenate them into the sequence video.\n"
+                "The VSE is used for the sequence when the shot videos are not compatible",
+            ),
+        ),
+        default="VSE",
+        options=set(),
+    )
+
+    ffmpegPath: StringProperty(
+        name="FFmpeg Executable",
+        description="Path of the ffmpeg executable.\nIf empty, ffmpeg is searched in the directories of the PATH",
+        subtype="FILE_PATH",
+        default="",
+        options=set(),
+    )
+
+    renderPipelineQueueSize: IntProperty(
+        name="Pending Shots",
+        description="Maximum number of rendered shots waiting to be composited by ffmpeg while the next shots\n"
+        "are rendered. Each pending shot keeps its rendered images on disk.\n"
+        "0 means that each shot is composited before the rendering of the next one",
+        min=0,
+        soft_max=8,
+        default=2,
+        options=set(),
+    )
+
+    stampInfoGenerationMode: EnumProperty(
+        name="Stamp Info",
+        description="Generation of the Stamp Info images of the shots",
+        items=(
+            ("PER_FRAME", "Per Frame", "Stamp Info renders the full image of each frame"),
+            (
+                "TEMPLATE",
+                "Template",
+                "Stamp Info renders the layout of each shot once, then only the frame numbers are drawn\n"
+                "for each frame, at the place where Stamp Info draws them, in its text color.\n"
+                "The font and the labels of the frame numbers are an approximation of the ones of Stamp Info.\n"
+                "Not available in background mode",
+            ),
+        ),
+        default="PER_FRAME",
+        options=set(),
+    )
+
+    audioMixdownMode: EnumProperty(
+        name="Sound Mixdown",
+        description="Computation of the sound of the shots",
+        items=(
+            ("PER_SHOT", "Per Shot", "The sound of the scene is mixed down for each shot"),
+            (
+                "TAKE",
+                "Take",
+                "The sound of the take is mixed down once, then the sound of each shot is cut from this mix",
+            ),
+        ),
+        default="PER_SHOT",
+        options=set(),
+    )
+
+    audioCutProcesses: IntProperty(
+        name="Sound Cut Processes",
+        description="Number of processes cutting the sound of the shots from the mix of the take.\n"
+        "1 means that the sound is cut in the current session",
+        min=1,
+        soft_max=16,
+        default=1,
+        options=set(),
+    )
+
+    printFrameInfo: BoolProperty(
+        name="Print Frame Info",
+        description="Print the information of each rendered frame in the console.\n"
+        "The timing of the frames is recorded in the render profile of the take in any case",
+        default=False,
+        options=set(),
+    )
+
     def _update_renderEngine(self, context):
         pass
 
@@ -340,6 +438,20 @@ class UAS_ShotManager_RenderSettings(PropertyGroup):
 
     rerenderExistingShotVideos: BoolProperty(name="Re-render Exisiting Shot Videos", default=True)
 
+    resumeRender: BoolProperty(
+        name="Resume Render",
+        description="Resume the previous render of the take from its job manifest: only the shots and the stages\n"
+        "that were not finished, or that changed since, are rendered",
+        default=False,
+    )
+
+    useRenderCache: BoolProperty(
+        name="Use Render Cache",
+        description="Render only the shots that changed since their last render.\n"
+        "The other shot videos are reused",
+        default=False,
+    )
+
     bypass_rendering_project_settings: BoolProperty(
         name="Bypass Project Settings",
         description="When Project Settings are used this allows the use of custom rendering settings",
@@ -0,0 +1,260 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Stamp Info images generated from a template rendered once per shot
+
+Stamp Info renders a full image for each frame, even if only the frame numbers change from one frame to the next.
+Here the layout of the shot (logo, take, shot, camera, notes, borders...) is rendered once by Stamp Info with the
+frame fields disabled, and once with them enabled: the pixels differing between the two images give the block where
+Stamp Info draws the frame fields. For each frame, only the text of the frame fields is drawn, in an offscreen buffer
+of the size of this block, and composited over the template at its place in the text color of Stamp Info. The font
+and the labels of the fields are the ones of Blender and Shot Manager, an approximation of the ones of Stamp Info.
+The images are encoded and written to disk by a pool of threads.
+The offscreen drawing requires the GPU, hence the template mode is not available when Blender runs in background.
+The template is rendered at the first frame of the shot, so the template mode is not used when the data of the
+camera is animated, the lens for example.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import shutil
+import struct
+import time
+import zlib
+
+import numpy as np
+
+import bgl
+import blf
+import gpu
+from mathutils import Matrix
+
+import bpy
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+# Stamp Info properties of the fields changing at each frame, drawn by Shot Manager in template mode
+_frameFieldsUsedProperties = ("currentFrameUsed", "videoFrameUsed", "edit3DFrameUsed")
+
+_templateFileName = "_tmp_StampInfo_template.png"
+_frameFieldsTemplateFileName = "_tmp_StampInfo_template_frameFields.png"
+
+# maximum number of images waiting to be written by the thread pool, per thread
+_maxPendingImagesPerThread = 2
+
+
+def writePngFile(filePath, pixels):
+    """Write the RGBA image in a png file
+    pixels: numpy uint8 array of shape (height, width, 4), the bottom row first as in Blender images
+    """
+    height, width = pixels.shape[:2]
+    rawRows = np.zeros((height, width * 4 + 1), dtype=np.uint8)  # the first byte of each row is the filter type
+    rawRows[:, 1:] = np.flipud(pixels).reshape(height, width * 4)
+
+    def _chunk(chunkType, data):
+        return (
+            struct.pack(">I", len(data))
+            + chunkType
+            + data
+            + struct.pack(">I", zlib.crc32(chunkType + data) & 0xFFFFFFFF)
+        )
+
+    with open(filePath, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)))
+        # the images are temporary, they are compressed for speed, not for size
+        f.write(_chunk(b"IDAT", zlib.compress(rawRows.tobytes(), 1)))
+        f.write(_chunk(b"IEND", b""))
+
+
+def loadImagePixels(filePath):
+    """Return the pixels of the image file as a numpy uint8 array of shape (height, width, 4), bottom row first"""
+    image = bpy.data.images.load(filePath, check_existing=False)
+    try:
+        width, height = image.size
+        pixels = np.empty(width * height * 4, dtype=np.float32)
+        image.pixels.foreach_get(pixels)
+    finally:
+        bpy.data.images.remove(image)
+    return (pixels.reshape(height, width, 4) * 255.0 + 0.5).astype(np.uint8)
+
+
+class FrameFieldsDrawer:
+    """Draw lines of text in white on a transparent offscreen buffer and return their coverage"""
+
+    def __init__(self, width, height, numLines, fontSize):
+        """width, height: size of the block of the frame fields, the lines are spread over its height"""
+        self.fontId = 0
+        self.fontSize = fontSize
+        self.width = width
+        self.height = height
+        self.lineHeight = height / numLines
+        self.offscreen = gpu.types.GPUOffScreen(self.width, self.height)
+        self._buffer = bgl.Buffer(bgl.GL_BYTE, self.width * self.height * 4)
+
+    def free(self):
+        self.offscreen.free()
+
+    def draw(self, lines):
+        """Return the coverage of the text as a numpy float32 array of shape (height, width, 1), bottom row first"""
+        with self.offscreen.bind():
+            bgl.glClearColor(0.0, 0.0, 0.0, 0.0)
+            bgl.glClear(bgl.GL_COLOR_BUFFER_BIT)
+            with gpu.matrix.push_pop():
+                # pixel coordinates
+                gpu.matrix.load_matrix(Matrix.Identity(4))
+                gpu.matrix.load_projection_matrix(
+                    Matrix(
+                        (
+                            (2.0 / self.width, 0.0, 0.0, -1.0),
+                            (0.0, 2.0 / self.height, 0.0, -1.0),
+                            (0.0, 0.0, 1.0, 0.0),
+                            (0.0, 0.0, 0.0, 1.0),
+                        )
+                    )
+                )
+                blf.size(self.fontId, self.fontSize, 72)
+                blf.color(self.fontId, 1.0, 1.0, 1.0, 1.0)
+                textHeight = blf.dimensions(self.fontId, "A")[1]
+                for lineInd, line in enumerate(reversed(lines)):
+                    # text left aligned and vertically centered in its line
+                    blf.position(self.fontId, 0, (lineInd + 0.5) * self.lineHeight - textHeight / 2, 0)
+                    blf.draw(self.fontId, line)
+
+            bgl.glReadBuffer(bgl.GL_BACK)
+            bgl.glReadPixels(0, 0, self.width, self.height, bgl.GL_RGBA, bgl.GL_UNSIGNED_BYTE, self._buffer)
+
+        # white text drawn on black: the red channel is the coverage
+        pixels = np.array(self._buffer.to_list(), dtype=np.int16).astype(np.uint8)
+        return (pixels.reshape(self.height, self.width, 4)[:, :, 0:1] / 255.0).astype(np.float32)
+
+
+def _compositeAndWrite(templatePixels, coverage, textColor, origin, filePath):
+    """textColor: RGBA color of the text, as a numpy float32 array of values in [0, 1]"""
+    pixels = templatePixels.copy()
+    y, x = origin
+    height, width = coverage.shape[:2]
+    region = pixels[y : y + height, x : x + width].astype(np.float32)
+    alpha = coverage * textColor[3]
+    region = 255.0 * textColor * alpha + region * (1.0 - alpha)
+    pixels[y : y + height, x : x + width] = (region + 0.5).astype(np.uint8)
+    writePngFile(filePath, pixels)
+
+
+def _getDifferenceBox(pixels, otherPixels):
+    """Return the box (y, x, height, width) of the pixels differing between the 2 images, None if they are equal"""
+    different = np.any(pixels != otherPixels, axis=2)
+    rows = np.flatnonzero(np.any(different, axis=1))
+    if not len(rows):
+        return None
+    columns = np.flatnonzero(np.any(different, axis=0))
+    return (int(rows[0]), int(columns[0]), int(rows[-1] - rows[0] + 1), int(columns[-1] - columns[0] + 1))
+
+
+def isTemplateModeAvailable(camera=None):
+    """Return False if the images have to be fully rendered by Stamp Info for each frame"""
+    if bpy.app.background:
+        return False
+    # the camera fields are rendered in the template at the first frame of the shot
+    if camera is not None and camera.data is not None:
+        animData = camera.data.animation_data
+        if animData is not None and (animData.action is not None or len(animData.drivers)):
+            return False
+    return True
+
+
+def renderStampInfoFromTemplate(stampInfoSettings, scene, frames, renderPath, getFrameFieldsLines):
+    """Render the Stamp Info images of the specified frames in renderPath, as _tmp_StampInfo.#####.png files
+    The Stamp Info settings of the shot have to be set before the call
+    getFrameFieldsLines: function(frame, frameFieldsUsed) returning the lines of text of the frame fields, where
+        frameFieldsUsed is a dictionary giving for each Stamp Info property of _frameFieldsUsedProperties its value
+    Return a dictionary with the durations of the template render and of the generation of each frame, in seconds
+    """
+    startTime = time.monotonic()
+
+    def _getFramePath(frame):
+        return renderPath + "_tmp_StampInfo." + "{:05d}".format(frame) + ".png"
+
+    # template: Stamp Info layout without the frame fields
+    frameFieldsUsed = {propName: getattr(stampInfoSettings, propName, False) for propName in _frameFieldsUsedProperties}
+    scene.frame_set(frames[0])
+    try:
+        for propName in frameFieldsUsed.keys():
+            setattr(stampInfoSettings, propName, False)
+        stampInfoSettings.renderTmpImageWithStampedInfo(
+            scene, frames[0], renderPath=renderPath, renderFilename=_templateFileName, verbose=False
+        )
+    finally:
+        for propName, value in frameFieldsUsed.items():
+            setattr(stampInfoSettings, propName, value)
+
+    if not any(frameFieldsUsed.values()):
+        # no frame fields: all the images are the template
+        templateTime = time.monotonic() - startTime
+        for frame in frames:
+            shutil.copyfile(renderPath + _templateFileName, _getFramePath(frame))
+        framesTime = time.monotonic() - startTime - templateTime
+        return {"template_time": templateTime, "per_frame_time": framesTime / len(frames), "num_frames": len(frames)}
+
+    # the frame fields are drawn at the place of the ones rendered by Stamp Info
+    stampInfoSettings.renderTmpImageWithStampedInfo(
+        scene, frames[0], renderPath=renderPath, renderFilename=_frameFieldsTemplateFileName, verbose=False
+    )
+    templatePixels = loadImagePixels(renderPath + _templateFileName)
+    frameFieldsBox = _getDifferenceBox(templatePixels, loadImagePixels(renderPath + _frameFieldsTemplateFileName))
+    if frameFieldsBox is None:
+        raise RuntimeError("The frame fields are not drawn by Stamp Info")
+
+    imageHeight, imageWidth = templatePixels.shape[:2]
+    fontSize = max(8, int(getattr(stampInfoSettings, "fontScaleHNorm", 0.0168) * imageHeight))
+    numLines = len(getFrameFieldsLines(frames[-1], frameFieldsUsed))
+
+    # the block is extended to the right since the lines can be longer than the ones of the first frame
+    y, x, height, width = frameFieldsBox
+    width = imageWidth - x
+    drawer = FrameFieldsDrawer(width, height, numLines, fontSize)
+    textColor = np.array(tuple(getattr(stampInfoSettings, "textColor", (1.0, 1.0, 1.0, 1.0))), dtype=np.float32)
+    if 3 == len(textColor):
+        textColor = np.append(textColor, np.float32(1.0))
+    origin = (y, x)
+    templateTime = time.monotonic() - startTime
+
+    numThreads = max(1, (os.cpu_count() or 1) - 1)
+    pendingImages = []
+    try:
+        with ThreadPoolExecutor(max_workers=numThreads) as pool:
+            for frame in frames:
+                coverage = drawer.draw(getFrameFieldsLines(frame, frameFieldsUsed))
+                pendingImages.append(
+                    pool.submit(_compositeAndWrite, templatePixels, coverage, textColor, origin, _getFramePath(frame))
+                )
+
+                # the number of images in memory is bounded
+                if _maxPendingImagesPerThread * numThreads < len(pendingImages):
+                    pendingImages.pop(0).result()
+
+            for pendingImage in pendingImages:
+                pendingImage.result()
+    finally:
+        drawer.free()
+
+    framesTime = time.monotonic() - startTime - templateTime
+    return {"template_time": templateTime, "per_frame_time": framesTime / len(frames), "num_frames": len(frames)}
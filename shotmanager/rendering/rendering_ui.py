@@ -163,6 +163,24 @@ def draw3DRenderPanel(self, context):
         row.label(text="Quality:")
         row.prop(props.renderContext, "renderQuality", text="")
 
+    row = layout.row(align=False)
+    row.prop(props.renderContext, "renderParallelWorkers")
+    row = layout.row(align=False)
+    row.prop(props.renderContext, "audioMixdownMode", expand=True)
+    if "TAKE" == props.renderContext.audioMixdownMode:
+        row.prop(props.renderContext, "audioCutProcesses", text="Processes")
+    row = layout.row(align=False)
+    row.prop(props.renderContext, "stampInfoGenerationMode", expand=True)
+    row = layout.row(align=False)
+    row.prop(props.renderContext, "compositingBackend", expand=True)
+    if "FFMPEG" == props.renderContext.compositingBackend:
+        row = layout.row(align=False)
+        row.prop(props.renderContext, "ffmpegPath")
+        row = layout.row(align=False)
+        row.prop(props.renderContext, "renderPipelineQueueSize")
+    row = layout.row(align=False)
+    row.prop(props.renderContext, "printFrameInfo")
+
     layout.separator()
 
     row = layout.row(align=True)
@@ -279,6 +297,9 @@ def draw3DRenderPanel(self, context):
         row = box.row()
         row.prop(props.renderSettingsAll, "rerenderExistingShotVideos")
         row = box.row()
+        row.prop(props.renderSettingsAll, "useRenderCache")
+        row.prop(props.renderSettingsAll, "resumeRender")
+        row = box.row()
         row.prop(props.renderSettingsAll, "generateEditVideo")
 
         if props.use_project_settings:
@@ -21,6 +21,9 @@ Retimer functions
 
 import bpy
 
+from . import retimer_batch
+from . import retimer_preview
+
 
 # FCurve
 ################################################
@@ -55,42 +58,11 @@ class FCurve:
         kf = self.fcurve.keyframe_points.insert(coordinates[0], coordinates[1])
 
     def remove_frames(self, start_incl, end_incl, remove_gap=False):
-        to_remove = list()
-
-        for k in self.fcurve.keyframe_points:
-            #    print(f" FCurve.remove_frames  start_incl:{start_incl}, k.co[0]: {k.co[0]}, end_incl: {end_incl}")
-            if start_incl <= k.co[0] <= end_incl:
-                to_remove.append(k)
-
-        # wkip to delete
-        # if remove_gap and False:
-        #     # the handle values of the start and end must be stored before deletion otherwise they are modified
-        #     start_incl_key_index = self.get_key_index_at_frame(start_incl - 1)
-        #     print(f" rr start_incl_key_index {start_incl_key_index}")
-        #     start_incl_key_right_handle_right = None
-        #     if -1 != start_incl_key_index:
-        #         start_incl_key_right_handle_right = self.fcurve.keyframe_points[start_incl_key_index].handle_right
-        #         print(
-        #             f" rr02 start_incl_key_right_handle_right {start_incl_key_right_handle_right}, type: {self.fcurve.keyframe_points[start_incl_key_index].handle_right_type}"
-        #         )
-        # end_incl_key = self.get_key_index_at_frame(start_incl)
-
-        for k in reversed(to_remove):
-            self.fcurve.keyframe_points.remove(k)
-
-        # wkip to delete
-        # if remove_gap and False:
-        #     print("Fixing 00")
-        #     # restore handles
-        #     if -1 != start_incl_key_index and start_incl_key_right_handle_right is not None:
-        #         print("Fixing")
-        #         self.fcurve.keyframe_points[start_incl_key_index].handle_right[0] = start_incl_key_right_handle_right[0]
-        #         print(f" rr03 start_incl_key_right_handle_right {start_incl_key_right_handle_right}")
-        #         start_incl_key_right_handle_right02 = self.fcurve.keyframe_points[start_incl_key_index].handle_right
-        #         print(f" rr04 start_incl_key_right_handle_right02 {start_incl_key_right_handle_right02}")
-
-        if remove_gap:
-            _offset_frames(self, end_incl, start_incl - end_incl - 1)
+        """Remove the keys in the range [start_incl, end_incl]. If remove_gap is True the keys after the range are
+        moved to its start. The keyframe array is rebuilt once, see retimer_batch.remove_keys
+        """
+        gap_offset = start_incl - end_incl - 1 if remove_gap else 0
+        retimer_batch.remove_keys(self.fcurve, start_incl, end_incl, gap_offset=gap_offset)
 
     def __len__(self):
         return len(self.fcurve.keyframe_points)
@@ -723,6 +695,58 @@ def retime_vse(scene, mode, start_frame, end_frame, remove_gap=True):
         remove_time(sed, start_frame, end_frame, remove_gap)
 
 
+def compute_retimed_frame(frame_value, mode, start_incl, end_incl, duration_incl, pivot, factor):
+    new_frame_value = frame_value
+
+    if "INSERT" == mode:
+        if start_incl <= frame_value:
+            new_frame_value = frame_value + duration_incl
+    elif "DELETE" == mode:
+        if start_incl <= frame_value:
+            if end_incl < frame_value:
+                new_frame_value = frame_value - duration_incl
+            else:
+                new_frame_value = start_incl
+    elif "RESCALE" == mode:
+        new_frame_value = rescale_frame(frame_value, start_incl, end_incl, pivot, factor)
+
+    # no operation for CLEAR_ANIM
+
+    return new_frame_value
+
+
+def compute_retimed_scene_range(scene, mode, start_incl, end_incl, duration_incl, pivot, factor):
+    """Return the tupple (frame_start, frame_end, frame_preview_start, frame_preview_end) of the scene once retimed"""
+    new_range_start = compute_retimed_frame(scene.frame_start, mode, start_incl, end_incl, duration_incl, pivot, factor)
+    new_range_end = compute_retimed_frame(scene.frame_end, mode, start_incl, end_incl, duration_incl, pivot, factor)
+    new_range_preview_start = compute_retimed_frame(
+        scene.frame_preview_start, mode, start_incl, end_incl, duration_incl, pivot, factor
+    )
+    new_range_preview_end = compute_retimed_frame(
+        scene.frame_preview_end, mode, start_incl, end_incl, duration_incl, pivot, factor
+    )
+
+    # extension of the animation range end is wanted in these cases
+    if "INSERT" == mode:
+        if scene.frame_start == start_incl:
+            new_range_start = start_incl
+        if scene.frame_preview_start == start_incl:
+            new_range_preview_start = start_incl
+
+        if scene.frame_end == start_incl:
+            new_range_end = end_incl + 1
+        if scene.frame_end == start_incl:
+            new_range_preview_end = end_incl + 1
+
+    # print(f"\n scene range: new start_incl: {new_range_start}, new end_incl: {new_range_end}")
+    return (
+        max(new_range_start, 0),
+        max(new_range_end, 0),
+        max(new_range_preview_start, 0),
+        max(new_range_preview_end, 0),
+    )
+
+
 def retimeScene(
     context,
     retimerProps,
@@ -733,6 +757,9 @@ def retimeScene(
     join_gap=True,
     factor=1.0,
     pivot=0,
+    batch_engine=True,
+    dry_run=False,
+    build_diff=False,
 ):
     """Apply the time change for each type of entities
     
@@ -747,7 +774,17 @@ def retimeScene(
     Args:
         start_incl (int): The included start frame
         duration_incl (int): The range of retime frames (new or deleted)
+        batch_engine (bool): If True the changes are planned first, the keys of all the F-curves being retimed
+            together by retimer_batch, then written in bulk (see retimer_preview.RetimeDiff). Otherwise the
+            F-curves are retimed key by key through FCurve. Both give the same results
+        dry_run (bool): If True nothing is modified and a retimer_preview.RetimeReport of the changes is returned
+        build_diff (bool): In dry run, also store in the report the changes to apply, see retimer_preview.RetimeDiff
     """
+    if dry_run:
+        return retimer_preview.preview_retime_scene(
+            context, retimerProps, mode, objects, start_incl, duration_incl, join_gap, factor, pivot, build_diff
+        )
+
     prefs = context.preferences.addons["shotmanager"].preferences
     scene = context.scene
     end_incl = start_incl + duration_incl - 1
@@ -756,6 +793,13 @@ def retimeScene(
         f" - retimeScene(): {retimerProps.mode}, start_incl: {start_incl}, end_incl: {end_incl}, duration_incl: {duration_incl}"
     )
 
+    if batch_engine:
+        report = retimer_preview.preview_retime_scene(
+            context, retimerProps, mode, objects, start_incl, duration_incl, join_gap, factor, pivot, build_diff=True
+        )
+        report.diff.apply(context)
+        return ()
+
     #    print("Retiming scene: , factor: ", mode, factor)
     retime_args = (mode, start_incl, end_incl, join_gap, factor, pivot)
     #    print("retime_args: ", retime_args)
@@ -849,57 +893,14 @@ def retimeScene(
             for shot in shotList:
                 retime_shot(shot, *retime_args)
 
-    # anim range
-    def compute_retimed_frame(frame_value, mode, start_incl, end_incl, duration_incl, pivot, factor):
-        new_frame_value = frame_value
-
-        if "INSERT" == mode:
-            if start_incl <= frame_value:
-                new_frame_value = frame_value + duration_incl
-        elif "DELETE" == mode:
-            if start_incl <= frame_value:
-                if end_incl < frame_value:
-                    new_frame_value = frame_value - duration_incl
-                else:
-                    new_frame_value = start_incl
-        elif "RESCALE" == mode:
-            new_frame_value = rescale_frame(frame_value, start_incl, end_incl, pivot, factor)
-
-        # no operation for CLEAR_ANIM
-
-        return new_frame_value
-
     # anim range
     if prefs.applyToSceneRange and "CLEAR_ANIM" != mode:
-
-        new_range_start = compute_retimed_frame(
-            scene.frame_start, mode, start_incl, end_incl, duration_incl, pivot, factor
-        )
-        new_range_end = compute_retimed_frame(scene.frame_end, mode, start_incl, end_incl, duration_incl, pivot, factor)
-        new_range_preview_start = compute_retimed_frame(
-            scene.frame_preview_start, mode, start_incl, end_incl, duration_incl, pivot, factor
-        )
-        new_range_preview_end = compute_retimed_frame(
-            scene.frame_preview_end, mode, start_incl, end_incl, duration_incl, pivot, factor
-        )
-
-        # extension of the animation range end is wanted in these cases
-        if "INSERT" == mode:
-            if scene.frame_start == start_incl:
-                new_range_start = start_incl
-            if scene.frame_preview_start == start_incl:
-                new_range_preview_start = start_incl
-
-            if scene.frame_end == start_incl:
-                new_range_end = end_incl + 1
-            if scene.frame_end == start_incl:
-                new_range_preview_end = end_incl + 1
-
-        # print(f"\n scene range: new start_incl: {new_range_start}, new end_incl: {new_range_end}")
-        scene.frame_start = max(new_range_start, 0)
-        scene.frame_end = max(new_range_end, 0)
-        scene.frame_preview_start = max(new_range_preview_start, 0)
-        scene.frame_preview_end = max(new_range_preview_end, 0)
+        (
+            scene.frame_start,
+            scene.frame_end,
+            scene.frame_preview_start,
+            scene.frame_preview_end,
+        ) = compute_retimed_scene_range(scene, mode, start_incl, end_incl, duration_incl, pivot, factor)
 
     # time cursor
     if prefs.applyToTimeCursor and "CLEAR_ANIM" != mode:
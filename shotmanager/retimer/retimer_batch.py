@@ -0,0 +1,397 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Batched retime engine for the F-curves
+
+The coordinates and the handles of all the keyframes of an F-curve are read with one foreach_get call each,
+retimed with array operations and written back with one foreach_set call each, instead of being accessed through
+RNA key by key as in retimer.FCurve.
+The computations are done in double precision on the values read in single precision, then stored in single
+precision, which is what happens when the keys are modified one by one from Python: the results are the same as
+the ones of retimer.retime_frames.
+The removal of a range of keys (remove_keys) also rebuilds the keyframe array in one pass instead of removing the
+keys one by one, which reallocates the array at each removal.
+The frames of the grease pencil layers are retimed the same way from their frame numbers (GPLayerRetimePlan).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+import os
+import time
+
+import numpy as np
+
+from . import retimer
+
+_keyframeArrays = ("co", "handle_left", "handle_right")
+
+# properties of the keyframes that can be accessed with foreach_get and foreach_set: name, values per key, type
+_keyframeRawProperties = (
+    ("co", 2, np.float32),
+    ("handle_left", 2, np.float32),
+    ("handle_right", 2, np.float32),
+    ("back", 1, np.float32),
+    ("amplitude", 1, np.float32),
+    ("period", 1, np.float32),
+    ("select_control_point", 1, np.bool_),
+    ("select_left_handle", 1, np.bool_),
+    ("select_right_handle", 1, np.bool_),
+)
+
+# enum properties of the keyframes, not supported by foreach_get and foreach_set
+_keyframeEnumProperties = ("interpolation", "easing", "handle_left_type", "handle_right_type", "type")
+
+# minimum number of keys per thread when the keys are retimed by chunks
+_keysPerThread = 100000
+
+
+class KeyframeArrays:
+    """Coordinates and handles of the keyframes of an F-curve, as arrays of shape (number of keys, 2)
+    The arrays are read from the F-curve when they are not specified
+    """
+
+    def __init__(self, fcurve, co=None, handle_left=None, handle_right=None):
+        self.fcurve = fcurve
+        if co is None:
+            self.read()
+        else:
+            self.co = co
+            self.handle_left = handle_left
+            self.handle_right = handle_right
+
+    @classmethod
+    def from_fcurves(cls, fcurves):
+        """Read the keys of all the F-curves into one set of arrays
+        Return the arrays and the list of the bounds of the keys of each F-curve in the arrays
+        """
+        bounds = [0]
+        for fcurve in fcurves:
+            bounds.append(bounds[-1] + len(fcurve.keyframe_points))
+
+        arrays = dict()
+        for attrName in _keyframeArrays:
+            values = np.empty((bounds[-1], 2), dtype=np.float32)
+            for fcurveInd, fcurve in enumerate(fcurves):
+                fcurve.keyframe_points.foreach_get(attrName, values[bounds[fcurveInd] : bounds[fcurveInd + 1]].ravel())
+            arrays[attrName] = values.astype(np.float64)
+        return cls(None, **arrays), bounds
+
+    def get_slice(self, start, end, fcurve=None):
+        """Return the keys in the range [start, end[ as KeyframeArrays sharing the arrays of these keys"""
+        return KeyframeArrays(fcurve, self.co[start:end], self.handle_left[start:end], self.handle_right[start:end])
+
+    def read(self):
+        keyframes = self.fcurve.keyframe_points
+        numKeys = len(keyframes)
+        for attrName in _keyframeArrays:
+            values = np.empty(numKeys * 2, dtype=np.float32)
+            keyframes.foreach_get(attrName, values)
+            setattr(self, attrName, values.reshape(numKeys, 2).astype(np.float64))
+
+    def write(self):
+        keyframes = self.fcurve.keyframe_points
+        for attrName in _keyframeArrays:
+            keyframes.foreach_set(attrName, getattr(self, attrName).astype(np.float32).ravel())
+
+    def __len__(self):
+        return len(self.co)
+
+
+def _offset_keys(keys: KeyframeArrays, start_incl, offset):
+    """Offset the keys at or after start_incl. Return True if keys have been modified"""
+    moved = start_incl <= keys.co[:, 0]
+    if not moved.any():
+        return False
+    keys.co[moved, 0] += offset
+    keys.handle_left[moved, 0] += offset
+    keys.handle_right[moved, 0] += offset
+    return True
+
+
+def _rescale_times(times, pivot, factor):
+    """Vectorized pivot + retimer.compute_offset(): Python round() and numpy rint() both round half to even"""
+    return pivot + np.rint((times - pivot) * factor)
+
+
+def _stretch_keys(keys: KeyframeArrays, start_incl, end_incl, factor, pivot):
+    outOfRangeOffset = retimer.compute_offset(end_incl + 1, pivot, factor) - (end_incl - start_incl + 1)
+
+    if factor > 1:
+        _offset_keys(keys, end_incl + 1, outOfRangeOffset)
+
+    inRange = (start_incl <= keys.co[:, 0]) & (keys.co[:, 0] <= end_incl)
+    keys.co[inRange, 0] = _rescale_times(keys.co[inRange, 0], pivot, factor)
+    keys.handle_left[inRange, 0] = _rescale_times(keys.handle_left[inRange, 0], pivot, factor)
+    keys.handle_right[inRange, 0] = _rescale_times(keys.handle_right[inRange, 0], pivot, factor)
+
+    if factor < 1.0:
+        _offset_keys(keys, end_incl + 1, outOfRangeOffset)
+
+
+def remove_keys(fcurve, start_incl, end_incl, gap_offset=0):
+    """Remove the keys of the F-curve in the range [start_incl, end_incl] and offset the keys after the range by
+    gap_offset, in one pass: the remaining keys are compacted at the start of the keyframe array, the last keys
+    are removed, then the handles are computed once
+    """
+    keyframes = fcurve.keyframe_points
+    numKeys = len(keyframes)
+    if not numKeys:
+        return
+
+    rawValues = dict()
+    for attrName, numValues, valueType in _keyframeRawProperties:
+        values = np.empty(numKeys * numValues, dtype=valueType)
+        keyframes.foreach_get(attrName, values)
+        rawValues[attrName] = values.reshape(numKeys, numValues) if 1 < numValues else values
+
+    frames = rawValues["co"][:, 0].astype(np.float64)
+    removed = (start_incl <= frames) & (frames <= end_incl)
+    numRemoved = int(removed.sum())
+    if not numRemoved and 0 == gap_offset:
+        return
+
+    keptIndices = np.flatnonzero(~removed)
+    movedKeys = np.flatnonzero(keptIndices != np.arange(len(keptIndices)))
+    firstMovedKey = movedKeys[0] if len(movedKeys) else len(keptIndices)
+
+    if gap_offset:
+        offsetKeys = keptIndices[end_incl <= frames[keptIndices]]
+        for attrName in _keyframeArrays:
+            values = rawValues[attrName]
+            values[offsetKeys, 0] = (values[offsetKeys, 0].astype(np.float64) + gap_offset).astype(np.float32)
+
+    # the kept keys are written over the first keys, the values of the last keys are not used since they are removed
+    for attrName, values in rawValues.items():
+        compactedValues = values.copy()
+        compactedValues[: len(keptIndices)] = values[keptIndices]
+        keyframes.foreach_set(attrName, compactedValues.ravel())
+
+    for targetInd in range(firstMovedKey, len(keptIndices)):
+        sourceKey = keyframes[keptIndices[targetInd]]
+        targetKey = keyframes[targetInd]
+        for attrName in _keyframeEnumProperties:
+            setattr(targetKey, attrName, getattr(sourceKey, attrName))
+
+    # removing the last key doesn't move the other keys
+    for _ in range(numRemoved):
+        keyframes.remove(keyframes[len(keyframes) - 1], fast=True)
+
+    fcurve.update()
+
+
+def _retime_keys(keys: KeyframeArrays, mode, start_incl, end_incl, factor, pivot):
+    """Retime the keys in place, except for the removal of keys. Each key is retimed independently of the others"""
+    if mode == "INSERT":
+        _offset_keys(keys, start_incl, end_incl - start_incl + 1)
+    elif mode == "RESCALE":
+        _stretch_keys(keys, start_incl, end_incl, factor, pivot)
+    elif mode == "FREEZE":
+        _offset_keys(keys, start_incl, end_incl - start_incl)
+
+
+def _retime_keys_by_chunks(keys: KeyframeArrays, mode, start_incl, end_incl, factor, pivot):
+    """Same as _retime_keys, the keys being split in chunks retimed in parallel threads when there are enough of
+    them. numpy releases the GIL during the array operations
+    """
+    numThreads = min(os.cpu_count() or 1, len(keys) // _keysPerThread)
+    if numThreads < 2:
+        _retime_keys(keys, mode, start_incl, end_incl, factor, pivot)
+        return
+
+    bounds = np.linspace(0, len(keys), numThreads + 1).astype(int)
+    with ThreadPoolExecutor(max_workers=numThreads) as executor:
+        futures = [
+            executor.submit(
+                _retime_keys, keys.get_slice(bounds[i], bounds[i + 1]), mode, start_incl, end_incl, factor, pivot
+            )
+            for i in range(numThreads)
+        ]
+        for future in futures:
+            future.result()
+
+
+class FCurveRetimePlan:
+    """Keys of an F-curve once retimed, computed without modifying the F-curve, and the number of keys moved,
+    deleted and created by the retime. apply() writes the computed keys to the F-curve
+    Plans are built by plan_fcurves
+    """
+
+    def __init__(self, fcurve, mode, start_incl=0, end_incl=0):
+        self.fcurve = fcurve
+        self.mode = mode
+        self.start_incl = start_incl
+        self.end_incl = end_incl
+        self.gap_offset = 0
+        self.keys = None
+        self.held_keys = []
+        self.moved = 0
+        self.deleted = 0
+        self.created = 0
+
+    def apply(self):
+        if self.mode == "DELETE" or self.mode == "CLEAR_ANIM":
+            if self.deleted or self.moved:
+                remove_keys(self.fcurve, self.start_incl, self.end_incl, gap_offset=self.gap_offset)
+            return
+
+        if self.keys is not None:
+            self.keys.write()
+        for key in self.held_keys:
+            self.fcurve.keyframe_points.insert(key[0], key[1])
+
+
+def plan_fcurves(fcurves, mode, start_incl=0, end_incl=0, remove_gap=True, factor=1.0, pivot=0):
+    """Return the list of the FCurveRetimePlan of the F-curves, computed without modifying them
+    The keys of all the F-curves are read into one set of arrays and retimed together
+    """
+    fcurves = list(fcurves)
+    allKeys, bounds = KeyframeArrays.from_fcurves(fcurves)
+    frames = allKeys.co[:, 0].copy()
+    deleteMode = mode == "DELETE" or mode == "CLEAR_ANIM"
+
+    if deleteMode:
+        # the keys are removed and offset in one pass by remove_keys
+        removed = (start_incl <= frames) & (frames <= end_incl)
+        moved = ~removed & (end_incl <= frames) if remove_gap else np.zeros(len(frames), dtype=bool)
+    else:
+        if mode == "FREEZE":
+            # the key at start_incl is held until end_incl: the keys from start_incl are offset and a copy of
+            # the key is inserted at start_incl
+            held = frames == start_incl
+            heldKeys = allKeys.co[held].copy()
+            heldBounds = np.concatenate(([0], np.cumsum(held))).astype(int)
+        _retime_keys_by_chunks(allKeys, mode, start_incl, end_incl, factor, pivot)
+        moved = allKeys.co[:, 0] != frames
+
+    plans = []
+    for fcurveInd, fcurve in enumerate(fcurves):
+        start, end = bounds[fcurveInd], bounds[fcurveInd + 1]
+        plan = FCurveRetimePlan(fcurve, mode, start_incl, end_incl)
+        plan.moved = int(moved[start:end].sum())
+        if deleteMode:
+            plan.deleted = int(removed[start:end].sum())
+            if remove_gap:
+                plan.gap_offset = start_incl - end_incl - 1
+        elif start < end:
+            if mode == "FREEZE":
+                plan.held_keys = heldKeys[heldBounds[start] : heldBounds[end]]
+                plan.created = len(plan.held_keys)
+            # the handles of the rescaled keys can change even if the keys don't move
+            if plan.moved or mode == "RESCALE":
+                plan.keys = allKeys.get_slice(start, end, fcurve)
+        plans.append(plan)
+    return plans
+
+
+def retime_frames_batch(fcurve, mode, start_incl=0, end_incl=0, remove_gap=True, factor=1.0, pivot=0):
+    """Same as retimer.retime_frames, on a bpy F-curve"""
+    if not len(fcurve.keyframe_points):
+        return
+    plan_fcurves([fcurve], mode, start_incl, end_incl, remove_gap, factor, pivot)[0].apply()
+
+
+class GPLayerRetimePlan:
+    """Frame numbers of a grease pencil layer once retimed, computed as retimer.retime_GPframes does, and the number
+    of frames moved and deleted. apply() removes and shifts the frames of the layer in bulk
+    The frame numbers are read once. When they are sorted, which is the case unless a script changed them, the
+    range of the frames to delete or shift is found by binary search
+    """
+
+    def __init__(self, layer, mode, start_incl=0, end_incl=0, remove_gap=True, factor=1.0, pivot=0, name=""):
+        startTime = time.perf_counter()
+        self.layer = layer
+        self.name = name if name else layer.info
+        self.num_frames = len(layer.frames)
+        frameNumbers = np.empty(self.num_frames, dtype=np.int32)
+        layer.frames.foreach_get("frame_number", frameNumbers)
+        frameNumbers = frameNumbers.astype(np.int64)
+        isSorted = bool(np.all(frameNumbers[1:] >= frameNumbers[:-1]))
+        newFrameNumbers = frameNumbers.copy()
+        offset = end_incl - start_incl + 1
+
+        # range of the frames to remove when the frames are sorted, mask of these frames otherwise
+        self.removed_range = None
+        self.removed = np.zeros(self.num_frames, dtype=bool)
+
+        if mode == "INSERT":
+            if isSorted:
+                newFrameNumbers[np.searchsorted(frameNumbers, start_incl, side="left") :] += offset
+            else:
+                newFrameNumbers[start_incl <= frameNumbers] += offset
+
+        elif mode == "DELETE" or mode == "CLEAR_ANIM":
+            if isSorted:
+                firstRemoved = int(np.searchsorted(frameNumbers, start_incl, side="left"))
+                lastRemoved = int(np.searchsorted(frameNumbers, end_incl, side="right"))
+                self.removed_range = (firstRemoved, lastRemoved)
+                self.removed[firstRemoved:lastRemoved] = True
+                if mode == "DELETE":
+                    newFrameNumbers[lastRemoved:] -= offset
+            else:
+                self.removed = (start_incl <= frameNumbers) & (frameNumbers <= end_incl)
+                if mode == "DELETE":
+                    newFrameNumbers[~self.removed & (end_incl <= frameNumbers)] -= offset
+
+        elif mode == "RESCALE":
+            outOfRangeOffset = retimer.compute_offset(end_incl + 1, pivot, factor) - offset
+            if factor > 1.0:
+                newFrameNumbers[end_incl + 1 <= newFrameNumbers] += outOfRangeOffset
+            inRange = (start_incl <= newFrameNumbers) & (newFrameNumbers <= end_incl)
+            newFrameNumbers[inRange] = np.rint((newFrameNumbers[inRange] - pivot) * factor).astype(np.int64) + pivot
+            if factor < 1.0:
+                newFrameNumbers[end_incl + 1 <= newFrameNumbers] += outOfRangeOffset
+
+        self.frame_numbers = newFrameNumbers[~self.removed]
+        self.deleted = int(self.removed.sum())
+        self.moved = int((self.frame_numbers != frameNumbers[~self.removed]).sum())
+        self.created = 0
+        self.plan_time = time.perf_counter() - startTime
+        self.apply_time = None
+
+    def apply(self):
+        startTime = time.perf_counter()
+        frames = self.layer.frames
+        if self.deleted:
+            # the frames are fetched in one walk of the list of frames of the layer, then removed
+            if self.removed_range is not None:
+                removedFrames = list(islice(frames, *self.removed_range))
+            else:
+                removedFrames = [frame for frame, removed in zip(frames, self.removed) if removed]
+            for frame in removedFrames:
+                frames.remove(frame)
+        if self.moved:
+            frames.foreach_set("frame_number", self.frame_numbers.astype(np.int32))
+        self.apply_time = time.perf_counter() - startTime
+
+    def get_cost_str(self):
+        costStr = (
+            f"{self.name}: {self.num_frames} frames, {self.deleted} deleted, {self.moved} moved, "
+            f"computed in {self.plan_time * 1000:0.2f} ms"
+        )
+        if self.apply_time is not None:
+            costStr += f", applied in {self.apply_time * 1000:0.2f} ms"
+        return costStr
+
+
+def retime_GPframes_batch(layer, mode, start_incl=0, end_incl=0, remove_gap=True, factor=1.0, pivot=0):
+    """Same as retimer.retime_GPframes, the frames being removed and shifted in bulk. Return the plan of the retime,
+    that gives its cost
+    """
+    plan = GPLayerRetimePlan(layer, mode, start_incl, end_incl, remove_gap, factor, pivot)
+    plan.apply()
+    return plan
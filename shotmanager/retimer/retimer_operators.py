@@ -76,6 +76,159 @@ class UAS_ShotManager_GetCurrentFrameFor(Operator):
         return {"FINISHED"}
 
 
+def _getRetimedObjects(context):
+    retimerProps = context.scene.UAS_shot_manager_props.retimer
+    if retimerProps.onlyOnSelection:
+        return context.selected_objects
+    return context.scene.objects
+
+
+def _getRetimeSceneArgs(retimerProps):
+    """Return the tupple (mode, start_incl, duration_incl, join_gap, factor, pivot) of the arguments of
+    retimer.retimeScene for the current retimer settings, None if there is nothing to retime
+    """
+    # startFrame = retimerProps.start_frame
+    # endFrame = retimerProps.end_frame
+
+    ################################
+    # For the following lines keep in mind that:
+    #    - retimerProps.insert_duration is inclusive
+    #    - retimerProps.start_frame is EXCLUSIVE   (in other words it is NOT modified)
+    #    - retimerProps.end_frame is EXCLUSIVE     (in other words is the first frame to be offset)
+    #
+    # But retimeScene() requires INCLUSIVE range of time for the modifications (= all the frames
+    # created or deleted, not the moved ones).
+    # We then have to adapt the start and end values we get from retimerProps for the function.
+    ################################
+    if "GLOBAL_OFFSET" == retimerProps.mode:
+        if 0 == retimerProps.offset_duration:
+            return None
+
+        # if offset_duration > 0 we insert time from a point far in negative time
+        # if offset_duration < 0 we delete time from a point very far in negative time
+        farRefPoint = -10000
+
+        if 0 < retimerProps.offset_duration:
+            offsetMode = "INSERT"
+        else:
+            offsetMode = "DELETE"
+
+        return (
+            offsetMode,
+            farRefPoint + 1,
+            abs(retimerProps.offset_duration),
+            retimerProps.gap,
+            1.0,
+            retimerProps.pivot,
+        )
+
+    elif -1 < retimerProps.mode.find("INSERT"):
+        start_excl = retimerProps.start_frame if "INSERT_AFTER" == retimerProps.mode else retimerProps.end_frame - 1
+        end_excl = start_excl + retimerProps.insert_duration + 1
+        # start = startFrame + 1 if "INSERT_AFTER" == retimerProps.mode else endFrame
+        print(
+            # f"Retimer - Inserting time: new time range: [{start} .. {start + retimerProps.insert_duration - 1}], duration:{retimerProps.insert_duration}"
+            f"\nRetimer - Inserting time: new created frames: [{start_excl + 1} .. {end_excl - 1}], duration: {retimerProps.insert_duration}"
+        )
+        return (
+            # retimerProps.mode,
+            "INSERT",
+            start_excl + 1,
+            retimerProps.insert_duration,
+            retimerProps.gap,
+            1.0,
+            retimerProps.pivot,
+        )
+
+    elif -1 < retimerProps.mode.find("DELETE"):
+        start_excl = retimerProps.start_frame
+        end_excl = retimerProps.end_frame
+        duration_incl = end_excl - start_excl - 1
+        print(
+            f"\nRetimer - Deleting time: deleted frames: [{start_excl + 1} .. {end_excl - 1}], duration: {duration_incl}"
+        )
+        return (
+            # retimerProps.mode,
+            "DELETE",
+            start_excl + 1,
+            duration_incl,
+            True,
+            1.0,
+            retimerProps.pivot,
+        )
+    elif "RESCALE" == retimerProps.mode:
+        # *** Warning: due to the nature of the time operation the duration is not computed as for Delete Time ***
+        start_excl = retimerProps.start_frame
+        end_excl = retimerProps.end_frame
+        duration_incl = end_excl - start_excl
+        print(
+            f"\nRetimer - Rescaling time: modified frames: [{start_excl} .. {end_excl - 1}], duration: {duration_incl}"
+        )
+        return (
+            retimerProps.mode,
+            start_excl,
+            duration_incl,
+            True,
+            retimerProps.factor,
+            start_excl,
+        )
+
+    elif "CLEAR_ANIM" == retimerProps.mode:
+        start_excl = retimerProps.start_frame
+        end_excl = retimerProps.end_frame
+        duration_incl = end_excl - start_excl - 1
+        print(
+            f"\nRetimer - Deleting animation: cleared frames: [{start_excl + 1} .. {end_excl - 1}], duration:{duration_incl}"
+        )
+        return (
+            retimerProps.mode,
+            start_excl + 1,
+            duration_incl,
+            False,
+            retimerProps.factor,
+            retimerProps.pivot,
+        )
+    else:
+        print(f"*** Retimer failed: No Retimer mode named {retimerProps.mode} ***")
+        return None
+
+
+class UAS_ShotManager_RetimerPreview(Operator):
+    bl_idname = "uas_shot_manager.retimerpreview"
+    bl_label = "Preview Retime"
+    bl_description = (
+        "Compute the changes of the retime without modifying the scene.\n"
+        "The number of keys, grease pencil frames, strips and shots moved, deleted or created\n"
+        "by the retime is printed in the console for each datablock"
+    )
+    bl_options = {"INTERNAL"}
+
+    def execute(self, context):
+        retimerProps = context.scene.UAS_shot_manager_props.retimer
+
+        retimeArgs = _getRetimeSceneArgs(retimerProps)
+        if retimeArgs is None:
+            return {"FINISHED"}
+
+        mode, start_incl, duration_incl, join_gap, factor, pivot = retimeArgs
+        report = retimer.retimeScene(
+            context,
+            retimerProps,
+            mode,
+            _getRetimedObjects(context),
+            start_incl,
+            duration_incl,
+            join_gap,
+            factor,
+            pivot,
+            dry_run=True,
+        )
+        report.print_report()
+        self.report({"INFO"}, report.get_summary())
+
+        return {"FINISHED"}
+
+
 class UAS_ShotManager_RetimerApply(Operator):
     bl_idname = "uas_shot_manager.retimerapply"
     bl_label = "Apply Retime"
@@ -85,129 +238,14 @@ class UAS_ShotManager_RetimerApply(Operator):
     def execute(self, context):
         retimerProps = context.scene.UAS_shot_manager_props.retimer
 
-        if retimerProps.onlyOnSelection:
-            obj_list = context.selected_objects
-        else:
-            obj_list = context.scene.objects
-
-        # startFrame = retimerProps.start_frame
-        # endFrame = retimerProps.end_frame
-
-        ################################
-        # For the following lines keep in mind that:
-        #    - retimerProps.insert_duration is inclusive
-        #    - retimerProps.start_frame is EXCLUSIVE   (in other words it is NOT modified)
-        #    - retimerProps.end_frame is EXCLUSIVE     (in other words is the first frame to be offset)
-        #
-        # But retimeScene() requires INCLUSIVE range of time for the modifications (= all the frames
-        # created or deleted, not the moved ones).
-        # We then have to adapt the start and end values we get from retimerProps for the function.
-        ################################
-        if "GLOBAL_OFFSET" == retimerProps.mode:
-            if 0 == retimerProps.offset_duration:
-                return {"FINISHED"}
-
-            # if offset_duration > 0 we insert time from a point far in negative time
-            # if offset_duration < 0 we delete time from a point very far in negative time
-            farRefPoint = -10000
-
-            if 0 < retimerProps.offset_duration:
-                offsetMode = "INSERT"
-            else:
-                offsetMode = "DELETE"
-
-            retimer.retimeScene(
-                context,
-                retimerProps,
-                offsetMode,
-                obj_list,
-                farRefPoint + 1,
-                abs(retimerProps.offset_duration),
-                retimerProps.gap,
-                1.0,
-                retimerProps.pivot,
-            )
-
-        elif -1 < retimerProps.mode.find("INSERT"):
-            start_excl = retimerProps.start_frame if "INSERT_AFTER" == retimerProps.mode else retimerProps.end_frame - 1
-            end_excl = start_excl + retimerProps.insert_duration + 1
-            # start = startFrame + 1 if "INSERT_AFTER" == retimerProps.mode else endFrame
-            print(
-                # f"Retimer - Inserting time: new time range: [{start} .. {start + retimerProps.insert_duration - 1}], duration:{retimerProps.insert_duration}"
-                f"\nRetimer - Inserting time: new created frames: [{start_excl + 1} .. {end_excl - 1}], duration: {retimerProps.insert_duration}"
-            )
-            retimer.retimeScene(
-                context,
-                retimerProps,
-                # retimerProps.mode,
-                "INSERT",
-                obj_list,
-                start_excl + 1,
-                retimerProps.insert_duration,
-                retimerProps.gap,
-                1.0,
-                retimerProps.pivot,
-            )
-
-        elif -1 < retimerProps.mode.find("DELETE"):
-            start_excl = retimerProps.start_frame
-            end_excl = retimerProps.end_frame
-            duration_incl = end_excl - start_excl - 1
-            print(
-                f"\nRetimer - Deleting time: deleted frames: [{start_excl + 1} .. {end_excl - 1}], duration: {duration_incl}"
-            )
-            retimer.retimeScene(
-                context,
-                retimerProps,
-                # retimerProps.mode,
-                "DELETE",
-                obj_list,
-                start_excl + 1,
-                duration_incl,
-                True,
-                1.0,
-                retimerProps.pivot,
-            )
-        elif "RESCALE" == retimerProps.mode:
-            # *** Warning: due to the nature of the time operation the duration is not computed as for Delete Time ***
-            start_excl = retimerProps.start_frame
-            end_excl = retimerProps.end_frame
-            duration_incl = end_excl - start_excl
-            print(
-                f"\nRetimer - Rescaling time: modified frames: [{start_excl} .. {end_excl - 1}], duration: {duration_incl}"
-            )
-            retimer.retimeScene(
-                context,
-                retimerProps,
-                retimerProps.mode,
-                obj_list,
-                start_excl,
-                duration_incl,
-                True,
-                retimerProps.factor,
-                start_excl,
-            )
-
-        elif "CLEAR_ANIM" == retimerProps.mode:
-            start_excl = retimerProps.start_frame
-            end_excl = retimerProps.end_frame
-            duration_incl = end_excl - start_excl - 1
-            print(
-                f"\nRetimer - Deleting animation: cleared frames: [{start_excl + 1} .. {end_excl - 1}], duration:{duration_incl}"
-            )
-            retimer.retimeScene(
-                context,
-                retimerProps,
-                retimerProps.mode,
-                obj_list,
-                start_excl + 1,
-                duration_incl,
-                False,
-                retimerProps.factor,
-                retimerProps.pivot,
-            )
-        else:
-            print(f"*** Retimer failed: No Retimer mode named {retimerProps.mode} ***")
+        retimeArgs = _getRetimeSceneArgs(retimerProps)
+        if retimeArgs is None:
+            return {"FINISHED"}
+
+        mode, start_incl, duration_incl, join_gap, factor, pivot = retimeArgs
+        retimer.retimeScene(
+            context, retimerProps, mode, _getRetimedObjects(context), start_incl, duration_incl, join_gap, factor, pivot
+        )
 
         context.area.tag_redraw()
         # context.region.tag_redraw()
@@ -226,6 +264,7 @@ class UAS_ShotManager_RetimerApply(Operator):
 _classes = (
     UAS_ShotManager_GetTimeRange,
     UAS_ShotManager_GetCurrentFrameFor,
+    UAS_ShotManager_RetimerPreview,
     UAS_ShotManager_RetimerApply,
 )
 
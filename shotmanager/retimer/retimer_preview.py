@@ -0,0 +1,342 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Dry run of the retimer
+
+The changes that retimer.retimeScene would make are computed without modifying the scene: for each datablock the
+report gives the number of keys, grease pencil frames, strips and shots that would be moved, deleted or created.
+On request the computed changes are kept in a diff that the real run can apply in bulk, without computing them again.
+"""
+
+import bpy
+
+from shotmanager.utils.utils_timeline import TimelineModel, getShotRangeWithStart, getShotRangeWithEnd
+
+from . import retimer
+from . import retimer_batch
+
+
+class RetimeReport:
+    """Number of elements moved, deleted and created by a retime, per datablock"""
+
+    def __init__(self, mode, start_incl, end_incl):
+        self.mode = mode
+        self.start_incl = start_incl
+        self.end_incl = end_incl
+        self.entries = []
+        self.diff = None
+
+    def add_entry(self, data_type, name, moved=0, deleted=0, created=0, time=None):
+        """data_type: "ACTION", "SHAPE_KEYS", "GPENCIL_LAYER", "VSE", "SHOTS" or "SCENE"
+        time: duration in seconds of the computation of the changes of the datablock, if measured
+        Only the datablocks impacted by the retime are added
+        """
+        if moved or deleted or created:
+            self.entries.append(
+                {"type": data_type, "name": name, "moved": moved, "deleted": deleted, "created": created, "time": time}
+            )
+
+    def get_totals(self):
+        """Return, for each data type, the total numbers of moved, deleted and created elements"""
+        totals = dict()
+        for entry in self.entries:
+            total = totals.setdefault(entry["type"], {"moved": 0, "deleted": 0, "created": 0})
+            for key in total:
+                total[key] += entry[key]
+        return totals
+
+    def get_summary(self):
+        if not len(self.entries):
+            return f"Retimer {self.mode}: no change"
+        totalsStr = ", ".join(
+            f"{dataType}: {t['moved']} moved, {t['deleted']} deleted, {t['created']} created"
+            for dataType, t in self.get_totals().items()
+        )
+        return f"Retimer {self.mode}: {totalsStr}"
+
+    def print_report(self):
+        print(f"\nRetimer dry run - {self.mode} [{self.start_incl} .. {self.end_incl}]:")
+        for entry in self.entries:
+            timeStr = "" if entry["time"] is None else f", computed in {entry['time'] * 1000:0.2f} ms"
+            print(
+                f"   {entry['type']:>14}  {entry['name']}: moved: {entry['moved']}, deleted: {entry['deleted']}, "
+                f"created: {entry['created']}{timeStr}"
+            )
+        print(f"  {self.get_summary()}\n")
+
+
+class _ShotPreview:
+    """Timing of a shot, modified as the start and end properties of the shot are when they are set"""
+
+    def __init__(self, shot):
+        self.name = shot.name
+        self.durationLocked = shot.durationLocked
+        self.enabled = shot.enabled
+        self._start = shot.start
+        self._end = shot.end
+
+    def getDuration(self):
+        return self._end - self._start + 1
+
+    @property
+    def start(self):
+        return self._start
+
+    @start.setter
+    def start(self, value):
+        self._start, self._end = getShotRangeWithStart(self._start, self._end, value, self.durationLocked)
+
+    @property
+    def end(self):
+        return self._end
+
+    @end.setter
+    def end(self, value):
+        self._start, self._end = getShotRangeWithEnd(self._start, self._end, value, self.durationLocked)
+
+
+def preview_vse(scene, mode, start_frame, end_frame, remove_gap=True):
+    """Return the tupple (moved, deleted, created) of the numbers of strips changed by retimer.retime_vse
+    The strips cut by the retime count as created
+    """
+    moved = deleted = created = 0
+    sed = scene.sequence_editor
+    if sed is None:
+        return (moved, deleted, created)
+
+    for seq in sed.sequences:
+        seqStart = seq.frame_final_start
+        seqEnd = seq.frame_final_end
+        if mode == "INSERT":
+            if seqStart < start_frame < seqEnd:
+                created += 1
+                moved += 1
+            elif start_frame <= seqStart:
+                moved += 1
+
+        elif mode == "DELETE":
+            cuts = int(seqStart < start_frame < seqEnd) + int(seqStart < end_frame < seqEnd)
+            created += cuts
+            if seqStart < end_frame and start_frame < seqEnd:
+                deleted += 1
+            if remove_gap and end_frame < seqEnd:
+                moved += 1
+
+    return (moved, deleted, created)
+
+
+class RetimeDiff:
+    """Changes computed by a dry run of retimer.retimeScene. apply() makes the same changes as the real run, the
+    keys and frames being written from the computed values
+    The diff refers to the datablocks of the scene: it has to be applied before any other modification of the scene
+    """
+
+    def __init__(self, mode, start_incl, end_incl):
+        self.mode = mode
+        self.start_incl = start_incl
+        self.end_incl = end_incl
+        # list of tupples (object, F-curve plans, grease pencil layer plans, is retimed as grease pencil),
+        # in the order of the retime
+        self.object_plans = []
+        self.apply_to_vse = False
+        self.timeline = None
+        self.scene_range = None
+        self.current_frame = None
+
+    def apply(self, context):
+        scene = context.scene
+        action_tmp = bpy.data.actions.new("Retimer_TmpAction")
+
+        for obj, fcurvePlans, layerPlans, isGreasePencil in self.object_plans:
+            for plan in fcurvePlans:
+                plan.apply()
+
+            if isGreasePencil:
+                # same turnaround as in retimeScene: the grease pencil frames are not updated if the object
+                # has no action
+                action_tmp_added = False
+                if obj.animation_data is None:
+                    obj.animation_data_create()
+                if obj.animation_data.action is None:
+                    obj.animation_data.action = action_tmp
+                    action_tmp_added = True
+                for plan in layerPlans:
+                    plan.apply()
+                    print(f"   Retimer - grease pencil layer {plan.get_cost_str()}")
+                if action_tmp_added:
+                    obj.animation_data.action = None
+
+            # force an update on the actions
+            if obj.animation_data is not None and obj.animation_data.action is not None:
+                action_backup = obj.animation_data.action
+                obj.animation_data.action = None
+                obj.animation_data.action = action_backup
+
+        if self.apply_to_vse:
+            retimer.retime_vse(scene, self.mode, self.start_incl, self.end_incl)
+
+        if self.timeline is not None:
+            scene.UAS_shot_manager_props.applyTimelineModel(self.timeline)
+
+        if self.scene_range is not None:
+            scene.frame_start, scene.frame_end, scene.frame_preview_start, scene.frame_preview_end = self.scene_range
+
+        if self.current_frame is not None:
+            scene.frame_set(self.current_frame)
+
+        bpy.data.actions.remove(action_tmp)
+
+
+def _get_retimed_fcurves(action, retimerProps):
+    return [fcurve for fcurve in action.fcurves if not fcurve.lock or retimerProps.includeLockAnim]
+
+
+def preview_retime_scene(
+    context,
+    retimerProps,
+    mode: str,
+    objects,
+    start_incl: int,
+    duration_incl: float,
+    join_gap=True,
+    factor=1.0,
+    pivot=0,
+    build_diff=False,
+):
+    """Dry run of retimer.retimeScene, that takes the same arguments. Nothing is modified in the scene
+    Return a RetimeReport, with its diff attribute set to the RetimeDiff of the changes if build_diff is True
+    """
+    prefs = context.preferences.addons["shotmanager"].preferences
+    scene = context.scene
+    end_incl = start_incl + duration_incl - 1
+    retime_args = (mode, start_incl, end_incl, join_gap, factor, pivot)
+
+    report = RetimeReport(mode, start_incl, end_incl)
+    diff = RetimeDiff(mode, start_incl, end_incl)
+    actions_done = set()
+
+    # list of tupples (object index, data type, action, retimed F-curves)
+    retimedActions = []
+
+    for obj in objects:
+        objInd = len(diff.object_plans)
+        layerPlans = []
+        isGreasePencil = retimerProps.applytToGreasePencil and obj.type == "GPENCIL"
+
+        if retimerProps.applyToObjects and obj.type != "GPENCIL":
+            if obj.animation_data is not None:
+                action = obj.animation_data.action
+                if action is not None and action not in actions_done:
+                    retimedActions.append((objInd, "ACTION", action, _get_retimed_fcurves(action, retimerProps)))
+                    actions_done.add(action)
+
+        if retimerProps.applyToShapeKeys:
+            if (
+                obj.type == "MESH"
+                and obj.data.shape_keys is not None
+                and obj.data.shape_keys.animation_data is not None
+            ):
+                action = obj.data.shape_keys.animation_data.action
+                if action is not None and action not in actions_done:
+                    retimedActions.append((objInd, "SHAPE_KEYS", action, _get_retimed_fcurves(action, retimerProps)))
+                    actions_done.add(action)
+
+        if isGreasePencil:
+            if obj.animation_data is not None:
+                action = obj.animation_data.action
+                if action is not None and action not in actions_done:
+                    retimedActions.append((objInd, "ACTION", action, _get_retimed_fcurves(action, retimerProps)))
+                    actions_done.add(action)
+
+            for layer in obj.data.layers:
+                if not layer.lock or retimerProps.includeLockAnim:
+                    plan = retimer_batch.GPLayerRetimePlan(layer, *retime_args, name=f"{obj.name}: {layer.info}")
+                    report.add_entry(
+                        "GPENCIL_LAYER", plan.name, plan.moved, plan.deleted, plan.created, time=plan.plan_time
+                    )
+                    layerPlans.append(plan)
+
+        diff.object_plans.append((obj, [], layerPlans, isGreasePencil))
+
+    # the keys of all the actions are retimed together
+    fcurvePlans = iter(
+        retimer_batch.plan_fcurves(
+            [fcurve for _objInd, _dataType, _action, fcurves in retimedActions for fcurve in fcurves], *retime_args
+        )
+    )
+    for objInd, dataType, action, fcurves in retimedActions:
+        actionPlans = [next(fcurvePlans) for _fcurve in fcurves]
+        obj = diff.object_plans[objInd][0]
+        diff.object_plans[objInd][1].extend(actionPlans)
+        report.add_entry(
+            dataType,
+            f"{obj.name}: {action.name}",
+            moved=sum(plan.moved for plan in actionPlans),
+            deleted=sum(plan.deleted for plan in actionPlans),
+            created=sum(plan.created for plan in actionPlans),
+        )
+
+    # VSE
+    if "CLEAR_ANIM" != mode and retimerProps.applyToVSE:
+        report.add_entry("VSE", scene.name, *preview_vse(scene, mode, start_incl, end_incl))
+        diff.apply_to_vse = True
+
+    # Shots
+    if retimerProps.applyToShots and "CLEAR_ANIM" != mode:
+        props = scene.UAS_shot_manager_props
+        shotList = props.getShotsList(ignoreDisabled=False)
+        timeline = TimelineModel.fromShots(shotList)
+        numMoved = numDisabled = 0
+        for shotInd, shot in enumerate(shotList):
+            shotPreview = _ShotPreview(shot)
+            retimer.retime_shot(shotPreview, *retime_args)
+            if shotPreview.start != shot.start or shotPreview.end != shot.end:
+                timeline.setShotRange(shotInd, shotPreview.start, shotPreview.end)
+                numMoved += 1
+            if shotPreview.enabled != shot.enabled:
+                timeline.setShotEnabled(shotInd, shotPreview.enabled)
+                numDisabled += 1
+        report.add_entry("SHOTS", props.getCurrentTakeName(), moved=numMoved, deleted=numDisabled)
+        diff.timeline = timeline
+
+    # anim range and time cursor
+    if "CLEAR_ANIM" != mode:
+        if prefs.applyToSceneRange:
+            diff.scene_range = retimer.compute_retimed_scene_range(
+                scene, mode, start_incl, end_incl, duration_incl, pivot, factor
+            )
+            currentRange = (scene.frame_start, scene.frame_end, scene.frame_preview_start, scene.frame_preview_end)
+            report.add_entry(
+                "SCENE",
+                f"{scene.name}: range",
+                moved=sum(1 for new, current in zip(diff.scene_range, currentRange) if new != current),
+            )
+        if prefs.applyToTimeCursor:
+            diff.current_frame = max(
+                retimer.compute_retimed_frame(
+                    scene.frame_current, mode, start_incl, end_incl, duration_incl, pivot, factor
+                ),
+                0,
+            )
+            report.add_entry(
+                "SCENE", f"{scene.name}: time cursor", moved=int(diff.current_frame != scene.frame_current)
+            )
+
+    if build_diff:
+        report.diff = diff
+    return report
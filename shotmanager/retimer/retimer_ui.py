@@ -280,6 +280,7 @@ class UAS_PT_ShotManagerRetimer(Panel):
         compo.separator(factor=2)
         compo.scale_y = 1.2
         compo.operator("uas_shot_manager.retimerapply", text=applyText)
+        compo.operator("uas_shot_manager.retimerpreview", text="", icon="VIEWZOOM")
         compo.separator(factor=2)
 
 
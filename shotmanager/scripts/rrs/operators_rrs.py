@@ -80,6 +80,8 @@ class UAS_LaunchRRSRender(Operator):
                 fileListOnly=props.rrs_fileListOnly,
                 rerenderExistingShotVideos=props.rrs_rerenderExistingShotVideos,
                 renderAlsoDisabled=props.rrs_renderAlsoDisabled,
+                useRenderCache=props.rrs_useRenderCache,
+                resume=props.rrs_resumeRender,
                 settingsDict=settingsDict,
             )
         else:
@@ -91,6 +93,8 @@ class UAS_LaunchRRSRender(Operator):
                 fileListOnly=props.rrs_fileListOnly,
                 rerenderExistingShotVideos=props.rrs_rerenderExistingShotVideos,
                 renderAlsoDisabled=props.rrs_renderAlsoDisabled,
+                useRenderCache=props.rrs_useRenderCache,
+                resume=props.rrs_resumeRender,
                 settingsDict=settingsDict,
             )
 
@@ -108,6 +108,8 @@ def publishRRS(
     fileListOnly=False,
     rerenderExistingShotVideos=True,
     renderAlsoDisabled=True,
+    useRenderCache=False,
+    resume=False,
     settingsDict=None,
 ):
     """ Return a dictionary with the rendered and the failed file paths
@@ -119,6 +121,8 @@ def publishRRS(
             - failed_files: failed files (either from direct rendering or from copy from cache)
             - edl_files: edl files
             - other_files: json dumped file list
+        useRenderCache: if True, only the shots that changed since their last publish are rendered again
+        resume: if True, an interrupted publish is resumed from the job manifest of its render
     """
     import os
     import errno
@@ -216,6 +220,9 @@ def publishRRS(
         area=bpy.context.area,
         stampInfoCustomSettingsDict=stampInfoCustomSettingsDict,
         override_all_viewports=True,
+        parallelRenderWorkers=props.renderContext.renderParallelWorkers,
+        useRenderCache=useRenderCache,
+        resume=resume,
     )
 
     ################
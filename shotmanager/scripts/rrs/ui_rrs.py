@@ -50,6 +50,8 @@ class UAS_PT_ShotManager_RRS_Debug(Panel):
         row = layout.row(align=False)
         row.prop(props, "rrs_rerenderExistingShotVideos")
         row.prop(props, "rrs_renderAlsoDisabled")
+        row.prop(props, "rrs_useRenderCache")
+        row.prop(props, "rrs_resumeRender")
         row = layout.row(align=False)
         row.alert = True
         row.operator("uas_shot_manager.initialize_rrs_project", text="Debug - RRS Initialyze")
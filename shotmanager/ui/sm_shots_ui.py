@@ -142,7 +142,7 @@ class UAS_UL_ShotManager_Items(bpy.types.UIList):
             #     ).shotSource = f"[{index},0]"
 
             grid_flow.scale_x = 0.4
-            shotEditStart = item.getEditStart()
+            shotEditStart = props.getEditTimeByShotIndex(index, item.start)
             if currentFrame == item.start:
                 if props.highlight_all_shot_frames or current_shot_index == index:
                     grid_flow.alert = True
@@ -196,7 +196,7 @@ class UAS_UL_ShotManager_Items(bpy.types.UIList):
         ###########
         if props.display_edit_times_in_shotlist:
             grid_flow.scale_x = 0.4
-            shotEditEnd = item.getEditEnd()
+            shotEditEnd = props.getEditTimeByShotIndex(index, item.end)
             if currentFrame == item.end:
                 if props.highlight_all_shot_frames or current_shot_index == index:
                     grid_flow.alert = True
@@ -26,6 +26,7 @@ from shotmanager.config import config
 from shotmanager.viewport_3d.ogl_ui import UAS_ShotManager_DrawTimeline
 
 from shotmanager.utils import utils
+from shotmanager.utils import utils_warnings
 
 from . import sm_shots_ui
 from . import sm_takes_ui
@@ -168,7 +169,7 @@ class UAS_PT_ShotManager(Panel):
 
         # play and timeline
         ################
-        playEnabled = not utils.sceneContainsCameraBinding(scene)
+        playEnabled = not utils_warnings.sceneContainsCameraBinding(scene)
         row = layout.row()
         row.scale_y = 1.2
         rowPlayButton = row.row()
@@ -0,0 +1,554 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Caches of the shots data of the takes, used to avoid scanning all the shots of a take at each query
+
+The caches are rebuilt lazily: the shot and take properties affecting the timings, the order or the
+enabled state of the shots only increment a data version with shotsDataChanged(). The next query
+made on a take with an outdated version then rebuilds the data of this take once.
+
+The module also notifies the overlays drawn by the add-on (viewport HUD, timelines) that what they display
+may have changed, so that they are redrawn on changes instead of at a fixed rate.
+"""
+
+from bisect import bisect_left, bisect_right
+
+import bpy
+from bpy.app.handlers import persistent
+
+from shotmanager.utils import utils_handlers
+from shotmanager.utils.utils_timeline import TimelineModel
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+_shotsDataVersion = 0
+_shotsDisplayVersion = 0
+
+# key: type of the areas in which overlays are drawn, value: number of overlays currently drawn in them
+_activeOverlays = dict()
+
+# owner of the message bus subscriptions
+_msgbusOwner = object()
+
+# key: (props pointer, take index, cache name), value: (data version, number of shots, cached data)
+_takeCaches = dict()
+
+# version incremented only when shots or takes are added, removed or moved, see shotsDataChanged()
+_shotsStructureVersion = 0
+
+# key: props pointer, value: (structure version, numbers of shots of the takes,
+# dictionary shot pointer: (take index, shot index), set of the pointers of the shots not found)
+_shotsLocations = dict()
+
+# (props pointer, take index, current shot index) at the last frame change
+_frameChangedCurrentShot = None
+
+
+def shotsDataChanged(structureChanged=True):
+    """To call whenever a shot or a take is added, removed or moved, or when a shot start, end
+    or enabled state is modified
+    structureChanged: False if no shot or take has been added, removed or moved, the locations of the shots are
+        then kept
+    """
+    global _shotsDataVersion, _shotsStructureVersion
+    _shotsDataVersion += 1
+    if structureChanged:
+        _shotsStructureVersion += 1
+    shotsDisplayChanged()
+
+
+def getShotsDataVersion():
+    return _shotsDataVersion
+
+
+def clearCaches():
+    """Remove all the cached data. Called when the Blender data is reloaded (file load, undo, redo),
+    since the shots are then not the same instances anymore
+    """
+    shotsDataChanged()
+    _takeCaches.clear()
+    _shotsLocations.clear()
+
+
+def getTakeCache(props, takeIndex, cacheName, buildFunction):
+    """Return the data cached for the specified take under the name cacheName
+    If the cached data is not valid anymore it is rebuilt by calling buildFunction(shots)
+    """
+    shots = props.takes[takeIndex].shots
+    key = (props.as_pointer(), takeIndex, cacheName)
+    cached = _takeCaches.get(key, None)
+
+    # the number of shots is also checked in case the shots collection has been modified
+    # directly, without using the functions of the props
+    if cached is None or cached[0] != _shotsDataVersion or cached[1] != len(shots):
+        cached = (_shotsDataVersion, len(shots), buildFunction(shots))
+        _takeCaches[key] = cached
+
+    return cached[2]
+
+
+def invalidateTakeCache(props, takeIndex, cacheName):
+    """Remove the data cached for the specified take under the name cacheName so that it is rebuilt at the next query"""
+    _takeCaches.pop((props.as_pointer(), takeIndex, cacheName), None)
+
+
+###################
+# display notifications
+###################
+
+
+def shotsDisplayChanged(tagRedraw=True):
+    """To call whenever something displayed by the overlays may have changed: shot data, name, color or
+    camera, current shot...
+    tagRedraw: if True the areas in which overlays are drawn are tagged for redraw
+    """
+    global _shotsDisplayVersion
+    _shotsDisplayVersion += 1
+    if tagRedraw:
+        tagOverlaysRedraw()
+
+
+def getShotsDisplayVersion():
+    return _shotsDisplayVersion
+
+
+def registerOverlay(areaType):
+    """To call by an overlay when it starts drawing in the areas of the specified type"""
+    _activeOverlays[areaType] = _activeOverlays.get(areaType, 0) + 1
+
+
+def unregisterOverlay(areaType):
+    """To call by an overlay when it stops drawing in the areas of the specified type"""
+    count = _activeOverlays.get(areaType, 0) - 1
+    if 0 < count:
+        _activeOverlays[areaType] = count
+    else:
+        _activeOverlays.pop(areaType, None)
+
+
+def tagOverlaysRedraw():
+    """Tag for redraw the areas in which overlays are drawn, and only them"""
+    if not len(_activeOverlays):
+        return
+
+    windowManager = bpy.context.window_manager
+    # no window manager in background mode or during the file loading
+    if windowManager is None:
+        return
+
+    for window in windowManager.windows:
+        for area in window.screen.areas:
+            if area.type in _activeOverlays:
+                area.tag_redraw()
+
+
+def _onShotsDisplayChanged():
+    shotsDisplayChanged()
+
+
+def subscribeToDisplayChanges():
+    """Subscribe to the message bus so that the modifications made in the UI on the properties displayed by
+    the overlays are notified. The subscriptions are lost when a file is loaded and have to be made again.
+    """
+    bpy.msgbus.clear_by_owner(_msgbusOwner)
+
+    watchedProperties = {
+        "UAS_ShotManager_Shot": ("name", "color", "camera", "enabled", "start", "end"),
+        "UAS_ShotManager_Props": ("current_shot_index", "selected_shot_index", "current_take_name"),
+    }
+    for typeName, propertyNames in watchedProperties.items():
+        rnaType = getattr(bpy.types, typeName, None)
+        if rnaType is None:
+            _logger.debug(f"subscribeToDisplayChanges: type {typeName} not registered")
+            continue
+        for propertyName in propertyNames:
+            bpy.msgbus.subscribe_rna(
+                key=(rnaType, propertyName), owner=_msgbusOwner, args=(), notify=_onShotsDisplayChanged
+            )
+
+
+###################
+# shots locations
+###################
+
+
+def _buildShotsLocations(props):
+    locations = dict()
+    for takeInd, take in enumerate(props.takes):
+        for shotInd, shot in enumerate(take.shots):
+            locations[shot.as_pointer()] = (takeInd, shotInd)
+    return locations
+
+
+def getShotLocation(props, shot):
+    """Return the tupple (take index, shot index) locating the specified shot in the takes of props,
+    (-1, -1) if the shot is not found.
+    The shots are identified by the address of their data, which stays the same as long as no shot or take
+    is added, removed or moved. Each location found is checked against the takes before being returned so
+    that an outdated map is rebuilt instead of returning a wrong shot. The shots not found are also cached,
+    until the structure version or the number of shots of a take changes.
+    """
+    key = props.as_pointer()
+    takes = props.takes
+    shotCounts = tuple(len(take.shots) for take in takes)
+    shotPointer = shot.as_pointer()
+    cached = _shotsLocations.get(key, None)
+    isNewMap = False
+
+    if cached is None or cached[0] != _shotsStructureVersion or cached[1] != shotCounts:
+        cached = (_shotsStructureVersion, shotCounts, _buildShotsLocations(props), set())
+        _shotsLocations[key] = cached
+        isNewMap = True
+    elif shotPointer in cached[3]:
+        return (-1, -1)
+
+    location = cached[2].get(shotPointer, None)
+    if location is not None:
+        takeInd, shotInd = location
+        if takes[takeInd].shots[shotInd] == shot:
+            return location
+
+    if not isNewMap:
+        # the map is outdated, probably because the shots collections have been modified directly
+        cached = (_shotsStructureVersion, shotCounts, _buildShotsLocations(props), set())
+        _shotsLocations[key] = cached
+        location = cached[2].get(shotPointer, None)
+        if location is not None:
+            return location
+
+    cached[3].add(shotPointer)
+    return (-1, -1)
+
+
+###################
+# interval index
+###################
+
+
+class FrameIntervalsIndex:
+    """Index of a set of frame intervals [start, end] (end included), each of them identified by its index
+    in the shot list.
+    Answers in O(log n) which intervals contain a frame and which one is the first, in the list order, to start
+    after a frame. Intervals can overlap.
+    """
+
+    def __init__(self, intervals):
+        """intervals: list of tupples (shot index, start, end), in the order of the shots list"""
+
+        # boundaries of the elementary segments: on each segment [boundaries[i], boundaries[i + 1][
+        # the set of the intervals containing the frames is constant
+        boundaries = set()
+        startingAt = dict()
+        endingAt = dict()
+        for ind, start, end in intervals:
+            boundaries.add(start)
+            boundaries.add(end + 1)
+            startingAt.setdefault(start, []).append(ind)
+            endingAt.setdefault(end + 1, []).append(ind)
+        self._boundaries = sorted(boundaries)
+
+        self._segments = []
+        active = set()
+        for b in self._boundaries:
+            for ind in endingAt.get(b, ()):
+                active.discard(ind)
+            for ind in startingAt.get(b, ()):
+                active.add(ind)
+            self._segments.append(tuple(sorted(active)))
+
+        # starts sorted by value, with the lowest shot index of all the intervals starting at or after
+        # each position
+        sortedStarts = sorted((start, ind) for ind, start, end in intervals)
+        self._starts = [s[0] for s in sortedStarts]
+        self._firstIndexFrom = [-1] * (len(sortedStarts) + 1)
+        for i in range(len(sortedStarts) - 1, -1, -1):
+            nextInd = self._firstIndexFrom[i + 1]
+            ind = sortedStarts[i][1]
+            self._firstIndexFrom[i] = ind if -1 == nextInd else min(ind, nextInd)
+
+    def getIndicesContainingFrame(self, frame):
+        """Return the tupple of the indices of the intervals containing the frame, sorted by index"""
+        segmentInd = bisect_right(self._boundaries, frame) - 1
+        if 0 > segmentInd:
+            return ()
+        return self._segments[segmentInd]
+
+    def getFirstIndexContainingFrame(self, frame):
+        """Return the lowest index of the intervals containing the frame, -1 if none"""
+        indices = self.getIndicesContainingFrame(frame)
+        return indices[0] if len(indices) else -1
+
+    def getFirstIndexAfterFrame(self, frame):
+        """Return the lowest index of the intervals starting strictly after the frame, -1 if none"""
+        return self._firstIndexFrom[bisect_right(self._starts, frame)]
+
+
+class ShotsIntervalIndex:
+    """Frame interval indices of the shots of a take, for the whole shot list and for the enabled shots only"""
+
+    def __init__(self, shots):
+        allIntervals = []
+        enabledIntervals = []
+        for i, shot in enumerate(shots):
+            interval = (i, shot.start, shot.end)
+            allIntervals.append(interval)
+            if shot.enabled:
+                enabledIntervals.append(interval)
+
+        self.allShots = FrameIntervalsIndex(allIntervals)
+        self.enabledShots = FrameIntervalsIndex(enabledIntervals)
+
+    def get(self, ignoreDisabled=False):
+        return self.enabledShots if ignoreDisabled else self.allShots
+
+
+def getShotsIntervalIndex(props, takeIndex):
+    return getTakeCache(props, takeIndex, "intervalIndex", ShotsIntervalIndex)
+
+
+###################
+# edit times
+###################
+
+
+class EditTimesTable:
+    """Position of the shots of a take in the edit, obtained by a cumulative sum of the durations of the
+    enabled shots. Disabled shots do not belong to the edit.
+    """
+
+    def __init__(self, shots):
+        # for each shot of the take: number of frames of the edit before the start of the shot,
+        # -1 if the shot is disabled
+        self.editStarts = []
+        self.editDuration = 0
+        self.numEnabledShots = 0
+        self.allShotsDuration = 0
+
+        for shot in shots:
+            duration = shot.end - shot.start + 1
+            self.allShotsDuration += duration
+            if shot.enabled:
+                self.editStarts.append(self.editDuration)
+                self.editDuration += duration
+                self.numEnabledShots += 1
+            else:
+                self.editStarts.append(-1)
+
+    def getEditDuration(self, ignoreDisabled=True):
+        """Return the edit duration in frames, -1 if there is no shot to take into account"""
+        if ignoreDisabled:
+            return self.editDuration if self.numEnabledShots else -1
+        return self.allShotsDuration if len(self.editStarts) else -1
+
+
+def getEditTimesTable(props, takeIndex):
+    return getTakeCache(props, takeIndex, "editTimes", EditTimesTable)
+
+
+###################
+# play plan
+###################
+
+
+class PlayPlan:
+    """Enabled shots of a take in play order, used to resolve the frame and shot to play in shots play mode
+    without iterating over the shots.
+    Positions used here are the positions of the shots in the list of the enabled shots.
+    """
+
+    def __init__(self, shots):
+        # indices of the enabled shots in the whole shot list
+        self.shotIndices = []
+        self.starts = []
+        self.ends = []
+        # number of frames played before the start (editStarts) and after the end (editEnds) of each enabled shot
+        self.editStarts = []
+        self.editEnds = []
+
+        editDuration = 0
+        for i, shot in enumerate(shots):
+            if shot.enabled:
+                start = shot.start
+                end = shot.end
+                self.shotIndices.append(i)
+                self.starts.append(start)
+                self.ends.append(end)
+                self.editStarts.append(editDuration)
+                editDuration += end - start + 1
+                self.editEnds.append(editDuration)
+
+    def __len__(self):
+        return len(self.shotIndices)
+
+    def getPreviousPosition(self, shotIndex):
+        """Return the position of the last enabled shot before the shot at shotIndex in the whole list, -1 if none"""
+        return bisect_left(self.shotIndices, shotIndex) - 1
+
+    def getNextPosition(self, shotIndex):
+        """Return the position of the first enabled shot after the shot at shotIndex in the whole list, -1 if none"""
+        pos = bisect_right(self.shotIndices, shotIndex)
+        return pos if pos < len(self.shotIndices) else -1
+
+    def resolveForward(self, fromPosition, disp):
+        """Return the tupple (position, frame) reached when moving disp frames forward in the edit from the start
+        of the enabled shot at fromPosition, (-1, None) if the end of the edit is passed
+        """
+        target = self.editStarts[fromPosition] + disp
+        pos = bisect_right(self.editEnds, target, lo=fromPosition)
+        if pos >= len(self.shotIndices):
+            return (-1, None)
+        return (pos, self.starts[pos] + target - self.editStarts[pos])
+
+    def resolveBackward(self, fromPosition, disp):
+        """Return the tupple (position, frame) reached when moving disp frames backward in the edit from the end
+        of the enabled shot at fromPosition, (-1, None) if the start of the edit is passed
+        """
+        target = self.editEnds[fromPosition] - disp
+        pos = bisect_left(self.editStarts, target, hi=fromPosition + 1) - 1
+        if 0 > pos:
+            return (-1, None)
+        return (pos, self.ends[pos] - (self.editEnds[pos] - target))
+
+
+def getPlayPlan(props, takeIndex):
+    return getTakeCache(props, takeIndex, "playPlan", PlayPlan)
+
+
+###################
+# timeline model
+###################
+
+
+def getTimelineModel(props, takeIndex):
+    """Return the cached timeline model of the take. The model is shared and must not be modified, use
+    props.getTimelineModel() to get a model to modify
+    """
+    return getTakeCache(props, takeIndex, "timelineModel", TimelineModel.fromShots)
+
+
+###################
+# cameras
+###################
+
+
+class CameraShotsIndex:
+    """Indices of the shots of a take using each camera, in the order of the shots list.
+    The cameras are identified by the address of their object so that renaming a camera doesn't affect the index.
+    The shots without camera are indexed under None.
+    """
+
+    def __init__(self, shots):
+        self.allShots = dict()
+        self.enabledShots = dict()
+        for i, shot in enumerate(shots):
+            key = self._getKey(shot.camera)
+            self.allShots.setdefault(key, []).append(i)
+            if shot.enabled:
+                self.enabledShots.setdefault(key, []).append(i)
+
+    @staticmethod
+    def _getKey(cam):
+        return None if cam is None else cam.as_pointer()
+
+    def getShotIndices(self, cam, ignoreDisabled=False):
+        """Return the sorted list of the indices of the shots using the camera, or without camera if cam is None.
+        The list must not be modified"""
+        shotIndices = self.enabledShots if ignoreDisabled else self.allShots
+        return shotIndices.get(self._getKey(cam), [])
+
+
+def getShotIndicesUsingCamera(props, takeIndex, cam, ignoreDisabled=False):
+    """Return the sorted list of the indices of the shots of the take using the specified camera
+    The shots returned are checked so that the index is rebuilt if it is outdated, for example if an
+    object has been deleted and its address reused by a new one
+    """
+    shots = props.takes[takeIndex].shots
+    shotIndices = getTakeCache(props, takeIndex, "cameraShots", CameraShotsIndex).getShotIndices(cam, ignoreDisabled)
+    if all(ind < len(shots) and shots[ind].camera == cam for ind in shotIndices):
+        return shotIndices
+
+    invalidateTakeCache(props, takeIndex, "cameraShots")
+    return getTakeCache(props, takeIndex, "cameraShots", CameraShotsIndex).getShotIndices(cam, ignoreDisabled)
+
+
+def getPositionInShotIndices(shotIndices, shotIndex):
+    """Return the position of shotIndex in the sorted list shotIndices, -1 if not found"""
+    pos = bisect_left(shotIndices, shotIndex)
+    return pos if pos < len(shotIndices) and shotIndices[pos] == shotIndex else -1
+
+
+###################
+# handlers
+###################
+
+
+@persistent
+def clearCaches_handler(scene):
+    clearCaches()
+
+
+@persistent
+def subscribeToDisplayChanges_handler(scene):
+    subscribeToDisplayChanges()
+
+
+@persistent
+def frameChanged_handler(scene):
+    # Blender already redraws the areas when the frame changes, only the version is updated, and only when the
+    # current shot changes with the frame
+    global _frameChangedCurrentShot
+    props = getattr(scene, "UAS_shot_manager_props", None)
+    if props is None:
+        return
+    currentShot = (props.as_pointer(), props.getCurrentTakeIndex(), props.getCurrentShotIndex())
+    if currentShot != _frameChangedCurrentShot:
+        _frameChangedCurrentShot = currentShot
+        shotsDisplayChanged(tagRedraw=False)
+
+
+def register():
+    for handlerCateg in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        utils_handlers.removeAllHandlerOccurences(clearCaches_handler, handlerCateg=handlerCateg)
+        handlerCateg.append(clearCaches_handler)
+
+    utils_handlers.removeAllHandlerOccurences(
+        subscribeToDisplayChanges_handler, handlerCateg=bpy.app.handlers.load_post
+    )
+    bpy.app.handlers.load_post.append(subscribeToDisplayChanges_handler)
+
+    utils_handlers.removeAllHandlerOccurences(frameChanged_handler, handlerCateg=bpy.app.handlers.frame_change_post)
+    bpy.app.handlers.frame_change_post.append(frameChanged_handler)
+
+    subscribeToDisplayChanges()
+
+
+def unregister():
+    for handlerCateg in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        utils_handlers.removeAllHandlerOccurences(clearCaches_handler, handlerCateg=handlerCateg)
+
+    utils_handlers.removeAllHandlerOccurences(
+        subscribeToDisplayChanges_handler, handlerCateg=bpy.app.handlers.load_post
+    )
+    utils_handlers.removeAllHandlerOccurences(frameChanged_handler, handlerCateg=bpy.app.handlers.frame_change_post)
+    bpy.msgbus.clear_by_owner(_msgbusOwner)
+
+    clearCaches()
+    _activeOverlays.clear()
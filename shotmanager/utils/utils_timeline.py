@@ -0,0 +1,247 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Timeline model of the shots of a take
+
+The start, end and enabled state of the shots are read in one pass into plain records, so that the edit and
+navigation algorithms run on Python values instead of accessing the RNA properties of the shots at each test.
+The records can be modified and the modified shots written back in bulk (see props.applyTimelineModel).
+
+This module doesn't depend on bpy: the model can be built, and its algorithms run, with a standard Python
+interpreter from any list of objects having the attributes start, end and enabled.
+"""
+
+
+class ShotRecord:
+    """Copy of the timing of a shot. end is included in the shot"""
+
+    __slots__ = ("start", "end", "enabled", "durationLocked", "modified")
+
+    def __init__(self, start, end, enabled=True, durationLocked=False):
+        self.start = start
+        self.end = end
+        self.enabled = enabled
+        self.durationLocked = durationLocked
+        self.modified = False
+
+    def getDuration(self):
+        return self.end - self.start + 1
+
+    def __repr__(self):
+        return f"ShotRecord({self.start}, {self.end}, enabled={self.enabled})"
+
+
+def getShotRangeWithStart(start, end, newStart, durationLocked):
+    """Return the tupple (start, end) of a shot which start is set to newStart, as done by the start property of
+    the shots: the end is moved if the duration is locked, otherwise the start cannot go above the end
+    """
+    if durationLocked:
+        return (newStart, newStart + end - start)
+    return (min(newStart, end), end)
+
+
+def getShotRangeWithEnd(start, end, newEnd, durationLocked):
+    """Return the tupple (start, end) of a shot which end is set to newEnd, as done by the end property of
+    the shots: the start is moved if the duration is locked, otherwise the end cannot go below the start
+    """
+    if durationLocked:
+        return (newEnd - (end - start), newEnd)
+    return (start, max(newEnd, start))
+
+
+def _readShotsAttribute(shots, attrName, defaultValue):
+    """Return the list of the values of the attribute for all the shots
+    Blender collections are read with a single foreach_get call
+    """
+    if hasattr(shots, "foreach_get"):
+        values = [defaultValue] * len(shots)
+        shots.foreach_get(attrName, values)
+        return values
+    return [getattr(shot, attrName, defaultValue) for shot in shots]
+
+
+class TimelineModel:
+    """Shots of a take, in the order of the shots list"""
+
+    __slots__ = ("shots",)
+
+    def __init__(self, shots=None):
+        """shots: list of ShotRecord"""
+        self.shots = list() if shots is None else shots
+
+    @classmethod
+    def fromShots(cls, shots):
+        """Build the model from a collection of shots, or from any sequence of objects having the attributes start,
+        end, enabled and optionally durationLocked
+        """
+        starts = _readShotsAttribute(shots, "start", 0)
+        ends = _readShotsAttribute(shots, "end", 0)
+        enabledStates = _readShotsAttribute(shots, "enabled", True)
+        durationLockedStates = _readShotsAttribute(shots, "durationLocked", False)
+        return cls(
+            [
+                ShotRecord(start, end, bool(enabled), bool(durationLocked))
+                for start, end, enabled, durationLocked in zip(starts, ends, enabledStates, durationLockedStates)
+            ]
+        )
+
+    def __len__(self):
+        return len(self.shots)
+
+    ###################
+    # edit
+    ###################
+
+    def getPreviousEnabledShotIndex(self, shotIndex):
+        """Return the index of the last enabled shot before the shot at shotIndex, -1 if none"""
+        for i in range(min(shotIndex, len(self.shots)) - 1, -1, -1):
+            if self.shots[i].enabled:
+                return i
+        return -1
+
+    def getNextEnabledShotIndex(self, shotIndex):
+        """Return the index of the first enabled shot after the shot at shotIndex, -1 if none"""
+        for i in range(max(-1, shotIndex) + 1, len(self.shots)):
+            if self.shots[i].enabled:
+                return i
+        return -1
+
+    def getEditStarts(self):
+        """Return, for each shot, the number of frames of the edit before its start, -1 if the shot is disabled"""
+        editStarts = []
+        editDuration = 0
+        for shot in self.shots:
+            if shot.enabled:
+                editStarts.append(editDuration)
+                editDuration += shot.end - shot.start + 1
+            else:
+                editStarts.append(-1)
+        return editStarts
+
+    def getEditDuration(self, ignoreDisabled=True):
+        """Return the edit duration in frames, -1 if there is no shot to take into account"""
+        shots = [shot for shot in self.shots if shot.enabled] if ignoreDisabled else self.shots
+        if not len(shots):
+            return -1
+        return sum(shot.end - shot.start + 1 for shot in shots)
+
+    def getEditTime(self, shotIndex, frame):
+        """Return the time of the frame of the shot in the edit, starting at 0, -1 if the shot is disabled or if
+        the frame is not in the shot
+        """
+        if not (0 <= shotIndex < len(self.shots)):
+            return -1
+        shot = self.shots[shotIndex]
+        if not shot.enabled or not (shot.start <= frame <= shot.end):
+            return -1
+        return self.getEditStarts()[shotIndex] + frame - shot.start
+
+    ###################
+    # navigation
+    ###################
+
+    def getPreviousShotBoundary(self, currentShotIndex, currentFrame, boundaryMode="ANY"):
+        """Return the tupple (shot index, frame) of the shot boundary before the current frame, in the current shot
+        or in the previous enabled shot. The shot index is -1 if the current shot is disabled and there is no
+        enabled shot before it
+        boundaryMode: "ANY", "START" or "END"
+        """
+        currentShot = self.shots[currentShotIndex]
+        previousShotInd = self.getPreviousEnabledShotIndex(currentShotIndex)
+        previousShotFrame = None
+        if -1 < previousShotInd:
+            previousShot = self.shots[previousShotInd]
+            previousShotFrame = previousShot.start if "START" == boundaryMode else previousShot.end
+
+        if not currentShot.enabled:
+            return (previousShotInd, currentFrame if previousShotFrame is None else previousShotFrame)
+
+        if "ANY" == boundaryMode and currentFrame != currentShot.start:
+            return (currentShotIndex, currentShot.start)
+
+        # case of the very first shot
+        if -1 == previousShotInd:
+            return (currentShotIndex, currentFrame)
+        return (previousShotInd, previousShotFrame)
+
+    def getNextShotBoundary(self, currentShotIndex, currentFrame, boundaryMode="ANY"):
+        """Return the tupple (shot index, frame) of the shot boundary after the current frame, in the current shot
+        or in the next enabled shot. The shot index is -1 if the current shot is disabled and there is no
+        enabled shot after it
+        boundaryMode: "ANY", "START" or "END"
+        """
+        currentShot = self.shots[currentShotIndex]
+        nextShotInd = self.getNextEnabledShotIndex(currentShotIndex)
+        nextShotFrame = None
+        if -1 < nextShotInd:
+            nextShot = self.shots[nextShotInd]
+            nextShotFrame = nextShot.end if "END" == boundaryMode else nextShot.start
+
+        if not currentShot.enabled:
+            return (nextShotInd, currentFrame if nextShotFrame is None else nextShotFrame)
+
+        if "START" != boundaryMode and currentFrame != currentShot.end:
+            return (currentShotIndex, currentShot.end)
+
+        # case of the very last shot
+        if -1 == nextShotInd:
+            return (currentShotIndex, currentFrame)
+        return (nextShotInd, nextShotFrame)
+
+    def getPreviousFrame(self, currentShotIndex, currentFrame):
+        """Return the tupple (shot index, frame) of the frame before the current frame in shots play mode, where
+        the frames of the disabled shots and the frames between the shots are skipped
+        """
+        currentShot = self.shots[currentShotIndex]
+        if currentShot.enabled and currentFrame != currentShot.start:
+            return (currentShotIndex, currentFrame - 1)
+        return self.getPreviousShotBoundary(currentShotIndex, currentFrame, boundaryMode="END")
+
+    def getNextFrame(self, currentShotIndex, currentFrame):
+        """Return the tupple (shot index, frame) of the frame after the current frame in shots play mode, where
+        the frames of the disabled shots and the frames between the shots are skipped
+        """
+        currentShot = self.shots[currentShotIndex]
+        if currentShot.enabled and currentFrame != currentShot.end:
+            return (currentShotIndex, currentFrame + 1)
+        return self.getNextShotBoundary(currentShotIndex, currentFrame, boundaryMode="START")
+
+    ###################
+    # modifications
+    ###################
+
+    def setShotRange(self, shotIndex, start, end):
+        """Set the range of the shot, end being clamped to start"""
+        shot = self.shots[shotIndex]
+        shot.start = start
+        shot.end = max(start, end)
+        shot.modified = True
+
+    def setShotEnabled(self, shotIndex, enabled):
+        shot = self.shots[shotIndex]
+        shot.enabled = enabled
+        shot.modified = True
+
+    def offsetShots(self, offset, fromFrame):
+        """Offset the shots starting at or after fromFrame"""
+        for i, shot in enumerate(self.shots):
+            if fromFrame <= shot.start:
+                self.setShotRange(i, shot.start + offset, shot.end + offset)
+
+    def getModifiedShotIndices(self):
+        return [i for i, shot in enumerate(self.shots) if shot.modified]
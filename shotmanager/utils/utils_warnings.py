@@ -0,0 +1,321 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Cached report of the scene warnings displayed in the main panel
+
+Each check of the report is made of a function returning the inputs of the check, cheap to evaluate, and of a
+function computing the warnings. The warnings of a check are computed again only when its inputs have changed.
+The read-only state of the file is obtained from the file system in the load and save handlers, not when the
+panel is drawn.
+"""
+
+from pathlib import Path
+from stat import S_IMODE, S_IWRITE
+import time
+
+import bpy
+from bpy.app.handlers import persistent
+
+from shotmanager.utils import utils_handlers
+from shotmanager.utils import utils_shots_cache
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+# incremented when the file is loaded or saved
+_fileVersion = 0
+
+# key: absolute path of a file, value: True if the file is read-only
+_readOnlyFiles = dict()
+
+# incremented when the timeline markers of a scene are modified
+_markersVersion = 0
+
+# key: scene pointer, value: tupple of the (frame, camera pointer) of the timeline markers of the scene
+_markersSnapshots = dict()
+
+# key: (props pointer, scene pointer), value: WarningsReport
+_reports = dict()
+
+
+def fileChanged():
+    """To call when the current file is loaded or saved. The read-only state of the file is read again"""
+    global _fileVersion
+    _fileVersion += 1
+    _readOnlyFiles.clear()
+
+    currentFilePath = bpy.path.abspath(bpy.data.filepath)
+    if "" != currentFilePath:
+        isFileReadOnly(currentFilePath)
+
+
+def isFileReadOnly(filePath):
+    """Return True if the specified file is read-only. The state is read on disk only the first time the
+    file is queried after a load or a save
+    """
+    readOnly = _readOnlyFiles.get(filePath, None)
+    if readOnly is None:
+        try:
+            stat = Path(filePath).stat()
+            readOnly = S_IMODE(stat.st_mode) & S_IWRITE == 0
+        except OSError as e:
+            _logger.debug(f"isFileReadOnly: cannot get the state of {filePath}: {e}")
+            readOnly = False
+        _readOnlyFiles[filePath] = readOnly
+    return readOnly
+
+
+def markersChanged():
+    """To call when the timeline markers of a scene have been modified"""
+    global _markersVersion
+    _markersVersion += 1
+
+
+def _updateMarkersSnapshot(scene):
+    """Store the frames and cameras of the timeline markers of the scene and return True if they differ from the
+    ones stored at the previous call
+    """
+    snapshot = tuple((m.frame, m.camera.as_pointer() if m.camera is not None else None) for m in scene.timeline_markers)
+    key = scene.as_pointer()
+    if _markersSnapshots.get(key, None) == snapshot:
+        return False
+    _markersSnapshots[key] = snapshot
+    return True
+
+
+###################
+# checks
+###################
+
+
+def _readOnlyFileInputs(props, scene):
+    return (bpy.data.filepath, _fileVersion)
+
+
+def _readOnlyFileWarnings(props, scene):
+    currentFilePath = bpy.path.abspath(bpy.data.filepath)
+    if "" == currentFilePath:
+        # warningList.append("Current file has to be saved")
+        # wkip to remove ones warning mecanics are integrated in the settings
+        return []
+    if isFileReadOnly(currentFilePath):
+        return ["Current file in Read-Only"]
+    return []
+
+
+def _fpsInputs(props, scene):
+    return (props.use_project_settings, scene.render.fps, props.project_fps)
+
+
+def _fpsWarnings(props, scene):
+    # check if the current framerate is valid according to the project settings (wkip)
+    if props.use_project_settings:
+        if scene.render.fps != props.project_fps:
+            return ["Current scene fps and project fps are different !!"]
+    return []
+
+
+def _negativeFrameInputs(props, scene):
+    return (
+        utils_shots_cache.getShotsDataVersion(),
+        props.getCurrentTakeIndex(),
+        props.getHandlesDuration(),
+        props.areShotHandlesUsed(),
+    )
+
+
+def _negativeFrameWarnings(props, scene):
+    # check if a negative render frame may be rendered
+    handlesDuration = props.getHandlesDuration()
+    hasNegativeFrame = any(shot.start - handlesDuration < 0 for shot in props.get_shots())
+    if not hasNegativeFrame:
+        return []
+    if props.areShotHandlesUsed():
+        return [
+            "Index of the output frame of a shot minus handle is negative !!"
+            "\nNegative time indicies are not supported by Shot Manager renderer."
+        ]
+    return [
+        "At least one shot starts at a negative frame !!"
+        "\nNegative time indicies are not supported by Shot Manager renderer."
+    ]
+
+
+def _resolutionPercentageInputs(props, scene):
+    return (scene.render.resolution_percentage,)
+
+
+def _resolutionPercentageWarnings(props, scene):
+    if 100 != scene.render.resolution_percentage:
+        return ["Render Resolution Percentage is not at 100%"]
+    return []
+
+
+def _dataVersionInputs(props, scene):
+    return (props.dataVersion, bpy.context.window_manager.UAS_shot_manager_version)
+
+
+def _dataVersionWarnings(props, scene):
+    # check is the data version is compatible with the current version
+    # wkip obsolete code due to post register data version check
+    if props.dataVersion <= 0 or props.dataVersion < bpy.context.window_manager.UAS_shot_manager_version:
+        return ["Data version is lower than SM version !!"]
+    return []
+
+
+def _cameraBindingInputs(props, scene):
+    return (_markersVersion, len(scene.timeline_markers))
+
+
+def _cameraBindingWarnings(props, scene):
+    # check if some camera markers are used in the scene
+    if any(m.camera is not None for m in scene.timeline_markers):
+        return ["Scene contains markers binded to cameras\n*** Shot Manager is NOT compatible with camera binding ***"]
+    return []
+
+
+# tupples (check name, inputs function, warnings function), in the order of the warnings in the report
+_checks = (
+    ("readOnlyFile", _readOnlyFileInputs, _readOnlyFileWarnings),
+    ("fps", _fpsInputs, _fpsWarnings),
+    ("negativeFrame", _negativeFrameInputs, _negativeFrameWarnings),
+    ("resolutionPercentage", _resolutionPercentageInputs, _resolutionPercentageWarnings),
+    ("dataVersion", _dataVersionInputs, _dataVersionWarnings),
+    ("cameraBinding", _cameraBindingInputs, _cameraBindingWarnings),
+)
+
+
+###################
+# report
+###################
+
+
+class WarningsReport:
+    """Warnings of a scene, each check being computed again only when its inputs have changed
+    timestamp: time, as returned by time.time(), of the last computation of a check
+    checkTimings: for each check name, duration in seconds of its last computation
+    """
+
+    def __init__(self):
+        self.timestamp = None
+        self.checkTimings = dict()
+        self.warnings = []
+
+        # key: check name, value: (inputs, warnings)
+        self._checkResults = dict()
+
+    def update(self, props, scene):
+        """Compute again the checks which inputs have changed"""
+        modified = False
+        for checkName, inputsFunction, warningsFunction in _checks:
+            inputs = inputsFunction(props, scene)
+            result = self._checkResults.get(checkName, None)
+            if result is None or result[0] != inputs:
+                startTime = time.perf_counter()
+                self._checkResults[checkName] = (inputs, warningsFunction(props, scene))
+                self.checkTimings[checkName] = time.perf_counter() - startTime
+                modified = True
+
+        if modified:
+            self.timestamp = time.time()
+            self.warnings = [w for checkName, _i, _w in _checks for w in self._checkResults[checkName][1]]
+
+    def hasWarning(self, checkName):
+        """Return True if the specified check has returned at least one warning at its last computation"""
+        result = self._checkResults.get(checkName, None)
+        return result is not None and 0 < len(result[1])
+
+
+def getWarningsReport(props, scene):
+    """Return the up-to-date report of the warnings of the scene"""
+    key = (props.as_pointer(), scene.as_pointer())
+    report = _reports.get(key, None)
+    if report is None:
+        report = WarningsReport()
+        _reports[key] = report
+    report.update(props, scene)
+    return report
+
+
+def sceneContainsCameraBinding(scene):
+    """Cached version of utils.sceneContainsCameraBinding, to use in the UI"""
+    props = scene.UAS_shot_manager_props
+    return getWarningsReport(props, scene).hasWarning("cameraBinding")
+
+
+###################
+# handlers
+###################
+
+
+@persistent
+def fileChanged_handler(scene):
+    fileChanged()
+    markersChanged()
+    _markersSnapshots.clear()
+    _reports.clear()
+
+
+@persistent
+def markersChanged_handler(scene):
+    markersChanged()
+    _markersSnapshots.clear()
+
+
+@persistent
+def sceneUpdated_handler(scene, depsgraph=None):
+    # the modifications of the timeline markers are notified as updates of the scene, as the modifications of
+    # the properties of the add-on, so the markers are compared to their previous state
+    # (the depsgraph is not passed to the handlers in Blender versions older than 2.91)
+    if depsgraph is None:
+        updatedScenes = [scene]
+    else:
+        updatedScenes = [update.id.original for update in depsgraph.updates if isinstance(update.id, bpy.types.Scene)]
+
+    markersModified = False
+    for updatedScene in updatedScenes:
+        # all the snapshots are updated
+        markersModified = _updateMarkersSnapshot(updatedScene) or markersModified
+    if markersModified:
+        markersChanged()
+
+
+_handlers = (
+    (fileChanged_handler, "load_post"),
+    (fileChanged_handler, "save_post"),
+    (markersChanged_handler, "undo_post"),
+    (markersChanged_handler, "redo_post"),
+    (sceneUpdated_handler, "depsgraph_update_post"),
+)
+
+
+def register():
+    for handler, handlerCategName in _handlers:
+        handlerCateg = getattr(bpy.app.handlers, handlerCategName)
+        utils_handlers.removeAllHandlerOccurences(handler, handlerCateg=handlerCateg)
+        handlerCateg.append(handler)
+
+
+def unregister():
+    for handler, handlerCategName in _handlers:
+        utils_handlers.removeAllHandlerOccurences(handler, handlerCateg=getattr(bpy.app.handlers, handlerCategName))
+
+    _readOnlyFiles.clear()
+    _reports.clear()
@@ -0,0 +1,89 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Streaming cut of PCM wav files
+
+This module doesn't depend on bpy nor on the other modules of the add-on: it is also run as a script by the
+processes cutting the sound of the shots in parallel:
+    python utils_wav.py <job json file>
+where the job file contains the list of the cuts to do, as [source path, target path, start sample, num samples].
+"""
+
+import json
+import sys
+import wave
+
+# number of sample frames read and written at a time
+_chunkNumSamples = 65536
+
+
+def frameToSample(frame, sampleRate, fps):
+    """Return the index of the first audio sample of the specified frame, frame 0 starting at sample 0
+    fps: frame rate, possibly not integer (render fps / fps base)
+    """
+    return round(frame * sampleRate / fps)
+
+
+def getWavSampleRate(filePath):
+    with wave.open(filePath, "rb") as wavFile:
+        return wavFile.getframerate()
+
+
+def cutWavFile(sourcePath, targetPath, startSample, numSamples):
+    """Write in targetPath the numSamples samples of the wav file sourcePath starting at startSample
+    The parts of the range outside of the source file are filled with silence. The file is streamed by chunks
+    """
+    with wave.open(sourcePath, "rb") as source:
+        params = source.getparams()
+        bytesPerSample = params.sampwidth * params.nchannels
+        # silence is 0 for signed PCM, 128 for unsigned 8 bit PCM
+        silenceByte = b"\x80" if 1 == params.sampwidth else b"\x00"
+
+        with wave.open(targetPath, "wb") as target:
+            target.setparams(params)
+
+            remainingSamples = numSamples
+            if startSample < 0:
+                silenceSamples = min(-startSample, remainingSamples)
+                target.writeframesraw(silenceByte * (silenceSamples * bytesPerSample))
+                remainingSamples -= silenceSamples
+                startSample = 0
+
+            if startSample < params.nframes:
+                source.setpos(startSample)
+                while 0 < remainingSamples:
+                    data = source.readframes(min(_chunkNumSamples, remainingSamples))
+                    if not len(data):
+                        break
+                    target.writeframesraw(data)
+                    remainingSamples -= len(data) // bytesPerSample
+
+            if 0 < remainingSamples:
+                target.writeframesraw(silenceByte * (remainingSamples * bytesPerSample))
+        # the header is updated with the number of samples when the target is closed
+
+
+def runCuts(cuts):
+    """cuts: list of [source path, target path, start sample, num samples]"""
+    for sourcePath, targetPath, startSample, numSamples in cuts:
+        cutWavFile(sourcePath, targetPath, startSample, numSamples)
+
+
+if __name__ == "__main__":
+    with open(sys.argv[-1], "r") as f:
+        runCuts(json.load(f))
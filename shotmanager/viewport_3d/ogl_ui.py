@@ -33,6 +33,8 @@ import bgl, blf
 import bpy
 from gpu_extras.batch import batch_for_shader
 
+from shotmanager.utils import utils_shots_cache
+
 # import mathutils
 
 import logging
@@ -743,7 +745,6 @@ class UAS_ShotManager_DrawTimeline(bpy.types.Operator):
 
     def __init__(self):
         self.draw_handle = None
-        self.draw_event = None
 
         self.widgets = []
 
@@ -768,14 +769,16 @@ class UAS_ShotManager_DrawTimeline(bpy.types.Operator):
 
     def register_handlers(self, args, context):
         self.draw_handle = bpy.types.SpaceView3D.draw_handler_add(self.draw_callback_px, args, "WINDOW", "POST_PIXEL")
-        self.draw_event = context.window_manager.event_timer_add(0.1, window=context.window)
+        # no timer: the viewports are redrawn when the displayed data is modified
+        utils_shots_cache.registerOverlay("VIEW_3D")
+        utils_shots_cache.tagOverlaysRedraw()
 
     def unregister_handlers(self, context):
-        context.window_manager.event_timer_remove(self.draw_event)
-        bpy.types.SpaceView3D.draw_handler_remove(self.draw_handle, "WINDOW")
+        if self.draw_handle is not None:
+            bpy.types.SpaceView3D.draw_handler_remove(self.draw_handle, "WINDOW")
+            utils_shots_cache.unregisterOverlay("VIEW_3D")
 
         self.draw_handle = None
-        self.draw_event = None
 
     def handle_widget_events(self, event):
         result = False
@@ -786,11 +789,11 @@ class UAS_ShotManager_DrawTimeline(bpy.types.Operator):
 
     def modal(self, context, event):
         if context.area:
-            # context.area.tag_redraw ( )
-            for area in context.screen.areas:
-                if area.type == "VIEW_3D":
-                    area.tag_redraw()
+            # the viewports are redrawn only when the widgets handle the event
             if self.handle_widget_events(event):
+                for area in context.screen.areas:
+                    if area.type == "VIEW_3D":
+                        area.tag_redraw()
                 return {"RUNNING_MODAL"}
 
         #   if not context.window_manager.UAS_shot_manager_shots_play_mode:
@@ -807,11 +810,13 @@ class UAS_ShotManager_DrawTimeline(bpy.types.Operator):
     # Draw handler to paint onto the screen
     def draw_callback_px(self, op, context):
         try:
+            # the operator is cancelled at the next event, the display has to stop right now
+            if not context.window_manager.UAS_shot_manager_display_timeline:
+                return
             for widget in self.widgets:
                 widget.draw()
         except Exception as e:
             _logger.error(f"*** Crash in ogl context (draw_callback_px) - {e} ***")
             context.window_manager.UAS_shot_manager_display_timeline = False
-            bpy.types.SpaceView3D.draw_handler_remove(self.draw_handle, "WINDOW")
-            self.draw_handle = None
+            self.unregister_handlers(context)
 
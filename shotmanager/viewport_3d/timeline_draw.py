@@ -20,7 +20,6 @@ To do: module description here.
 """
 
 import time
-from collections import defaultdict
 
 import bpy
 import bgl
@@ -29,92 +28,35 @@ import gpu
 from gpu_extras.batch import batch_for_shader
 from mathutils import Vector
 
-from .ogl_ui import clamp, get_region_at_xy, gamma_color
+from shotmanager.utils import utils_shots_cache
+
+from .ogl_ui import get_region_at_xy, gamma_color
+from .timeline_geometry import (
+    LANE_HEIGHT,
+    ClipGeometryInfo,
+    LanesLayout,
+    build_montage_geometry,
+    get_lane_origin_y,
+    view_to_region_transform,
+)
 
 import logging
 
 _logger = logging.getLogger(__name__)
 
-UNIFORM_SHADER_2D = gpu.shader.from_builtin("2D_UNIFORM_COLOR")
-
-
-def clamp_to_region(x, y, region):
-    l_x, l_y = region.view2d.region_to_view(0, 0)
-    h_x, h_y = region.view2d.region_to_view(region.width - 1, region.height - 1)
-    return clamp(x, l_x, h_x), clamp(y, l_y, h_y)
-
-
-class Mesh2D:
-    def __init__(self, vertices=None, indices=None, texcoords=None):
-        self._vertices = list() if vertices is None else vertices
-        self._indices = list() if indices is None else indices
-        self._texcoords = list() if texcoords is None else texcoords
-
-    @property
-    def vertices(self):
-        return list(self._vertices)
-
-    @property
-    def indices(self):
-        return list(self._indices)
-
-    @property
-    def texcoords(self):
-        return list(self._texcoords)
-
-    def draw(self, shader, region=None, draw_types="TRIS"):
-        transformed_vertices = self._vertices
-        if region:
-            transformed_vertices = [
-                region.view2d.view_to_region(*clamp_to_region(x, y, region), clip=True) for x, y in transformed_vertices
-            ]
-
-        batch = batch_for_shader(shader, draw_types, {"pos": transformed_vertices}, indices=self._indices)
-        batch.draw(shader)
-
-
-def build_rectangle_mesh(position, width, height, as_lines=False):
-    """
-
-    :param position:
-    :param width:
-    :param height:
-    :param region: if region is specified this will transform the vertices into the region's view. This allow for pan and zoom support
-    :return:
-    """
-    x1, y1 = position.x, position.y
-    x2, y2 = position.x + width, position.y
-    x3, y3 = position.x, position.y + height
-    x4, y4 = position.x + width, position.y + height
-
-    vertices = ((x1, y1), (x2, y2), (x3, y3), (x4, y4))
-    if as_lines:
-        indices = ((0, 1), (0, 2), (2, 3), (1, 3))
-    else:
-        indices = ((0, 1, 2), (2, 1, 3))
-
-    return Mesh2D(vertices, indices)
-
-
-LANE_HEIGHT = 18
-
-
-def get_lane_origin_y(lane):
-    return -LANE_HEIGHT * lane - 39  # an offset to put it under timeline ruler.
+FLAT_COLOR_SHADER_2D = gpu.shader.from_builtin("2D_FLAT_COLOR")
 
 
 class ShotClip:
-    def __init__(self, context, shot, lane, sm_props):
+    def __init__(self, context, shot, lane, sm_props, shot_index=-1):
         self.context = context
         self.shot = shot
+        self.shot_index = shot_index
         self.height = LANE_HEIGHT
         self.width = 0
         self.lane = lane
         self._highlight = False
-        self.clip_mesh = None
-        self.contour_mesh = None
-        self.start_interaction_mesh = None
-        self.end_interaction_mesh = None
+        self.color = None
         self.origin = None
         self.sm_props = sm_props
         self.update()
@@ -127,36 +69,22 @@ class ShotClip:
     def highlight(self, value: bool):
         self._highlight = value
 
-    def draw(self, context):
-        bgl.glEnable(bgl.GL_BLEND)
-        UNIFORM_SHADER_2D.bind()
-        color = (self.shot.color[0], self.shot.color[1], self.shot.color[2], 0.5)
-        color = gamma_color(color)
-        if self.highlight:
-            color = (0.9, 0.9, 0.9, 0.5)
-        UNIFORM_SHADER_2D.uniform_float("color", color)
-        self.clip_mesh.draw(UNIFORM_SHADER_2D, context.region)
-
-        self.start_interaction_mesh.draw(UNIFORM_SHADER_2D, context.region)
-        self.end_interaction_mesh.draw(UNIFORM_SHADER_2D, context.region)
-
-        current_shot = self.sm_props.getCurrentShot()
-
-        # print("here 01")
-        if current_shot != -1 and self.shot.name == current_shot.name:
-            UNIFORM_SHADER_2D.uniform_float("color", (0.6, 0.6, 0.9, 0.9))
-            self.contour_mesh.draw(UNIFORM_SHADER_2D, context.region, "LINES")
-        #  print("here 02")
-
-        bgl.glDisable(bgl.GL_BLEND)
+    def get_geometry_info(self, current_shot_index):
+        return ClipGeometryInfo(
+            self.shot.start,
+            self.shot.end,
+            self.lane,
+            self.color,
+            highlight=self.highlight,
+            is_current=self.shot_index == current_shot_index,
+        )
 
+    def draw_label(self, position):
         blf.color(0, 0.99, 0.99, 0.99, 1)
         blf.size(0, 11, 72)
-        blf.position(0, *context.region.view2d.view_to_region(self.origin.x + 1.01, self.origin.y + 4), 0)
+        blf.position(0, *position, 0)
         blf.draw(0, self.shot.name)
 
-    #   print("here 03")
-
     def get_region(self, x, y):
         """
         Return the region the mouse is on -1 for start, 0 for move, 1 for end. None else
@@ -192,10 +120,8 @@ class ShotClip:
     def update(self):
         self.width = self.shot.end - self.shot.start + 1
         self.origin = Vector([self.shot.start, get_lane_origin_y(self.lane)])
-        self.clip_mesh = build_rectangle_mesh(self.origin, self.width, self.height)
-        self.start_interaction_mesh = build_rectangle_mesh(self.origin, 1, self.height)
-        self.end_interaction_mesh = build_rectangle_mesh(self.origin + Vector([self.width - 1, 0]), 1, self.height)
-        self.contour_mesh = build_rectangle_mesh(self.origin, self.width, self.height, True)
+        shot_color = self.shot.color
+        self.color = gamma_color((shot_color[0], shot_color[1], shot_color[2], 0.5))
 
 
 class UAS_ShotManager_DrawMontageTimeline(bpy.types.Operator):
@@ -208,10 +134,12 @@ class UAS_ShotManager_DrawMontageTimeline(bpy.types.Operator):
         self.compact_display = False
 
         self.draw_handle = None
-        self.draw_event = None
 
         self.sm_props = None
         self.clips = list()
+        self.lanes_layout = None
+        self.clips_data_version = None
+        self.clips_take_index = None
         self.context = None
 
         self.prev_mouse_x = 0
@@ -223,11 +151,22 @@ class UAS_ShotManager_DrawMontageTimeline(bpy.types.Operator):
 
         self.frame_under_mouse = None
 
-    def modal(self, context, event):
+        # GPU batches of the clips, rebuilt only when the clips or the current shot change
+        self.batches = None
+        self.batches_current_shot_index = None
+        self.batches_dirty = True
+        self.clips_display_version = None
+
+    def tag_redraw(self, context):
         for area in context.screen.areas:
             if area.type == "DOPESHEET_EDITOR":
                 area.tag_redraw()
 
+    def modal(self, context, event):
+        if not context.window_manager.UAS_shot_manager_display_timeline:
+            self.unregister_handlers()
+            return {"CANCELLED"}
+
         if not context.window_manager.UAS_shot_manager_toggle_montage_interaction:
             return {"PASS_THROUGH"}
 
@@ -237,6 +176,7 @@ class UAS_ShotManager_DrawMontageTimeline(bpy.types.Operator):
             mouse_x, mouse_y = region.view2d.region_to_view(event.mouse_x - region.x, event.mouse_y - region.y)
             if event.type == "LEFTMOUSE":
                 if event.value == "PRESS":
+                    self.batches_dirty = True
                     for clip in self.clips:
                         active_clip_region = clip.get_region(mouse_x, mouse_y)
                         if active_clip_region is not None:
@@ -263,7 +203,8 @@ class UAS_ShotManager_DrawMontageTimeline(bpy.types.Operator):
                         self.active_clip.handle_mouse_interaction(
                             self.active_clip_region, mouse_frame - prev_mouse_frame
                         )
-                        self.active_clip.update()
+                        self.relayout_clip(self.active_clip)
+                        self.batches_dirty = True
                         if self.active_clip_region != 0:
                             self.frame_under_mouse = mouse_frame
                         event_handled = True
@@ -272,6 +213,7 @@ class UAS_ShotManager_DrawMontageTimeline(bpy.types.Operator):
                         self.active_clip.highlight = False
                         self.active_clip = None
                         self.frame_under_mouse = None
+                        self.batches_dirty = True
 
             self.prev_mouse_x = event.mouse_x - region.x
             self.prev_mouse_y = event.mouse_y - region.y
@@ -279,61 +221,138 @@ class UAS_ShotManager_DrawMontageTimeline(bpy.types.Operator):
             self.build_clips()  # Assume that when the mouse got out of the region shots may be edited
             self.active_clip = None
 
+        # the dopesheet areas are redrawn only if the clips have to be rebuilt, not at every event
+        if self.batches_dirty:
+            self.tag_redraw(context)
+
         if event_handled:
             return {"RUNNING_MODAL"}
 
-        if not context.window_manager.UAS_shot_manager_display_timeline:
-            context.window_manager.event_timer_remove(self.draw_event)
-            bpy.types.SpaceDopeSheetEditor.draw_handler_remove(self.draw_handle, "WINDOW")
-
-            return {"CANCELLED"}
-
         return {"PASS_THROUGH"}
 
     def invoke(self, context, event):
         self.draw_handle = bpy.types.SpaceDopeSheetEditor.draw_handler_add(
             self.draw, (context,), "WINDOW", "POST_PIXEL"
         )
-        self.draw_event = context.window_manager.event_timer_add(0.1, window=context.window)
+        utils_shots_cache.registerOverlay("DOPESHEET_EDITOR")
         context.window_manager.modal_handler_add(self)
         self.context = context
         self.sm_props = context.scene.UAS_shot_manager_props
         self.build_clips()
+        self.clips_display_version = utils_shots_cache.getShotsDisplayVersion()
+        self.tag_redraw(context)
         return {"RUNNING_MODAL"}
 
+    def unregister_handlers(self):
+        if self.draw_handle is not None:
+            bpy.types.SpaceDopeSheetEditor.draw_handler_remove(self.draw_handle, "WINDOW")
+            self.draw_handle = None
+            utils_shots_cache.unregisterOverlay("DOPESHEET_EDITOR")
+
+    def cancel(self, context):
+        self.unregister_handlers()
+
     def build_clips(self):
+        # clips are up to date if the shots have not been modified since they were built
+        data_version = utils_shots_cache.getShotsDataVersion()
+        take_index = self.sm_props.getCurrentTakeIndex()
+        if self.clips_data_version == data_version and self.clips_take_index == take_index:
+            return
+
         self.clips.clear()
+        self.batches_dirty = True
+        enabled_shots = [(i, shot) for i, shot in enumerate(self.sm_props.get_shots()) if shot.enabled]
         if self.compact_display:
-            shots = sorted(self.sm_props.getShotsList(ignoreDisabled=True), key=lambda s: s.start)
-            shots_from_lane = defaultdict(list)
-            for i, shot in enumerate(shots):
-                lane = 0
-                if i > 0:
-                    for l, shots_in_lane in shots_from_lane.items():
-                        for s in shots_in_lane:
-                            if s.start <= shot.start <= s.end:
-                                break
-                        else:
-                            lane = l
-                            break
-                    else:
-                        lane = max(shots_from_lane) + 1  # No free lane, make a new one.
-                shots_from_lane[lane].append(shot)
-
-                self.clips.append(ShotClip(self.context, shot, lane, self.sm_props))
+            self.lanes_layout = LanesLayout.pack([(i, shot.start, shot.end) for i, shot in enabled_shots])
+            for shot_index, shot in enabled_shots:
+                lane = self.lanes_layout.get_lane(shot_index)
+                self.clips.append(ShotClip(self.context, shot, lane, self.sm_props, shot_index=shot_index))
         else:
-            for i, shot in enumerate(self.sm_props.getShotsList(ignoreDisabled=True)):
-                self.clips.append(ShotClip(self.context, shot, i, self.sm_props))
+            self.lanes_layout = None
+            for i, (shot_index, shot) in enumerate(enabled_shots):
+                self.clips.append(ShotClip(self.context, shot, i, self.sm_props, shot_index=shot_index))
+
+        self.clips_data_version = data_version
+        self.clips_take_index = take_index
+
+    def relayout_clip(self, clip):
+        """Update the clip after a modification of its shot. In compact display only the lane the clip was on
+        and the lane it moves to are affected
+        """
+        if self.lanes_layout is not None:
+            clip.lane = self.lanes_layout.move(clip.shot_index, clip.shot.start, clip.shot.end)
+        clip.update()
+
+        # the modification of the shot has been taken into account, the other clips don't have to be rebuilt
+        self.clips_data_version = utils_shots_cache.getShotsDataVersion()
+
+    def refresh_clips(self):
+        """Update the clips after a display notification. The batches are rebuilt only if the shots have been
+        modified or if a clip doesn't look the same anymore, which is not the case for a simple frame change
+        """
+        self.build_clips()
+        for clip in self.clips:
+            previous_look = (clip.color, clip.width, clip.origin.x)
+            clip.update()
+            if previous_look != (clip.color, clip.width, clip.origin.x):
+                self.batches_dirty = True
+
+        self.clips_display_version = utils_shots_cache.getShotsDisplayVersion()
+
+    def build_batches(self, current_shot_index):
+        """Build one batch for all the clip rectangles, one for all the handles and one for the contours"""
+        geometry = build_montage_geometry([clip.get_geometry_info(current_shot_index) for clip in self.clips])
+
+        self.batches = list()
+        for positions, colors, draw_type in (
+            (geometry.clips_positions, geometry.clips_colors, "TRIS"),
+            (geometry.handles_positions, geometry.handles_colors, "TRIS"),
+            (geometry.contours_positions, geometry.contours_colors, "LINES"),
+        ):
+            if len(positions):
+                self.batches.append(
+                    batch_for_shader(FLAT_COLOR_SHADER_2D, draw_type, {"pos": positions, "color": colors})
+                )
+
+        self.batches_current_shot_index = current_shot_index
+        self.batches_dirty = False
 
     def draw(self, context):
         try:
+            if not context.window_manager.UAS_shot_manager_display_timeline:
+                return
+
+            if self.clips_display_version != utils_shots_cache.getShotsDisplayVersion():
+                self.refresh_clips()
+
+            current_shot_index = self.sm_props.current_shot_index
+            if self.batches_dirty or self.batches_current_shot_index != current_shot_index:
+                self.build_batches(current_shot_index)
+
+            # the geometry is in view coordinates, the view2d transformation is done by the GPU matrix
+            region = context.region
+            view_x_min, view_y_min = region.view2d.region_to_view(0, 0)
+            view_x_max, view_y_max = region.view2d.region_to_view(region.width, region.height)
+            scale_x, scale_y, offset_x, offset_y = view_to_region_transform(
+                view_x_min, view_y_min, view_x_max, view_y_max, region.width, region.height
+            )
+
+            bgl.glEnable(bgl.GL_BLEND)
+            gpu.matrix.push()
+            gpu.matrix.translate((offset_x, offset_y))
+            gpu.matrix.scale((scale_x, scale_y))
+            FLAT_COLOR_SHADER_2D.bind()
+            for batch in self.batches:
+                batch.draw(FLAT_COLOR_SHADER_2D)
+            gpu.matrix.pop()
+            bgl.glDisable(bgl.GL_BLEND)
+
             for clip in self.clips:
-                clip.draw(context)
-                # try:
-                #     clip.draw(context)
-                # except Exception as e:
-                #     # wkip wkip
-                #     pass
+                # labels of the clips out of the view are not drawn
+                if clip.shot.end + 1 < view_x_min or view_x_max < clip.origin.x:
+                    continue
+                clip.draw_label(((clip.origin.x + 1.01) * scale_x + offset_x, (clip.origin.y + 4) * scale_y + offset_y))
+
             if self.frame_under_mouse is not None:
                 blf.color(0, 0.99, 0.99, 0.99, 1)
                 blf.size(0, 11, 72)
@@ -343,7 +362,7 @@ class UAS_ShotManager_DrawMontageTimeline(bpy.types.Operator):
         except Exception as ex:
             _logger.error(f"*** Crash in ogl context - Draw clips loop {ex} ***")
             context.window_manager.UAS_shot_manager_display_timeline = False
-            #context.window_manager.UAS_shot_manager_display_timeline = True
+            # context.window_manager.UAS_shot_manager_display_timeline = True
 
 
 _classes = (UAS_ShotManager_DrawMontageTimeline,)
@@ -0,0 +1,186 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Geometry of the montage timeline drawn in the dopesheet editor
+
+The geometry of all the clips is built in view coordinates (x in frames, y in view units) into a few flat vertex
+and color buffers, so that the whole timeline is drawn with one batch per buffer. The transformation to the region
+is done at draw time by the GPU matrix.
+The distribution of the clips on lanes in compact display is also computed here.
+This module doesn't depend on bpy nor gpu so that the geometry can be built and checked outside of Blender.
+"""
+
+from bisect import bisect_left, insort
+import heapq
+
+LANE_HEIGHT = 18
+
+CURRENT_SHOT_CONTOUR_COLOR = (0.6, 0.6, 0.9, 0.9)
+HIGHLIGHTED_CLIP_COLOR = (0.9, 0.9, 0.9, 0.5)
+
+
+def get_lane_origin_y(lane):
+    return -LANE_HEIGHT * lane - 39  # an offset to put it under timeline ruler.
+
+
+def rectangle_triangles(x, y, width, height):
+    """Return the 6 vertices of the 2 triangles covering the rectangle"""
+    x2, y2 = x + width, y + height
+    return ((x, y), (x2, y), (x, y2), (x, y2), (x2, y), (x2, y2))
+
+
+def rectangle_lines(x, y, width, height):
+    """Return the 8 vertices of the 4 segments drawing the contour of the rectangle"""
+    x2, y2 = x + width, y + height
+    return ((x, y), (x2, y), (x, y), (x, y2), (x, y2), (x2, y2), (x2, y), (x2, y2))
+
+
+class ClipGeometryInfo:
+    """Data of a clip required to build its geometry"""
+
+    __slots__ = ("start", "end", "lane", "color", "highlight", "is_current")
+
+    def __init__(self, start, end, lane, color, highlight=False, is_current=False):
+        self.start = start
+        self.end = end
+        self.lane = lane
+        self.color = color
+        self.highlight = highlight
+        self.is_current = is_current
+
+
+class MontageGeometry:
+    """Flat vertex and color buffers for all the clip rectangles, all the handles and all the contours"""
+
+    def __init__(self):
+        self.clips_positions = []
+        self.clips_colors = []
+        self.handles_positions = []
+        self.handles_colors = []
+        self.contours_positions = []
+        self.contours_colors = []
+
+    def add_clip(self, clip):
+        """Add the rectangle, the start and end handles and, if the clip is the current one, the contour of the clip"""
+        x = clip.start
+        y = get_lane_origin_y(clip.lane)
+        width = clip.end - clip.start + 1
+        color = HIGHLIGHTED_CLIP_COLOR if clip.highlight else clip.color
+
+        vertices = rectangle_triangles(x, y, width, LANE_HEIGHT)
+        self.clips_positions.extend(vertices)
+        self.clips_colors.extend((color,) * len(vertices))
+
+        vertices = rectangle_triangles(x, y, 1, LANE_HEIGHT) + rectangle_triangles(x + width - 1, y, 1, LANE_HEIGHT)
+        self.handles_positions.extend(vertices)
+        self.handles_colors.extend((color,) * len(vertices))
+
+        if clip.is_current:
+            vertices = rectangle_lines(x, y, width, LANE_HEIGHT)
+            self.contours_positions.extend(vertices)
+            self.contours_colors.extend((CURRENT_SHOT_CONTOUR_COLOR,) * len(vertices))
+
+
+def build_montage_geometry(clips):
+    """Return the MontageGeometry of the specified list of ClipGeometryInfo"""
+    geometry = MontageGeometry()
+    for clip in clips:
+        geometry.add_clip(clip)
+    return geometry
+
+
+def view_to_region_transform(view_x_min, view_y_min, view_x_max, view_y_max, region_width, region_height):
+    """Return the tupple (scale_x, scale_y, offset_x, offset_y) of the linear transformation converting the
+    view coordinates into region coordinates, where the view rectangle is displayed on the whole region
+    """
+    scale_x = region_width / (view_x_max - view_x_min) if view_x_max != view_x_min else 1.0
+    scale_y = region_height / (view_y_max - view_y_min) if view_y_max != view_y_min else 1.0
+    return (scale_x, scale_y, -view_x_min * scale_x, -view_y_min * scale_y)
+
+
+class LanesLayout:
+    """Distribution of frame intervals [start, end] (end included) on lanes so that the intervals of a lane
+    never overlap. Each interval is identified by a key.
+    """
+
+    def __init__(self):
+        # for each lane: list of the tupples (start, end, key) of its intervals, sorted by start
+        self.lanes = list()
+        self.lane_from_key = dict()
+
+    @classmethod
+    def pack(cls, intervals):
+        """Return the layout of the specified list of tupples (key, start, end), using as few lanes as possible.
+        Intervals are swept by start, with a heap of the end times of the busy lanes and a heap of the free lanes,
+        so that the lowest free lane is always used first. O(n log n).
+        """
+        layout = cls()
+        busy_lanes = list()
+        free_lanes = list()
+        for key, start, end in sorted(intervals, key=lambda interval: (interval[1], interval[2])):
+            while len(busy_lanes) and busy_lanes[0][0] < start:
+                heapq.heappush(free_lanes, heapq.heappop(busy_lanes)[1])
+            if len(free_lanes):
+                lane = heapq.heappop(free_lanes)
+            else:
+                lane = len(layout.lanes)
+                layout.lanes.append(list())
+            heapq.heappush(busy_lanes, (end, lane))
+            layout.lanes[lane].append((start, end, key))
+            layout.lane_from_key[key] = lane
+        return layout
+
+    def get_lane(self, key):
+        return self.lane_from_key.get(key, -1)
+
+    def fits(self, lane, start, end):
+        """Return True if the interval [start, end] doesn't overlap any interval of the lane"""
+        intervals = self.lanes[lane]
+        ind = bisect_left(intervals, (start,))
+        if ind < len(intervals) and intervals[ind][0] <= end:
+            return False
+        if 0 < ind and start <= intervals[ind - 1][1]:
+            return False
+        return True
+
+    def remove(self, key):
+        lane = self.lane_from_key.pop(key, -1)
+        if -1 != lane:
+            self.lanes[lane] = [interval for interval in self.lanes[lane] if interval[2] != key]
+        return lane
+
+    def move(self, key, start, end):
+        """Update the interval identified by key and return its new lane.
+        Only the lane the interval was on and the lane it is moved to are modified: the interval stays on its lane
+        if it still fits there, otherwise it goes on the first lane where it fits, or on a new lane.
+        """
+        previous_lane = self.remove(key)
+
+        candidate_lanes = list(range(len(self.lanes)))
+        if -1 != previous_lane:
+            candidate_lanes.remove(previous_lane)
+            candidate_lanes.insert(0, previous_lane)
+
+        lane = next((candidate for candidate in candidate_lanes if self.fits(candidate, start, end)), -1)
+        if -1 == lane:
+            lane = len(self.lanes)
+            self.lanes.append(list())
+
+        insort(self.lanes[lane], (start, end, key))
+        self.lane_from_key[key] = lane
+        return lane
@@ -19,8 +19,6 @@
 To do: module description here.
 """
 
-from collections import defaultdict
-
 import gpu
 import bgl, blf
 import bpy
@@ -28,6 +26,8 @@ from gpu_extras.batch import batch_for_shader
 import bpy_extras.view3d_utils as view3d_utils
 import mathutils
 
+from shotmanager.utils import utils_shots_cache
+
 from .ogl_ui import Square
 
 font_info = {"font_id": 0, "handler": None}
@@ -41,7 +41,6 @@ class UAS_ShotManager_DrawCameras_UI(bpy.types.Operator):
 
     def __init__(self):
         self.draw_handle = None
-        self.draw_event = None
 
     def invoke(self, context, event):
         self.register_handlers(context)
@@ -53,15 +52,17 @@ class UAS_ShotManager_DrawCameras_UI(bpy.types.Operator):
         self.draw_handle = bpy.types.SpaceView3D.draw_handler_add(
             self.draw_camera_ui, (context,), "WINDOW", "POST_PIXEL"
         )
-        self.draw_event = context.window_manager.event_timer_add(0.1, window=context.window)
+        # no timer: the viewports are redrawn when the displayed data is modified
+        utils_shots_cache.registerOverlay("VIEW_3D")
+        utils_shots_cache.tagOverlaysRedraw()
 
     def unregister_handlers(self, context):
         #    print(" *** Unregister Display Shot names handler *** ")
-        context.window_manager.event_timer_remove(self.draw_event)
-        bpy.types.SpaceView3D.draw_handler_remove(self.draw_handle, "WINDOW")
+        if self.draw_handle is not None:
+            bpy.types.SpaceView3D.draw_handler_remove(self.draw_handle, "WINDOW")
+            utils_shots_cache.unregisterOverlay("VIEW_3D")
 
         self.draw_handle = None
-        self.draw_event = None
 
     def modal(self, context, event):
         if not context.scene.UAS_shot_manager_props.display_shotname_in_3dviewport:
@@ -76,6 +77,9 @@ class UAS_ShotManager_DrawCameras_UI(bpy.types.Operator):
 
     def draw_camera_ui(self, context):
         try:
+            # the operator is cancelled at the next event, the display has to stop right now
+            if not context.scene.UAS_shot_manager_props.display_shotname_in_3dviewport:
+                return
             if bpy.context.space_data.overlay.show_overlays:
                 self.draw_shots_names(context)
         except Exception as e:
@@ -104,41 +108,25 @@ class UAS_ShotManager_DrawCameras_UI(bpy.types.Operator):
 
 def draw_all_shots_names(context, cam, pos_x, pos_y, vertical=False):
     props = context.scene.UAS_shot_manager_props
-    current_shot = props.getCurrentShot()
+    current_shot_index = props.getCurrentShotIndex()
     hud_offset_x = 19
     hud_offset_y = 0
 
     x_horizontal_offset = 80
 
-    shotsList = props.getShotsUsingCamera(cam)
-    if 0 == len(shotsList):
+    # cached list, not modified here
+    shot_indices = props.getShotIndicesUsingCamera(cam)
+    if 0 == len(shot_indices):
         return ()
 
-    shot_names_by_camera = defaultdict(list)
-    for shot in shotsList:
-        shot_names_by_camera[shot.camera.name].append(shot)
-
     #
     # Filter out shots in order to restrict the number of shots to be displayed as a list
     #
-    shot_trim_info = dict()
     shot_trim_length = 2  # Limit the display of x shot before and after the current_shot
 
-    for c, shots in shot_names_by_camera.items():
-        shot_trim_info[c] = [False, False]
-
-        current_shot_index = 0
-        if current_shot in shots:
-            current_shot_index = shots.index(current_shot)
-
-        before_range = max(current_shot_index - shot_trim_length, 0)
-        after_range = min(current_shot_index + shot_trim_length + 1, len(shots))
-        shot_names_by_camera[c] = shots[before_range:after_range]
-
-        if before_range > 0:
-            shot_trim_info[c][0] = True
-        if after_range < len(shots):
-            shot_trim_info[c][1] = True
+    current_shot_position = max(utils_shots_cache.getPositionInShotIndices(shot_indices, current_shot_index), 0)
+    before_range = max(current_shot_position - shot_trim_length, 0)
+    after_range = min(current_shot_position + shot_trim_length + 1, len(shot_indices))
 
     font_size = 10
 
@@ -152,7 +140,7 @@ def draw_all_shots_names(context, cam, pos_x, pos_y, vertical=False):
     y_offset = hud_offset_y + int(cam.show_name) * -12
 
     # Draw ... if we don't display previous shots
-    if shot_trim_info[cam.name][0]:
+    if before_range > 0:
         blf.position(0, pos_x + x_offset, pos_y + y_offset, 0)
         blf.draw(0, "...")
         if vertical:
@@ -161,9 +149,16 @@ def draw_all_shots_names(context, cam, pos_x, pos_y, vertical=False):
             x_offset += x_horizontal_offset
 
     # Draw the shot names.
-    for s in shot_names_by_camera[cam.name]:
+    shots = props.get_shots()
+    for shot_index in shot_indices[before_range:after_range]:
+        s = shots[shot_index]
         drawShotName(
-            pos_x + x_offset, pos_y + y_offset, s.name, s.color, is_current=current_shot == s, is_disabled=not s.enabled
+            pos_x + x_offset,
+            pos_y + y_offset,
+            s.name,
+            s.color,
+            is_current=current_shot_index == shot_index,
+            is_disabled=not s.enabled,
         )
         if vertical:
             y_offset -= font_size  # Seems to do the trick for this value
@@ -171,7 +166,7 @@ def draw_all_shots_names(context, cam, pos_x, pos_y, vertical=False):
             x_offset += x_horizontal_offset
 
     # Draw ... if we don't display next shots
-    if shot_trim_info[cam.name][1]:
+    if after_range < len(shot_indices):
         blf.position(0, pos_x + x_offset, pos_y + y_offset, 0)
         blf.draw(0, "...")
 
@@ -217,7 +212,6 @@ class UAS_ShotManager_DrawHUD(bpy.types.Operator):
 
     def __init__(self):
         self.draw_handle = None
-        self.draw_event = None
 
     def invoke(self, context, event):
         self.register_handlers(context)
@@ -227,15 +221,17 @@ class UAS_ShotManager_DrawHUD(bpy.types.Operator):
 
     def register_handlers(self, context):
         self.draw_handle = bpy.types.SpaceView3D.draw_handler_add(self.draw, (context,), "WINDOW", "POST_PIXEL")
-        self.draw_event = context.window_manager.event_timer_add(0.1, window=context.window)
+        # no timer: the viewports are redrawn when the displayed data is modified
+        utils_shots_cache.registerOverlay("VIEW_3D")
+        utils_shots_cache.tagOverlaysRedraw()
 
     def unregister_handlers(self, context):
         #    print(" *** Unregister Display HUD handler *** ")
-        context.window_manager.event_timer_remove(self.draw_event)
-        bpy.types.SpaceView3D.draw_handler_remove(self.draw_handle, "WINDOW")
+        if self.draw_handle is not None:
+            bpy.types.SpaceView3D.draw_handler_remove(self.draw_handle, "WINDOW")
+            utils_shots_cache.unregisterOverlay("VIEW_3D")
 
         self.draw_handle = None
-        self.draw_event = None
 
     def modal(self, context, event):
         if not context.scene.UAS_shot_manager_props.display_hud_in_3dviewport:
@@ -256,6 +252,8 @@ class UAS_ShotManager_DrawHUD(bpy.types.Operator):
         #     return
 
         props = context.scene.UAS_shot_manager_props
+        if not props.display_hud_in_3dviewport:
+            return
         current_shot = props.getCurrentShot()
         if current_shot is None or context.space_data.region_3d.view_perspective != "CAMERA":
             return